@@ -1,14 +1,29 @@
 import logging
 import os
+import io
+import csv
+import time
+import asyncio
 from telegram import Update, InputFile
 from telegram.ext import CommandHandler, MessageHandler, filters, ContextTypes
 from telegram.constants import ParseMode  # Adicionar esta importação para uso em todo o arquivo
 from config.settings import load_settings
-from keepa.browser import initialize_driver
-from keepa.api import login_to_keepa, update_keepa_product
+from keepa.api import (
+    login_to_keepa, update_keepa_product, update_keepa_products_batch, run_blocking, get_wait_stats, product_url
+)
+from keepa.browser import compare_lean_browsing
+from keepa.driver_pool import driver_pool, KeepaLoginError
+from keepa.scheduler import keepa_scheduler, PRIORITY_MANUAL, PRIORITY_LOW
+from keepa.circuit_breaker import circuit_breakers, CLOSED
+from keepa.rate_limiter import rate_limiters
+from keepa.session_store import get_session_stats
+from keepa.tracking_index import tracking_index
+from keepa.reconciler import reconciler
+from data.tracking_cache import tracking_cache
 from data.data_manager import load_post_info, save_post_info, clean_old_entries
-# Importar driver_sessions de message_processor para compartilhar as mesmas sessões
-from bot.message_processor import process_message, driver_sessions, post_info
+from bot.message_processor import process_message, post_info
+from utils.text_parser import parse_bulk_update_lines
+from utils.tracing import tracer
 # Importar funcionalidade de backup
 from utils.backup import create_backup, list_backups, delete_backup, auto_cleanup_backups
 
@@ -33,6 +48,56 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not accounts_info:
         accounts_info = "Nenhuma conta configurada"
     
+    # Obter uso dos drivers aquecidos
+    drivers_info = "\n".join([
+        f"• {account}: {info['operations']} operações, {info['rss_mb']:.0f} MB, {info['processes']} processos"
+        for account, info in driver_pool.stats().items()
+    ]) or "Nenhum"
+    
+    # Obter estado das filas por conta
+    queues_info = "\n".join([
+        f"• {account}: {info['queued']} na fila, espera média {info['avg_wait']:.1f}s (máx. {info['max_wait']:.1f}s)"
+        + (f", {info['instances']} instâncias" if info['instances'] > 1 else "")
+        + (f", executando {info['running']}" if info['running'] else "")
+        for account, info in keepa_scheduler.stats().items()
+    ]) or "Nenhuma fila ativa"
+    
+    # Profundidade e espera por prioridade
+    priorities_info = "\n".join([
+        f"• {name}: {info['queued']} na fila, espera média {info['avg_wait']:.1f}s (máx. {info['max_wait']:.1f}s)"
+        for name, info in keepa_scheduler.priority_stats().items()
+        if info['queued'] or info['started']
+    ]) or "Nenhum job executado"
+    
+    # Disjuntores das contas que já falharam alguma vez
+    breakers_info = "\n".join([
+        f"• {account}: {info['state']}"
+        + (f", nova tentativa em {info['retry_in']:.0f}s" if info['retry_in'] else "")
+        + (f" (último motivo: {info['last_reason']}, aberto {info['opened_total']}x)" if info['last_reason'] else "")
+        for account, info in circuit_breakers.stats().items()
+        if info['state'] != CLOSED or info['opened_total']
+    ]) or "Todas as contas saudáveis"
+    
+    # Fichas disponíveis e tempo que cada fila esperou pelo limite de ritmo
+    limits_info = "\n".join([
+        f"• {account}: "
+        + (f"{info['operations']:.1f} operações" if info['operations'] is not None else "operações sem limite")
+        + (f", {info['logins']:.1f} logins" if info['logins'] is not None else "")
+        + f", {info['throttled_seconds']:.0f}s aguardando fichas"
+        for account, info in rate_limiters.stats().items()
+    ]) or "Nenhuma conta usada"
+    
+    # Tempo economizado pelas esperas condicionais em relação às pausas fixas
+    wait_stats = get_wait_stats()
+    saved_seconds = sum(stats["saved"] for stats in wait_stats.values())
+    session_stats = get_session_stats()
+    cache_stats = tracking_cache.stats()
+    reconcile_stats = reconciler.stats()
+    snapshots_info = "\n".join([
+        f"• {account}: {info['items']} produtos{'' if info['complete'] else ' (incompleta)'}, lida há {info['age'] / 60:.0f} min"
+        for account, info in tracking_index.stats().items()
+    ]) or "Nenhuma"
+    
     status_message = (
         f"🤖 **Status do Bot:**\n\n"
         f"💬 **Chat de Origem:** {settings.SOURCE_CHAT_ID or 'Não configurado'}\n"
@@ -41,6 +106,22 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         f"📊 **Posts rastreados:** {len(post_info)}\n"
         f"🔐 **Contas Keepa:**\n{accounts_info}\n"
         f"🔄 **Conta Padrão:** {settings.DEFAULT_KEEPA_ACCOUNT}\n"
+        f"🌐 **Drivers aquecidos:**\n{drivers_info}\n"
+        f"📥 **Filas Keepa:**\n{queues_info}\n"
+        f"🚦 **Prioridades:**\n{priorities_info}\n"
+        f"🔌 **Disjuntores:**\n{breakers_info}\n"
+        f"🪙 **Limite de ritmo** ({settings.KEEPA_RATE_OPERATIONS_PER_MINUTE} op/min, "
+        f"{settings.KEEPA_RATE_LOGINS_PER_HOUR} logins/h):\n{limits_info}\n"
+        f"⏱️ **Tempo economizado em esperas:** {saved_seconds:.1f}s\n"
+        f"🍪 **Sessões reaproveitadas:** {session_stats['hit_rate']:.0%} "
+        f"({session_stats['hits'] + session_stats['restored']} de "
+        f"{session_stats['hits'] + session_stats['restored'] + session_stats['full_logins'] + session_stats['failed']})\n"
+        f"🗂️ **Cache de rastreamento:** {cache_stats['entries']} itens, "
+        f"{cache_stats['hits']} atualizações evitadas\n"
+        f"📋 **Listas de rastreamento:**\n{snapshots_info}\n"
+        f"🔁 **Reconciliação:** {reconcile_stats['pending']} pendentes; última: "
+        f"{reconcile_stats['confirmed']} confirmados, {reconcile_stats['retried']} reaplicados, "
+        f"{reconcile_stats['failed']} sem correção\n"
         f"🔄 **Alertas de Atualização:** {'Sim' if settings.UPDATE_EXISTING_TRACKING else 'Não'}"
     )
     
@@ -50,8 +131,6 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 async def test_account_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Testar login para uma conta Keepa específica."""
-    global driver_sessions
-    
     if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
         await update.message.reply_text("Desculpe, apenas o administrador pode testar contas.")
         return
@@ -71,22 +150,24 @@ async def test_account_command(update: Update, context: ContextTypes.DEFAULT_TYP
         
         await update.message.reply_text(f"Testando login para conta '{account_identifier}'...")
         
-        driver = initialize_driver()
-        success = login_to_keepa(driver, account_identifier)
+        # Verificar o login no driver do pool (o driver fica aquecido para uso futuro)
+        success = await keepa_scheduler.submit(
+            account_identifier, login_to_keepa, account_identifier,
+            description="teste de login",
+            priority=PRIORITY_MANUAL
+        )
         
         if success:
-            # Armazenar a sessão para uso futuro
-            driver_sessions[account_identifier] = driver
             await update.message.reply_text(f"✅ Login bem-sucedido para conta '{account_identifier}'!")
         else:
             await update.message.reply_text(f"❌ Login falhou para conta '{account_identifier}'. Verifique os logs para detalhes.")
+    except KeepaLoginError:
+        await update.message.reply_text(f"❌ Login falhou para conta '{account_identifier}'. Verifique os logs para detalhes.")
     except Exception as e:
         await update.message.reply_text(f"❌ Erro ao testar conta: {str(e)}")
 
 async def start_keepa_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Iniciar sessão Keepa."""
-    global driver_sessions
-    
     if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
         await update.message.reply_text("Desculpe, apenas o administrador pode iniciar a sessão Keepa.")
         return
@@ -98,22 +179,16 @@ async def start_keepa_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     await update.message.reply_text(f"Iniciando sessão Keepa para conta '{account_identifier}'...")
     
     try:
-        driver = initialize_driver()
-        success = login_to_keepa(driver, account_identifier)
-        
-        if success:
-            # Armazenar a sessão para uso futuro
-            driver_sessions[account_identifier] = driver
-            await update.message.reply_text(f"✅ Sessão Keepa iniciada com sucesso para conta '{account_identifier}'!")
-        else:
-            await update.message.reply_text(f"❌ Falha ao iniciar sessão Keepa para conta '{account_identifier}'. Verifique os logs.")
+        # Abrir (ou reutilizar) o driver logado da conta no pool
+        await keepa_scheduler.warm_up(account_identifier, description="iniciar sessão", priority=PRIORITY_MANUAL)
+        await update.message.reply_text(f"✅ Sessão Keepa iniciada com sucesso para conta '{account_identifier}'!")
+    except KeepaLoginError:
+        await update.message.reply_text(f"❌ Falha ao iniciar sessão Keepa para conta '{account_identifier}'. Verifique os logs.")
     except Exception as e:
         await update.message.reply_text(f"❌ Erro ao iniciar sessão Keepa: {str(e)}")
 
 async def update_price_manual_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Atualizar manualmente o preço de um produto."""
-    global driver_sessions
-    
     if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
         await update.message.reply_text("Desculpe, apenas o administrador pode atualizar manualmente os preços.")
         return
@@ -132,31 +207,360 @@ async def update_price_manual_command(update: Update, context: ContextTypes.DEFA
         
         await update.message.reply_text(f"Atualizando ASIN {asin} com preço {price} usando conta '{account_identifier}'...")
         
-        # Criar uma nova instância de driver para esta operação
-        driver = initialize_driver(account_identifier)
+        try:
+            success = await keepa_scheduler.submit(
+                account_identifier, update_keepa_product, asin, price,
+                description=f"update manual {asin}",
+                priority=PRIORITY_MANUAL
+            )
+        except KeepaLoginError:
+            await update.message.reply_text(f"❌ Falha ao fazer login no Keepa com conta '{account_identifier}'.")
+            return
         
+        # A atualização manual sempre passa pelo Keepa, mas mantém o cache em dia
+        if success:
+            tracking_cache.record(account_identifier, asin, price)
+            tracking_index.mark_applied(account_identifier, asin, price)
+            await update.message.reply_text(f"✅ ASIN {asin} atualizado com sucesso com conta '{account_identifier}'!")
+        else:
+            tracking_cache.invalidate(account_identifier, asin)
+            await update.message.reply_text(f"❌ Falha ao atualizar ASIN {asin} com conta '{account_identifier}'.")
+    
+    except Exception as e:
+        await update.message.reply_text(f"❌ Erro ao atualizar preço: {str(e)}")
+
+# Limites da atualização em massa
+BULK_MAX_FILE_SIZE = 1024 * 1024
+BULK_CHUNK_SIZE = 10
+BULK_PROGRESS_INTERVAL = 3
+
+def _match_account(name):
+    """Encontrar a conta configurada ignorando maiúsculas/minúsculas"""
+    for account in settings.KEEPA_ACCOUNTS.keys():
+        if account.lower() == name.lower():
+            return account
+    return None
+
+async def bulk_update_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Atualizar preços em massa a partir de um arquivo com linhas ASIN,PREÇO[,CONTA]."""
+    if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
+        await update.message.reply_text("Desculpe, apenas o administrador pode atualizar preços em massa.")
+        return
+    
+    # O arquivo pode vir junto com o comando (legenda) ou na mensagem respondida
+    document = update.message.document
+    if not document and update.message.reply_to_message:
+        document = update.message.reply_to_message.document
+    if not document:
+        await update.message.reply_text(
+            "❌ Envie um arquivo CSV/TXT com a legenda /bulk_update [CONTA] "
+            "ou responda a um arquivo com /bulk_update [CONTA].\n"
+            "Formato de cada linha: ASIN,PREÇO[,CONTA]"
+        )
+        return
+    
+    if document.file_size and document.file_size > BULK_MAX_FILE_SIZE:
+        await update.message.reply_text("❌ Arquivo muito grande (máximo 1 MB).")
+        return
+    
+    # Conta padrão opcional informada após o comando
+    command_text = update.message.caption or update.message.text or ""
+    command_args = command_text.split()[1:]
+    default_account = settings.DEFAULT_KEEPA_ACCOUNT
+    if command_args:
+        default_account = _match_account(command_args[0])
+        if not default_account:
+            await update.message.reply_text(f"❌ Conta '{command_args[0]}' não encontrada na configuração.")
+            return
+    
+    try:
+        telegram_file = await document.get_file()
+        content = bytes(await telegram_file.download_as_bytearray())
         try:
-            success = login_to_keepa(driver, account_identifier)
-            if not success:
-                await update.message.reply_text(f"❌ Falha ao fazer login no Keepa com conta '{account_identifier}'.")
-                return
-            
-            success = update_keepa_product(driver, asin, price)
-            
-            if success:
-                await update.message.reply_text(f"✅ ASIN {asin} atualizado com sucesso com conta '{account_identifier}'!")
+            text = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            text = content.decode("latin-1")
+    except Exception as e:
+        await update.message.reply_text(f"❌ Erro ao baixar arquivo: {str(e)}")
+        return
+    
+    items, invalid_lines = parse_bulk_update_lines(text)
+    if not items:
+        await update.message.reply_text("❌ Nenhuma linha válida encontrada no arquivo.")
+        return
+    
+    status_message = await update.message.reply_text(
+        f"📦 Atualização em massa: {len(items)} linhas recebidas, preparando..."
+    )
+    
+    # As atualizações do Telegram são processadas uma por vez: o arquivo roda em segundo
+    # plano para não segurar posts, comentários e DELETEs até o fim do lote
+    context.application.create_task(
+        _run_bulk_update(status_message, items, invalid_lines, default_account)
+    )
+
+async def _run_bulk_update(status_message, items, invalid_lines, default_account):
+    """
+    Aplicar as linhas de um arquivo de atualização em massa em segundo plano
+    
+    O progresso é mostrado editando a mensagem de status e o CSV de resultado
+    é enviado em resposta a ela.
+    
+    Args:
+        status_message: Mensagem de status enviada pelo comando
+        items: Linhas válidas de parse_bulk_update_lines
+        invalid_lines: Linhas inválidas de parse_bulk_update_lines
+        default_account: Conta usada nas linhas sem conta
+    """
+    try:
+        await _apply_bulk_update(status_message, items, invalid_lines, default_account)
+    except Exception as e:
+        logger.error(f"❌ Erro na atualização em massa: {str(e)}")
+        try:
+            await status_message.edit_text(f"❌ Erro na atualização em massa: {str(e)}")
+        except Exception:
+            pass
+
+async def _apply_bulk_update(status_message, items, invalid_lines, default_account):
+    """Agrupar as linhas por conta, aplicar os preços pelo agendador e gerar o CSV de resultado"""
+    
+    # Agrupar por conta, mantendo a ordem do arquivo dentro de cada conta
+    results = []
+    groups = {}
+    skipped = 0
+    for line_number, asin, price, account_name in items:
+        account = _match_account(account_name) if account_name else default_account
+        if not account:
+            results.append([line_number, asin, price, account_name, "erro", f"Conta '{account_name}' não configurada"])
+            continue
+        # Preços já aplicados recentemente não precisam passar pelo navegador
+        if tracking_cache.is_applied(account, asin, price):
+            results.append([line_number, asin, price, account, "ok", "Sem alterações (cache)"])
+            skipped += 1
+            continue
+        groups.setdefault(account, []).append((line_number, asin, price))
+    for line_number, line in invalid_lines:
+        results.append([line_number, line, "", "", "erro", "Linha inválida"])
+    
+    # Uma leitura da lista de rastreamento por conta evita abrir produtos que já estão com o preço
+    for account in list(groups):
+        try:
+            await tracking_index.refresh(account, max_age=settings.KEEPA_TRACKING_SNAPSHOT_MAX_AGE)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ler a lista de rastreamento da conta {account}: {str(e)}")
+            continue
+        pending = []
+        for line_number, asin, price in groups[account]:
+            if tracking_index.is_applied(account, asin, price):
+                tracking_cache.record(account, asin, price)
+                results.append([line_number, asin, price, account, "ok", "Sem alterações (lista de rastreamento)"])
+                skipped += 1
             else:
-                await update.message.reply_text(f"❌ Falha ao atualizar ASIN {asin} com conta '{account_identifier}'.")
-        finally:
-            # Importante: Sempre encerrar o driver para liberar recursos
+                pending.append((line_number, asin, price))
+        if pending:
+            groups[account] = pending
+        else:
+            del groups[account]
+    
+    total = sum(len(group) for group in groups.values())
+    if not total and not skipped:
+        await status_message.edit_text("❌ Nenhuma linha válida encontrada no arquivo (verifique as contas).")
+        return
+    
+    progress = {"done": 0, "failed": 0, "last_edit": 0.0}
+    await status_message.edit_text(
+        f"📦 Atualização em massa: {total} produtos em {len(groups)} conta(s)..."
+    )
+    
+    async def report_progress(force=False):
+        now = time.monotonic()
+        if not force and now - progress["last_edit"] < BULK_PROGRESS_INTERVAL:
+            return
+        progress["last_edit"] = now
+        try:
+            await status_message.edit_text(
+                f"📦 Atualização em massa: {progress['done']}/{total} processados "
+                f"({progress['failed']} falhas) em {len(groups)} conta(s)"
+            )
+        except Exception as e:
+            # Ex.: "message is not modified"
+            logger.debug(f"Não foi possível editar mensagem de progresso: {str(e)}")
+    
+    async def process_account(account, account_items):
+        # Lotes pequenos mantêm o driver aquecido ocupado e permitem reportar progresso
+        for start in range(0, len(account_items), BULK_CHUNK_SIZE):
+            chunk = account_items[start:start + BULK_CHUNK_SIZE]
             try:
-                driver.quit()
-                logger.info(f"Sessão do driver Chrome fechada para conta {account_identifier}")
+                for _, asin, price in chunk:
+                    reconciler.set_desired_price(account, asin, price)
+                batch_results = await keepa_scheduler.submit(
+                    account, update_keepa_products_batch,
+                    [(asin, price) for _, asin, price in chunk], not reconciler.enabled,
+                    description=f"lote de {len(chunk)} produtos",
+                    priority=PRIORITY_LOW
+                )
             except Exception as e:
-                logger.error(f"Erro ao fechar o driver Chrome: {str(e)}")
+                error = str(e) if isinstance(e, KeepaLoginError) else f"Erro: {str(e)}"
+                batch_results = [
+                    {"asin": asin, "price": price, "success": False, "error": error}
+                    for _, asin, price in chunk
+                ]
+            
+            for (line_number, _, _), result in zip(chunk, batch_results):
+                if result["success"]:
+                    tracking_cache.record(account, result["asin"], result["price"])
+                    tracking_index.mark_applied(account, result["asin"], result["price"])
+                else:
+                    tracking_cache.invalidate(account, result["asin"])
+                status = "ok" if result["success"] else "erro"
+                results.append([line_number, result["asin"], result["price"], account, status, result["error"] or ""])
+                progress["done"] += 1
+                if not result["success"]:
+                    progress["failed"] += 1
+            await report_progress()
+    
+    # Contas diferentes são processadas em paralelo pelo agendador
+    await asyncio.gather(*(process_account(account, group) for account, group in groups.items()))
+    await report_progress(force=True)
+    
+    # Gerar arquivo de resultado
+    results.sort(key=lambda row: row[0])
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["linha", "asin", "preco", "conta", "status", "erro"])
+    writer.writerows(results)
+    
+    succeeded = progress["done"] - progress["failed"]
+    await status_message.reply_document(
+        document=InputFile(io.BytesIO(output.getvalue().encode("utf-8")), filename="resultado_atualizacao.csv"),
+        caption=(
+            f"✅ Atualização em massa concluída: {succeeded}/{total} produtos atualizados"
+            + (f", {skipped} já estavam com o preço" if skipped else "")
+            + (f", {len(invalid_lines)} linha(s) inválida(s)" if invalid_lines else "")
+        )
+    )
+
+async def lean_benchmark_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Comparar carregamento e memória do Chrome com e sem o modo de navegação enxuta."""
+    if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
+        await update.message.reply_text("Desculpe, apenas o administrador pode usar este comando.")
+        return
+    
+    # Usar o ASIN informado ou o do post rastreado mais recente
+    if context.args:
+        asin = context.args[0].upper()
+    elif post_info:
+        asin = list(post_info.values())[-1]["asin"]
+    else:
+        await update.message.reply_text("❌ Informe um ASIN: /lean_benchmark ASIN")
+        return
+    
+    await update.message.reply_text(f"⏱️ Medindo página do produto {asin} com e sem bloqueio de recursos...")
     
+    try:
+        # Os Chrome do benchmark não são do pool: a limpeza de órfãos não pode matá-los
+        with driver_pool.unmanaged_chrome():
+            results = await run_blocking(
+                compare_lean_browsing, product_url(asin), "#productInfoBox"
+            )
+        full, lean = results["full"], results["lean"]
+        await update.message.reply_text(
+            f"📊 Navegação enxuta ({', '.join(settings.KEEPA_BLOCK_RESOURCES) or 'nada bloqueado'}):\n\n"
+            f"Carregamento: {full['load_ms']:.0f} ms → {lean['load_ms']:.0f} ms\n"
+            f"Recursos: {full['resources']} → {lean['resources']}\n"
+            f"Transferido: {full['transfer_kb']:.0f} KB → {lean['transfer_kb']:.0f} KB\n"
+            f"Memória (RSS): {full['rss_mb']:.0f} MB → {lean['rss_mb']:.0f} MB"
+        )
     except Exception as e:
-        await update.message.reply_text(f"❌ Erro ao atualizar preço: {str(e)}")
+        await update.message.reply_text(f"❌ Erro ao medir carregamento: {str(e)}")
+
+async def tracking_snapshot_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Ler a lista de rastreamento de uma conta e atualizar o índice ASIN -> preço-alvo."""
+    if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
+        await update.message.reply_text("Desculpe, apenas o administrador pode usar este comando.")
+        return
+    
+    account_identifier = settings.DEFAULT_KEEPA_ACCOUNT
+    if context.args:
+        account_identifier = _match_account(context.args[0])
+        if not account_identifier:
+            await update.message.reply_text(f"❌ Conta '{context.args[0]}' não encontrada na configuração.")
+            return
+    
+    await update.message.reply_text(f"📋 Lendo lista de rastreamento da conta '{account_identifier}'...")
+    
+    try:
+        items = await tracking_index.refresh(account_identifier, priority=PRIORITY_MANUAL)
+    except KeepaLoginError:
+        await update.message.reply_text(f"❌ Falha ao fazer login no Keepa com conta '{account_identifier}'.")
+        return
+    except Exception as e:
+        await update.message.reply_text(f"❌ Erro ao ler lista de rastreamento: {str(e)}")
+        return
+    
+    if items is None:
+        await update.message.reply_text("❌ A lista de rastreamento não carregou.")
+        return
+    
+    with_price = sum(1 for price in items.values() if price is not None)
+    incomplete_note = "" if tracking_index.is_complete(account_identifier) else (
+        "\n⚠️ Leitura incompleta: exclusões continuam passando pelo navegador"
+    )
+    await update.message.reply_text(
+        f"✅ Conta '{account_identifier}': {len(items)} produtos rastreados "
+        f"({with_price} com preço-alvo da Amazon){incomplete_note}"
+    )
+
+async def latency_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Mostrar os histogramas de latência por etapa ou os spans de um comentário."""
+    if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
+        await update.message.reply_text("Desculpe, apenas o administrador pode usar este comando.")
+        return
+    
+    if context.args and context.args[0].lower() == "reset":
+        tracer.reset()
+        await update.message.reply_text("✅ Histogramas de latência zerados.")
+        return
+    
+    # Spans de um comentário: /latency <trace>
+    if context.args:
+        trace_id = context.args[0].lower()
+        spans = tracer.spans(trace_id)
+        if not spans:
+            await update.message.reply_text(f"❌ Nenhum span recente para o trace {trace_id}.")
+            return
+        lines = [f"🧭 Trace {trace_id}:"]
+        for record in sorted(spans, key=lambda record: record["ts"] - record["duration"]):
+            details = ", ".join(
+                f"{name}={value}" for name, value in record.items()
+                if name not in ("ts", "trace", "stage", "duration", "status")
+            )
+            lines.append(
+                f"• {record['stage']}: {record['duration']:.2f}s"
+                + (f" ({record['status']})" if record["status"] != "ok" else "")
+                + (f" [{details}]" if details else "")
+            )
+        await update.message.reply_text("\n".join(lines))
+        return
+    
+    stats = tracer.stats()
+    if not stats:
+        await update.message.reply_text("Nenhum span registrado ainda.")
+        return
+    
+    lines = ["⏱️ Latência por etapa (p50 / p95 / p99 / máx., em segundos):"]
+    for stage, info in stats.items():
+        lines.append(
+            f"• {stage} ({info['count']}): {info['p50']:.2f} / {info['p95']:.2f} / "
+            f"{info['p99']:.2f} / {info['max']:.2f}"
+        )
+    slowest = tracer.slowest("comentário", limit=3)
+    if slowest:
+        lines.append("")
+        lines.append("🐢 Comentários mais lentos (use /latency <trace>):")
+        for record in slowest:
+            lines.append(f"• {record['trace']}: {record['duration']:.1f}s, ASIN {record.get('asin', '?')}")
+    await update.message.reply_text("\n".join(lines))
 
 async def list_accounts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Listar todas as contas Keepa configuradas."""
@@ -193,22 +597,12 @@ async def clear_cache_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def close_sessions_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Fechar todas as sessões de navegador."""
-    global driver_sessions
-    
     if not settings.ADMIN_ID or str(update.effective_user.id) != settings.ADMIN_ID:
         await update.message.reply_text("Desculpe, apenas o administrador pode usar este comando.")
         return
     
-    # Fechar todas as sessões
-    for account, driver in driver_sessions.items():
-        try:
-            driver.quit()
-            logger.info(f"Sessão fechada para conta: {account}")
-        except Exception as e:
-            logger.error(f"Erro ao fechar sessão para conta {account}: {str(e)}")
-    
-    # Limpar o dicionário de sessões
-    driver_sessions.clear()
+    # Fechar todos os drivers do pool
+    await run_blocking(driver_pool.close_all)
     await update.message.reply_text("✅ Todas as sessões de navegador fechadas.")
 
 # Novos comandos de backup
@@ -354,16 +748,26 @@ def setup_handlers(application):
     application.add_handler(CommandHandler("clear", clear_cache_command))
     application.add_handler(CommandHandler("start_keepa", start_keepa_command))
     application.add_handler(CommandHandler("update", update_price_manual_command))
+    application.add_handler(CommandHandler("bulk_update", bulk_update_command))
     application.add_handler(CommandHandler("test_account", test_account_command))
     application.add_handler(CommandHandler("accounts", list_accounts_command))
     application.add_handler(CommandHandler("close_sessions", close_sessions_command))
-    
+    application.add_handler(CommandHandler("lean_benchmark", lean_benchmark_command))
+    application.add_handler(CommandHandler("tracking_snapshot", tracking_snapshot_command))
+    application.add_handler(CommandHandler("latency", latency_command))
+
     # Comandos de backup
     application.add_handler(CommandHandler("backup", create_backup_command))
     application.add_handler(CommandHandler("list_backups", list_backups_command))
     application.add_handler(CommandHandler("download_backup", download_backup_command))
     application.add_handler(CommandHandler("delete_backup", delete_backup_command))
     
+    # Arquivo enviado com a legenda /bulk_update (antes do manipulador genérico de legendas)
+    application.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r'^/bulk_update'),
+        bulk_update_command
+    ))
+    
     # Manipulador de mensagens
     application.add_handler(MessageHandler(
         filters.TEXT | filters.CAPTION, 
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from datetime import datetime
 import re
@@ -7,9 +8,15 @@ from telegram.ext import ContextTypes
 from config.settings import load_settings
 from data.data_manager import load_post_info, save_post_info
 from utils.text_parser import extract_asin_from_text, extract_source_from_text, extract_price_from_comment
-from keepa.browser import initialize_driver
-from keepa.api import login_to_keepa, update_keepa_product
+from keepa.api import update_keepa_product, prefetch_product_page, KeepaCaptchaError
+from keepa.driver_pool import driver_pool, KeepaLoginError
+from keepa.circuit_breaker import circuit_breakers, backoff_delay
+from keepa.scheduler import keepa_scheduler, update_job_key, JobSuperseded, PRIORITY_DELETE, PRIORITY_LOW
+from keepa.tracking_index import tracking_index
+from keepa.reconciler import reconciler
+from data.tracking_cache import tracking_cache
 from utils.logger import get_logger
+from utils.tracing import tracer, new_trace_id, current_trace_id
 
 # Importar a nova função de exclusão de rastreamento
 from keepa.api import delete_keepa_tracking
@@ -22,12 +29,192 @@ settings = load_settings()
 
 # Inicializar variáveis globais
 # Isso será compartilhado com handlers.py
-driver_sessions = {}
 post_info = load_post_info()
 
+# Atualização mais recente de cada (conta, ASIN): {"task", "waiting", "comment", "price", "trace_id"}
+# "waiting" indica que a tarefa ainda aguarda a janela de coalescência; um DELETE em
+# andamento ocupa a entrada (sem "waiting") para que a atualização anterior não seja retomada
+pending_updates = {}
+
+def resolve_account_identifier(source, comment):
+    """
+    Determinar a conta Keepa para um post/comentário
+    
+    Usa a fonte do post se for uma conta configurada, depois a terceira parte
+    do comentário ("ASIN, preço, conta") e, por fim, a conta padrão.
+    
+    Args:
+        source: Fonte extraída do post original
+        comment: Texto do comentário (pode ser vazio)
+        
+    Returns:
+        str: Identificador da conta
+    """
+    # Usar fonte como identificador de conta se existir em nossas contas
+    for acc_key in settings.KEEPA_ACCOUNTS.keys():
+        if source.lower() == acc_key.lower():
+            logger.info(f"Usando fonte como identificador de conta: {acc_key}")
+            return acc_key
+    
+    # Se a fonte não for uma conta válida, verificar se há uma terceira parte no comentário
+    parts = (comment or "").strip().split(',')
+    if len(parts) >= 3:
+        potential_account = parts[2].strip()
+        if potential_account in settings.KEEPA_ACCOUNTS:
+            logger.info(f"Usando parte do comentário como identificador de conta: {potential_account}")
+            return potential_account
+    
+    # Se ainda não tiver uma conta válida, usar a padrão
+    logger.info(f"Nenhuma conta válida encontrada, usando a padrão: {settings.DEFAULT_KEEPA_ACCOUNT}")
+    return settings.DEFAULT_KEEPA_ACCOUNT
+
+def _log_prefetch_result(future):
+    """Registrar falhas do pré-carregamento, que não tem ninguém aguardando o resultado"""
+    if not future.cancelled() and future.exception():
+        logger.warning(f"⚠️ Falha no pré-carregamento: {future.exception()}")
+
+def schedule_prefetch(asin, source):
+    """
+    Enfileirar a abertura da página do produto no driver aquecido da conta
+    
+    Só é feito quando a conta já tem um driver logado, para não pagar
+    inicialização e login por um post que talvez nunca receba comentário.
+    """
+    account_identifier = resolve_account_identifier(source, "")
+    if not driver_pool.is_warm(account_identifier):
+        logger.info(f"Pré-carregamento de {asin} ignorado: conta {account_identifier} sem driver aquecido")
+        return
+    
+    future = keepa_scheduler.submit(
+        account_identifier, prefetch_product_page, asin,
+        description=f"prefetch {asin}",
+        # Especulativo: só quando não há trabalho real, e no Chrome que receberá a atualização
+        priority=PRIORITY_LOW,
+        instance=0
+    )
+    future.add_done_callback(_log_prefetch_result)
+
+def schedule_price_update(context, asin, source, comment, price, account_identifier):
+    """
+    Agendar a atualização de preço agrupando comentários seguidos do mesmo ASIN
+    
+    Um comentário novo para o mesmo (conta, ASIN) cancela a atualização que ainda
+    aguarda a janela KEEPA_COALESCE_WINDOW e remove da fila da conta o job que
+    ainda não começou. Apenas o preço mais recente é aplicado; os substituídos
+    são informados no chat de destino.
+    """
+    key = (account_identifier, asin)
+    _supersede_pending_update(context, key, source)
+    
+    task = context.application.create_task(_traced_comment(
+        _coalesced_price_update, context, key, asin, source, comment, price, account_identifier,
+        asin=asin, account=account_identifier, action="update"
+    ))
+    pending_updates[key] = {
+        "task": task, "waiting": True, "comment": comment, "price": price, "trace_id": current_trace_id()
+    }
+
+def _supersede_pending_update(context, key, source):
+    """
+    Substituir a atualização pendente de um (conta, ASIN) por um comentário mais recente
+    
+    Cancela a tarefa que ainda aguarda a janela de coalescência (avisando no
+    chat de destino) e remove da fila da conta o job que ainda não começou.
+    """
+    account_identifier, asin = key
+    previous = pending_updates.get(key)
+    if previous is not None and previous["waiting"]:
+        # O aviso sai daqui: uma tarefa cancelada antes de começar não chega a tratar o cancelamento
+        previous["task"].cancel()
+        logger.info(f"⏭️ Preço {previous['price']} do ASIN {asin} substituído por comentário mais recente")
+        with tracer.trace(previous["trace_id"]):
+            context.application.create_task(
+                send_superseded_notice(context, asin, source, previous["comment"], previous["price"])
+            )
+    keepa_scheduler.supersede(account_identifier, update_job_key(asin))
+
+def _is_superseded(key):
+    """Verificar se chegou um comentário mais recente para o mesmo (conta, ASIN)"""
+    entry = pending_updates.get(key)
+    return entry is not None and entry["task"] is not asyncio.current_task()
+
+async def _traced_comment(handler, *args, **attrs):
+    """
+    Executar o tratamento de um comentário dentro do span "comentário" (do recebimento ao aviso final)
+
+    A corrotina só é criada quando a tarefa começa: uma tarefa cancelada antes
+    disso (comentário substituído) não deixa corrotina sem await.
+    """
+    with tracer.span("comentário", **attrs):
+        await handler(*args)
+
+async def _coalesced_price_update(context, key, asin, source, comment, price, account_identifier):
+    """Aguardar a janela de coalescência e então aplicar o preço"""
+    try:
+        if settings.KEEPA_COALESCE_WINDOW:
+            with tracer.span("coalescência", asin=asin):
+                await asyncio.sleep(settings.KEEPA_COALESCE_WINDOW)
+    except asyncio.CancelledError:
+        return
+    
+    # Um DELETE ou preço mais recente pode ter tomado a entrada sem cancelar esta tarefa
+    if _is_superseded(key):
+        logger.info(f"⏭️ Preço {price} do ASIN {asin} substituído por comentário mais recente")
+        return
+    
+    # Depois da janela o job vai para a fila; novos comentários o substituem por lá
+    pending_updates[key]["waiting"] = False
+    
+    try:
+        await handle_price_update(context, asin, source, comment, price, account_identifier, coalesce_key=key)
+    finally:
+        if pending_updates.get(key, {}).get("task") is asyncio.current_task():
+            del pending_updates[key]
+
+async def send_destination_message(context, formatted_message, asin=None, notify_admin=False):
+    """
+    Enviar uma mensagem já formatada para o chat de destino
+    
+    Args:
+        context: Contexto do Telegram
+        formatted_message: Texto gerado por format_destination_message
+        asin: ASIN do produto (atributo do span)
+        notify_admin: Avisar o administrador se o envio falhar
+    """
+    try:
+        if settings.DESTINATION_CHAT_ID:
+            with tracer.span("telegram: destino", asin=asin):
+                await context.bot.send_message(
+                    chat_id=settings.DESTINATION_CHAT_ID,
+                    text=formatted_message,
+                    parse_mode=ParseMode.MARKDOWN,
+                    disable_web_page_preview=True
+                )
+            logger.info(f"Informações do ASIN {asin} enviadas para o chat {settings.DESTINATION_CHAT_ID}")
+    except Exception as e:
+        logger.error(f"Erro ao enviar mensagem para o grupo de destino: {e}")
+        if notify_admin:
+            await send_admin_message(context, f"❌ Erro ao enviar mensagem para o grupo de destino: {e}")
+
+async def send_admin_message(context, text):
+    """Notificar o administrador, se configurado"""
+    if settings.ADMIN_ID:
+        with tracer.span("telegram: admin"):
+            await context.bot.send_message(chat_id=settings.ADMIN_ID, text=text)
+
+async def send_superseded_notice(context, asin, source, comment, price):
+    """Informar no chat de destino que um preço foi substituído antes de ser aplicado"""
+    await send_destination_message(context, format_destination_message(
+        asin=asin,
+        comment=comment,
+        source=source,
+        price=price,
+        action="superseded"
+    ), asin=asin)
+
 async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Processar mensagens do canal/grupo e identificar posts e comentários."""
-    global post_info, driver_sessions
+    global post_info
     
     if not settings.SOURCE_CHAT_ID:
         return
@@ -62,6 +249,10 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             "timestamp": datetime.now().isoformat()
         }
         save_post_info(post_info)
+        
+        # Pré-carregar a página do produto enquanto o comentário com o preço não chega
+        if settings.KEEPA_PREFETCH:
+            schedule_prefetch(asin, source)
     
     # Verificar se este é um comentário em um post rastreado
     elif message.reply_to_message:
@@ -73,142 +264,127 @@ async def process_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             asin = post_info[replied_message_id]["asin"]
             source = post_info[replied_message_id]["source"]
             comment = message_text.strip()
+            # Cada comentário ganha um id de correlação, herdado pelas tarefas e jobs criados a partir dele
+            trace_id = new_trace_id()
             
-            logger.info(f"Comentário identificado para ASIN {asin}: {comment}")
+            logger.info(f"Comentário identificado para ASIN {asin} (trace {trace_id}): {comment}")
             logger.info(f"Fonte do post original: {source}")
             
             # Verificar comando DELETE
             if re.search(r'\bDELETE\b', comment, re.IGNORECASE):
                 logger.info(f"🗑️ Comando DELETE detectado para ASIN {asin}")
-                await handle_delete_comment(context, asin, source, comment)
+                # Executar em segundo plano para não bloquear o processamento de novas mensagens
+                with tracer.trace(trace_id):
+                    context.application.create_task(_traced_comment(
+                        handle_delete_comment, context, asin, source, comment, asin=asin, action="delete"
+                    ))
                 return
             
             # Extrair preço do comentário
             price = extract_price_from_comment(comment)
             
-            # Usar fonte como identificador de conta se existir em nossas contas
-            account_identifier = None
-            if source.lower() in [acc.lower() for acc in settings.KEEPA_ACCOUNTS.keys()]:
-                # Encontrar a chave correta com case matching
-                for acc_key in settings.KEEPA_ACCOUNTS.keys():
-                    if source.lower() == acc_key.lower():
-                        account_identifier = acc_key
-                        break
-                logger.info(f"Usando fonte como identificador de conta: {account_identifier}")
-            else:
-                # Se a fonte não for uma conta válida, verificar se há uma terceira parte no comentário
-                parts = comment.strip().split(',')
-                if len(parts) >= 3:
-                    potential_account = parts[2].strip()
-                    if potential_account in settings.KEEPA_ACCOUNTS:
-                        account_identifier = potential_account
-                        logger.info(f"Usando parte do comentário como identificador de conta: {account_identifier}")
-            
-            # Se ainda não tiver uma conta válida, usar a padrão
-            if not account_identifier:
-                account_identifier = settings.DEFAULT_KEEPA_ACCOUNT
-                logger.info(f"Nenhuma conta válida encontrada, usando a padrão: {account_identifier}")
+            account_identifier = resolve_account_identifier(source, comment)
             
             if price:
                 logger.info(f"Preço extraído do comentário: {price}")
-                await handle_price_update(context, asin, source, comment, price, account_identifier)
+                # Executar em segundo plano, agrupando correções seguidas do mesmo ASIN
+                with tracer.trace(trace_id):
+                    schedule_price_update(context, asin, source, comment, price, account_identifier)
             else:
                 logger.warning(f"⚠️ Não foi possível extrair preço do comentário: {comment}")
                 
                 # Notificar administrador
-                if settings.ADMIN_ID:
-                    await context.bot.send_message(
-                        chat_id=settings.ADMIN_ID,
-                        text=f"⚠️ Não foi possível extrair preço do comentário para ASIN {asin}: {comment}"
-                    )
+                await send_admin_message(context, f"⚠️ Não foi possível extrair preço do comentário para ASIN {asin}: {comment}")
 
-async def handle_price_update(context, asin, source, comment, price, account_identifier):
+async def handle_price_update(context, asin, source, comment, price, account_identifier, coalesce_key=None):
     """
     Gerenciar atualização de preço no Keepa com mecanismo de retry
+    
+    Com coalesce_key, as novas tentativas são abandonadas se chegar um
+    comentário mais recente para o mesmo (conta, ASIN). O driver não é
+    recriado a cada falha: o disjuntor da conta no agendador decide quando
+    reciclar o Chrome e segura a nova tentativa na fila enquanto a conta
+    estiver pausada.
     """
     update_success = False
-    driver = None
     max_retries = 3
+    # Espera da primeira nova tentativa quando a conta continua saudável (dobra a cada tentativa)
+    retry_base_delay = 5
+    
+    # O reconciliador confere depois que este preço chegou ao Keepa
+    reconciler.set_desired_price(account_identifier, asin, price)
+    
+    # Pular o navegador se este preço já foi aplicado recentemente ou aparece na lista de rastreamento
+    if tracking_cache.is_applied(account_identifier, asin, price) or tracking_index.is_applied(account_identifier, asin, price):
+        logger.info(f"✅ ASIN {asin} já está com preço {price} na conta {account_identifier}, nada a fazer")
+        tracking_cache.record(account_identifier, asin, price)
+        await send_destination_message(context, format_destination_message(
+            asin=asin,
+            comment=comment,
+            source=source,
+            price=price,
+            action="unchanged"
+        ), asin=asin)
+        return
     
     for attempt in range(1, max_retries + 1):
+        if attempt > 1 and coalesce_key and _is_superseded(coalesce_key):
+            logger.info(f"⏭️ Novas tentativas do ASIN {asin} abandonadas: há um comentário mais recente")
+            await send_superseded_notice(context, asin, source, comment, price)
+            return
+        
         try:
             logger.info(f"Tentativa {attempt}/{max_retries} para atualizar ASIN {asin}")
             
-            # Sempre inicializar um novo driver para cada atualização de preço
-            driver = initialize_driver(account_identifier)
-            login_success = login_to_keepa(driver, account_identifier)
-            
-            if login_success:
-                update_success = update_keepa_product(driver, asin, price)
-                if update_success:
-                    logger.info(f"✅ ASIN {asin} atualizado com sucesso no Keepa com preço {price}")
-                    
-                    # Notificar administrador
-                    if settings.ADMIN_ID:
-                        await context.bot.send_message(
-                            chat_id=settings.ADMIN_ID,
-                            text=f"✅ ASIN {asin} atualizado com preço {price} usando conta {account_identifier}"
-                        )
-                    break  # Sair do loop se sucesso
-                else:
-                    logger.error(f"❌ Falha ao atualizar ASIN {asin} no Keepa (tentativa {attempt})")
-            else:
-                logger.error(f"❌ Falha ao fazer login no Keepa com a conta {account_identifier} (tentativa {attempt})")
+            # Enfileirar na fila da conta; contas diferentes são processadas em paralelo
+            # Com o reconciliador ativo, a escrita não espera a confirmação da página
+            update_success = await keepa_scheduler.submit(
+                account_identifier, update_keepa_product, asin, price, not reconciler.enabled,
+                description=f"update {asin}",
+                key=update_job_key(asin)
+            )
+            if update_success:
+                logger.info(f"✅ ASIN {asin} atualizado com sucesso no Keepa com preço {price}")
+                tracking_cache.record(account_identifier, asin, price)
+                tracking_index.mark_applied(account_identifier, asin, price)
                 
-                # Limpar a sessão para a próxima tentativa
-                if attempt < max_retries:
-                    logger.info(f"Limpando a sessão para a tentativa {attempt+1}")
-                    # Implemente limpeza seletiva (ou use o driver.delete_all_cookies())
-                    driver.delete_all_cookies()
-                    
-            if attempt < max_retries and not update_success:
-                wait_time = attempt * 5  # Backoff exponencial
-                logger.info(f"Aguardando {wait_time} segundos antes da próxima tentativa...")
-                await asyncio.sleep(wait_time)
+                # Notificar administrador
+                await send_admin_message(context, f"✅ ASIN {asin} atualizado com preço {price} usando conta {account_identifier}")
+                break  # Sair do loop se sucesso
+            else:
+                logger.error(f"❌ Falha ao atualizar ASIN {asin} no Keepa (tentativa {attempt})")
                 
+        except JobSuperseded:
+            logger.info(f"⏭️ Preço {price} do ASIN {asin} substituído por comentário mais recente")
+            await send_superseded_notice(context, asin, source, comment, price)
+            return
+        except (KeepaLoginError, KeepaCaptchaError) as e:
+            logger.error(f"❌ {str(e)} (tentativa {attempt})")
         except Exception as e:
             logger.error(f"❌ Erro ao atualizar preço no Keepa (tentativa {attempt}): {str(e)}")
-            if attempt < max_retries:
-                wait_time = attempt * 5
-                logger.info(f"Aguardando {wait_time} segundos antes da próxima tentativa...")
-                await asyncio.sleep(wait_time)
-        finally:
-            # Importante: Sempre fechar o driver para liberar recursos
-            if driver:
-                try:
-                    driver.quit()
-                    logger.info(f"Sessão do driver Chrome fechada para a conta {account_identifier}")
-                except Exception as e:
-                    logger.error(f"Erro ao fechar o driver Chrome: {str(e)}")
+            
+        if attempt < max_retries and not update_success:
+            if not circuit_breakers.is_closed(account_identifier):
+                # Conta pausada: a nova tentativa espera na fila até o disjuntor liberar
+                logger.info(f"Conta {account_identifier} pausada pelo disjuntor, nova tentativa aguardará na fila")
+                continue
+            wait_time = backoff_delay(attempt, retry_base_delay)
+            logger.info(f"Aguardando {wait_time:.1f} segundos antes da próxima tentativa...")
+            await asyncio.sleep(wait_time)
     
+    if not update_success:
+        # Estado no Keepa desconhecido após falha
+        tracking_cache.invalidate(account_identifier, asin)
     
-    # Formatar e enviar a mensagem informativa para o canal de destino
-    formatted_message = format_destination_message(
+    # Enviar a mensagem informativa para o canal de destino
+    await send_destination_message(context, format_destination_message(
         asin=asin,
         comment=comment,
         source=source,
         price=price,
         action="update",
         success=update_success
-    )
-    
-    # Enviar para o grupo de destino
-    try:
-        if settings.DESTINATION_CHAT_ID:
-            await context.bot.send_message(
-                chat_id=settings.DESTINATION_CHAT_ID,
-                text=formatted_message,
-                parse_mode=ParseMode.MARKDOWN,
-                disable_web_page_preview=True
-            )
-            logger.info(f"Informações detalhadas enviadas para o chat {settings.DESTINATION_CHAT_ID}")
-    except Exception as e:
-        logger.error(f"Erro ao enviar mensagem para o grupo de destino: {e}")
-        if settings.ADMIN_ID:
-            await context.bot.send_message(
-                chat_id=settings.ADMIN_ID,
-                text=f"❌ Erro ao enviar mensagem para o grupo de destino: {e}"
-            )
+    ), asin=asin, notify_admin=True)
 
 async def handle_delete_comment(context, asin, source, comment):
     """
@@ -220,106 +396,59 @@ async def handle_delete_comment(context, asin, source, comment):
         source: Identificador da fonte
         comment: Comentário do usuário
     """
-    account_identifier = None
+    account_identifier = resolve_account_identifier(source, comment)
     delete_success = False
-    driver = None
     
-    # Usar fonte como identificador de conta se existir em nossas contas
-    if source.lower() in [acc.lower() for acc in settings.KEEPA_ACCOUNTS.keys()]:
-        # Encontrar a chave correta com case matching
-        for acc_key in settings.KEEPA_ACCOUNTS.keys():
-            if source.lower() == acc_key.lower():
-                account_identifier = acc_key
-                break
-        logger.info(f"Usando fonte como identificador de conta: {account_identifier}")
-    else:
-        # Se a fonte não for uma conta válida, verificar se há uma terceira parte no comentário
-        parts = comment.strip().split(',')
-        if len(parts) >= 3:
-            potential_account = parts[2].strip()
-            if potential_account in settings.KEEPA_ACCOUNTS:
-                account_identifier = potential_account
-                logger.info(f"Usando parte do comentário como identificador de conta para exclusão: {account_identifier}")
+    # Um preço anterior ainda na janela de coalescência ou na fila recriaria o alerta depois da exclusão
+    key = (account_identifier, asin)
+    _supersede_pending_update(context, key, source)
+    pending_updates[key] = {"task": asyncio.current_task(), "waiting": False}
     
-    # Se ainda não tiver uma conta válida, usar a padrão
-    if not account_identifier:
-        account_identifier = settings.DEFAULT_KEEPA_ACCOUNT
-        logger.info(f"Nenhuma conta válida encontrada para exclusão, usando a padrão: {account_identifier}")
+    # O estado em cache deixa de valer mesmo se a exclusão falhar no meio
+    tracking_cache.invalidate(account_identifier, asin)
+    reconciler.set_desired_deleted(account_identifier, asin)
     
     try:
-        # Inicializar um novo driver
-        driver = initialize_driver(account_identifier)
-        login_success = login_to_keepa(driver, account_identifier)
-        
-        if login_success:
-            delete_success = delete_keepa_tracking(driver, asin)
-            if delete_success:
-                logger.info(f"✅ Rastreamento do ASIN {asin} excluído com sucesso usando conta {account_identifier}")
-                
-                # Notificar administrador
-                if settings.ADMIN_ID:
-                    await context.bot.send_message(
-                        chat_id=settings.ADMIN_ID,
-                        text=f"✅ Rastreamento do ASIN {asin} excluído usando conta {account_identifier}"
-                    )
-            else:
-                logger.error(f"❌ Falha ao excluir rastreamento do ASIN {asin}")
-                
-                # Notificar administrador
-                if settings.ADMIN_ID:
-                    await context.bot.send_message(
-                        chat_id=settings.ADMIN_ID,
-                        text=f"❌ Falha ao excluir rastreamento do ASIN {asin} usando conta {account_identifier}"
-                    )
+        if tracking_index.is_untracked(account_identifier, asin):
+            # A lista de rastreamento recente mostra que não há alerta para excluir
+            logger.info(f"ASIN {asin} não está na lista de rastreamento da conta {account_identifier}")
+            delete_success = True
         else:
-            logger.error(f"❌ Falha ao fazer login no Keepa com a conta {account_identifier}")
+            delete_success = await keepa_scheduler.submit(
+                account_identifier, delete_keepa_tracking, asin,
+                description=f"delete {asin}",
+                priority=PRIORITY_DELETE
+            )
+        if delete_success:
+            tracking_index.mark_deleted(account_identifier, asin)
+            logger.info(f"✅ Rastreamento do ASIN {asin} excluído com sucesso usando conta {account_identifier}")
             
             # Notificar administrador
-            if settings.ADMIN_ID:
-                await context.bot.send_message(
-                    chat_id=settings.ADMIN_ID,
-                    text=f"❌ Falha ao fazer login no Keepa com a conta {account_identifier} para exclusão"
-                )
+            await send_admin_message(context, f"✅ Rastreamento do ASIN {asin} excluído usando conta {account_identifier}")
+        else:
+            logger.error(f"❌ Falha ao excluir rastreamento do ASIN {asin}")
+            
+            # Notificar administrador
+            await send_admin_message(context, f"❌ Falha ao excluir rastreamento do ASIN {asin} usando conta {account_identifier}")
+    except KeepaLoginError as e:
+        logger.error(f"❌ {str(e)}")
+        
+        # Notificar administrador
+        await send_admin_message(context, f"❌ Falha ao fazer login no Keepa com a conta {account_identifier} para exclusão")
     except Exception as e:
         logger.error(f"❌ Erro ao excluir rastreamento no Keepa: {str(e)}")
         
         # Notificar administrador
-        if settings.ADMIN_ID:
-            await context.bot.send_message(
-                chat_id=settings.ADMIN_ID,
-                text=f"❌ Erro ao excluir rastreamento no Keepa com a conta {account_identifier}: {str(e)}"
-            )
-    finally:
-        # Sempre fechar o driver para liberar recursos
-        if driver:
-            try:
-                driver.quit()
-                logger.info(f"Sessão do driver Chrome fechada para a conta {account_identifier}")
-            except Exception as e:
-                logger.error(f"Erro ao fechar o driver Chrome: {str(e)}")
+        await send_admin_message(context, f"❌ Erro ao excluir rastreamento no Keepa com a conta {account_identifier}: {str(e)}")
+    
+    if pending_updates.get(key, {}).get("task") is asyncio.current_task():
+        del pending_updates[key]
     
-    # Formatar e enviar a mensagem informativa para o canal de destino
-    formatted_message = format_destination_message(
+    # Enviar a mensagem informativa para o canal de destino
+    await send_destination_message(context, format_destination_message(
         asin=asin,
         comment=comment,
         source=source,
         action="delete",
         success=delete_success
-    )
-    
-    # Enviar para o grupo de destino
-    try:
-        if settings.DESTINATION_CHAT_ID:
-            await context.bot.send_message(
-                chat_id=settings.DESTINATION_CHAT_ID,
-                text=formatted_message,
-                parse_mode=ParseMode.MARKDOWN
-            )
-            logger.info(f"Informações de exclusão enviadas para o chat {settings.DESTINATION_CHAT_ID}")
-    except Exception as e:
-        logger.error(f"Erro ao enviar mensagem de exclusão para o grupo de destino: {e}")
-        if settings.ADMIN_ID:
-            await context.bot.send_message(
-                chat_id=settings.ADMIN_ID,
-                text=f"❌ Erro ao enviar mensagem de exclusão para o grupo de destino: {e}"
-            )
\ No newline at end of file
+    ), asin=asin, notify_admin=True)
@@ -0,0 +1,646 @@
+"""
+Replay de tráfego do Telegram pelo process_message, para comparar mudanças no agendador e no pool
+
+Lê um tráfego gravado (JSONL) ou sintetiza um a partir do post_info.json
+(posts com ASIN seguidos de comentários de preço, correções rápidas e
+DELETE), entrega cada mensagem ao process_message com um bot falso no ritmo
+original e mede cada etapa até a mensagem final no chat de destino.
+
+O backend do Keepa é plugável:
+    simulated  sem navegador; latências de login, página e formulário sorteadas
+    browser    o pool real de Chrome (com --fake-server, contra keepa/fake_server.py)
+
+Os arquivos do bot (post_info, cache, estado desejado, sessões) ficam em um
+diretório temporário, sem tocar nos dados de produção.
+
+Uso:
+    # Tráfego sintetizado com 2 posts/s (--rate), reproduzido no dobro do ritmo (--speed)
+    python -m bot.replay --posts post_info.json --limit 50 --comments-per-post 2 --rate 2 --speed 2 \
+        --seed 1 --save-traffic traffic.jsonl --json result.json
+    # O mesmo tráfego no Chrome real, contra o servidor falso do Keepa
+    python -m bot.replay --traffic traffic.jsonl --backend browser --fake-server
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from types import SimpleNamespace
+from typing import Optional
+
+# Os módulos do bot leem as configurações ao serem importados, então só são
+# importados depois de prepare_environment (ver run_replay)
+
+SOURCE_CHAT = "replay-origem"
+DESTINATION_CHAT = "replay-destino"
+ADMIN_CHAT = "replay-admin"
+
+# Etapas medidas, na ordem do fluxo de um comentário
+STAGES = ("handler", "coalesce", "queue", "keepa", "end_to_end")
+
+_POST_ASIN_PATTERN = re.compile(r"amazon\.com\.br/dp/([A-Z0-9]{10})")
+_DESTINATION_ASIN_PATTERN = re.compile(r"^\*([A-Z0-9]{10})\*")
+
+
+@dataclass
+class ReplayEvent:
+    """Mensagem do tráfego: post do canal (reply_to None) ou comentário respondendo a um post"""
+    at: float
+    message_id: int
+    text: str
+    reply_to: Optional[int] = None
+
+
+def load_traffic(path):
+    """Ler um tráfego gravado em JSONL (um ReplayEvent por linha)"""
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                events.append(ReplayEvent(**json.loads(line)))
+    return sorted(events, key=lambda event: event.at)
+
+
+def save_traffic(events, path):
+    """Gravar o tráfego em JSONL para repetir exatamente a mesma carga depois"""
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(asdict(event), ensure_ascii=False) + "\n")
+
+
+def _price_text(rng):
+    return f"R$ {rng.uniform(20, 500):.2f}".replace(".", ",")
+
+
+def synthesize_traffic(post_info, limit=None, comments_per_post=1, correction_ratio=0.2,
+                       delete_ratio=0.05, rate=2.0, comment_delay=3.0, seed=None):
+    """
+    Montar um tráfego a partir dos posts registrados no post_info.json
+
+    Args:
+        post_info: Dicionário message_id -> {"asin", "source", ...}
+        limit: Número máximo de posts
+        comments_per_post: Comentários de preço por post
+        correction_ratio: Fração dos comentários seguida de uma correção rápida
+                          (cai na janela de coalescência)
+        delete_ratio: Fração dos comentários que são DELETE
+        rate: Posts por segundo (chegadas de Poisson)
+        comment_delay: Tempo médio entre um post e seus comentários (segundos)
+        seed: Semente do sorteio
+
+    Returns:
+        list: ReplayEvent em ordem de chegada
+    """
+    rng = random.Random(seed)
+    posts = sorted(
+        ((int(message_id), post) for message_id, post in post_info.items() if str(message_id).isdigit()),
+        key=lambda item: item[0]
+    )[:limit]
+    next_id = max((message_id for message_id, _ in posts), default=0) + 1
+
+    events = []
+    clock = 0.0
+    for message_id, post in posts:
+        clock += rng.expovariate(rate)
+        events.append(ReplayEvent(
+            clock, message_id,
+            f"Oferta https://www.amazon.com.br/dp/{post['asin']}\nFonte: {post.get('source', 'Desconhecido')}"
+        ))
+        at = clock
+        for _ in range(comments_per_post):
+            at += rng.expovariate(1 / comment_delay)
+            text = "DELETE" if rng.random() < delete_ratio else _price_text(rng)
+            events.append(ReplayEvent(at, next_id, text, message_id))
+            next_id += 1
+            if text != "DELETE" and rng.random() < correction_ratio:
+                at += rng.uniform(0.5, 2.0)
+                events.append(ReplayEvent(at, next_id, _price_text(rng), message_id))
+                next_id += 1
+    return sorted(events, key=lambda event: event.at)
+
+
+def percentile(values, fraction):
+    """Percentil pelo método do posto mais próximo"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class StageRecorder:
+    """Durações por etapa, resumidas em percentis"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Por etapa, count, mean, p50, p95, p99 e max (segundos)
+        """
+        return {
+            stage: {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+                "max": max(values),
+            }
+            for stage, values in sorted(self.samples.items(), key=lambda item: STAGES.index(item[0]))
+        }
+
+
+class ReplayTracker:
+    """
+    Acompanhar cada comentário pelas etapas, correlacionando pelo ASIN
+
+    Comentários do mesmo ASIN são tratados em ordem de chegada: a primeira
+    mensagem de destino do ASIN encerra o comentário mais antigo pendente.
+    """
+
+    def __init__(self):
+        self.recorder = StageRecorder()
+        self.outcomes = {"success": 0, "failed": 0, "unchanged": 0, "superseded": 0}
+        self.admin_messages = 0
+        self.last_completion = None
+        self._post_asins = {}
+        self._comments = {}
+        self._last_comment = {}
+        self._coalesce_measured = {}
+        self._submitted = {}
+
+    def message_received(self, event, received_at):
+        """Registrar uma mensagem entregue ao process_message; retorna o ASIN do comentário, se houver"""
+        if event.reply_to is None:
+            match = _POST_ASIN_PATTERN.search(event.text)
+            if match:
+                self._post_asins[event.message_id] = match.group(1)
+            return None
+        asin = self._post_asins.get(event.reply_to)
+        if asin is not None:
+            self._comments.setdefault(asin, deque()).append(received_at)
+            self._last_comment[asin] = received_at
+        return asin
+
+    def job_submitted(self, asin):
+        now = time.monotonic()
+        last_comment = self._last_comment.get(asin)
+        # Novas tentativas do mesmo comentário não contam outra vez como coalescência
+        if last_comment is not None and self._coalesce_measured.get(asin) != last_comment:
+            self._coalesce_measured[asin] = last_comment
+            self.recorder.add("coalesce", now - last_comment)
+        # Um job ainda na fila é substituído pelo mais recente do mesmo ASIN
+        self._submitted[asin] = now
+
+    def job_started(self, asin, started_at):
+        submitted = self._submitted.pop(asin, None)
+        if submitted is not None:
+            self.recorder.add("queue", started_at - submitted)
+
+    def bot_message(self, chat_id, text):
+        if chat_id == ADMIN_CHAT:
+            self.admin_messages += 1
+            return
+        match = _DESTINATION_ASIN_PATTERN.match(text)
+        pending = self._comments.get(match.group(1)) if match else None
+        if chat_id != DESTINATION_CHAT or not pending:
+            return
+
+        received_at = pending.popleft()
+        if "Substituído" in text:
+            outcome = "superseded"
+        elif "Sem alterações" in text:
+            outcome = "unchanged"
+        elif "❌" in text:
+            outcome = "failed"
+        else:
+            outcome = "success"
+        self.outcomes[outcome] += 1
+        self.last_completion = time.monotonic()
+        if outcome != "superseded":
+            self.recorder.add("end_to_end", self.last_completion - received_at)
+
+    @property
+    def pending(self):
+        return sum(len(times) for times in self._comments.values())
+
+
+class FakeBot:
+    """Bot do Telegram falso: registra as mensagens enviadas, com latência opcional"""
+
+    def __init__(self, tracker, latency=0.0):
+        self._tracker = tracker
+        self._latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        self.sent += 1
+        self._tracker.bot_message(str(chat_id), text)
+        return SimpleNamespace(message_id=self.sent, chat_id=chat_id, text=text)
+
+
+class FakeApplication:
+    """Substituto de context.application: guarda as tarefas em segundo plano para aguardá-las no fim"""
+
+    def __init__(self):
+        self.tasks = set()
+
+    def create_task(self, coroutine):
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def drain(self, timeout):
+        """Aguardar as tarefas pendentes (inclusive as criadas durante a espera)"""
+        deadline = time.monotonic() + timeout
+        while self.tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.wait(list(self.tasks), timeout=remaining)
+        return True
+
+
+def _make_update(event):
+    chat = SimpleNamespace(id=SOURCE_CHAT)
+    reply = SimpleNamespace(message_id=event.reply_to) if event.reply_to is not None else None
+    message = SimpleNamespace(
+        message_id=event.message_id, text=event.text, caption=None,
+        sender_chat=None, reply_to_message=reply, chat=chat
+    )
+    return SimpleNamespace(message=message, channel_post=None, effective_chat=chat)
+
+
+@dataclass
+class SimulatedLatencies:
+    """Tempos médios (segundos) e taxa de falha do backend simulado"""
+    login: float = 6.0
+    page_load: float = 2.0
+    form: float = 0.8
+    tracking_list: float = 4.0
+    jitter: float = 0.3
+    failure_rate: float = 0.0
+
+
+class SimulatedKeepaPool:
+    """
+    Backend sem navegador com a mesma interface usada pelo agendador (run_async, discard_async, is_warm)
+
+    Cada operação dorme o tempo sorteado de login (primeiro uso da instância),
+    carregamento da página e preenchimento do formulário, na thread do
+    executor do Keepa, como o pool real. Em um grupo de abas as páginas
+    carregam em paralelo e só os formulários são sequenciais.
+    """
+
+    def __init__(self, latencies, seed=None):
+        self.latencies = latencies
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._warm = set()
+        self.alerts = {}
+
+    def _jittered(self, seconds):
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.latencies.jitter, self.latencies.jitter)
+        return max(0.0, seconds * factor)
+
+    def _failed(self):
+        with self._lock:
+            return self._random.random() < self.latencies.failure_rate
+
+    def _apply(self, account_identifier, operation, asin, args):
+        from keepa.api import update_keepa_product
+
+        time.sleep(self._jittered(self.latencies.form))
+        if self._failed():
+            return False
+        alerts = self.alerts.setdefault(account_identifier, {})
+        if operation is update_keepa_product:
+            alerts[asin] = args[0]
+        else:
+            alerts.pop(asin, None)
+        return True
+
+    def run(self, account_identifier, operation, *args, instance=0):
+        from keepa.api import update_keepa_product, delete_keepa_tracking, run_product_operations, scrape_tracking_list
+
+        slot = (account_identifier, instance)
+        if slot not in self._warm:
+            time.sleep(self._jittered(self.latencies.login))
+            self._warm.add(slot)
+
+        if operation is run_product_operations:
+            operations = args[0]
+            time.sleep(max(self._jittered(self.latencies.page_load) for _ in operations))
+            return [
+                (True, self._apply(account_identifier, product_operation, asin, rest))
+                for product_operation, asin, *rest in operations
+            ]
+        if operation in (update_keepa_product, delete_keepa_tracking):
+            time.sleep(self._jittered(self.latencies.page_load))
+            return self._apply(account_identifier, operation, args[0], args[1:])
+        if operation is scrape_tracking_list:
+            time.sleep(self._jittered(self.latencies.tracking_list))
+            return dict(self.alerts.get(account_identifier, {})), True
+        # Aquecer o driver, teste de login e pré-carregamento
+        return True
+
+    async def run_async(self, account_identifier, operation, *args, instance=0):
+        from keepa.api import run_blocking
+
+        return await run_blocking(self.run, account_identifier, operation, *args, instance=instance)
+
+    async def discard_async(self, account_identifier, instance=None):
+        self._warm = {
+            slot for slot in self._warm
+            if slot[0] != account_identifier or (instance is not None and slot[1] != instance)
+        }
+
+    def is_warm(self, account_identifier, instance=0):
+        return (account_identifier, instance) in self._warm
+
+
+class InstrumentedPool:
+    """Repassar as operações ao backend medindo a espera na fila e a execução de cada ASIN"""
+
+    def __init__(self, inner, tracker):
+        self._inner = inner
+        self._tracker = tracker
+
+    @staticmethod
+    def _asins(operation, args):
+        from keepa.api import update_keepa_product, delete_keepa_tracking, run_product_operations
+
+        if operation is run_product_operations:
+            return [asin for _, asin, *_ in args[0]]
+        if operation in (update_keepa_product, delete_keepa_tracking):
+            return [args[0]]
+        return []
+
+    async def run_async(self, account_identifier, operation, *args, instance=0):
+        asins = self._asins(operation, args)
+        started = time.monotonic()
+        for asin in asins:
+            self._tracker.job_started(asin, started)
+        try:
+            return await self._inner.run_async(account_identifier, operation, *args, instance=instance)
+        finally:
+            for _ in asins:
+                self._tracker.recorder.add("keepa", time.monotonic() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def prepare_environment(workdir, base_url=None):
+    """
+    Isolar os arquivos do bot no diretório do replay
+
+    Precisa rodar antes de importar os módulos do bot, que leem as
+    configurações na importação.
+    """
+    workdir = os.path.abspath(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    os.environ["DATA_FILE"] = os.path.join(workdir, "post_info.json")
+    os.environ["KEEPA_TRACKING_CACHE_FILE"] = os.path.join(workdir, "tracking_cache.json")
+    os.environ["KEEPA_DESIRED_STATE_FILE"] = os.path.join(workdir, "desired_state.json")
+    os.environ["KEEPA_SESSION_DIR"] = os.path.join(workdir, "keepa_sessions")
+    os.environ["CHROME_USER_DATA_DIR"] = os.path.join(workdir, "chrome-sessions")
+    if base_url:
+        os.environ["KEEPA_BASE_URL"] = base_url
+
+    from config.settings import load_settings
+
+    # Valores do .env têm precedência sobre o ambiente: recusar se apontarem para fora do replay
+    settings = load_settings()
+    for name in ("DATA_FILE", "KEEPA_TRACKING_CACHE_FILE", "KEEPA_DESIRED_STATE_FILE"):
+        path = os.path.abspath(getattr(settings, name))
+        if not path.startswith(workdir + os.sep):
+            raise SystemExit(f"{name} do .env aponta para {path}; remova-o do .env para rodar o replay")
+    return workdir
+
+
+async def run_replay(events, backend, speed=1.0, telegram_latency=0.0, coalesce_window=None, drain_timeout=600):
+    """
+    Entregar o tráfego ao process_message e medir as etapas
+
+    Args:
+        events: Lista de ReplayEvent
+        backend: Pool usado pelo agendador (SimulatedKeepaPool ou o driver_pool real)
+        speed: Multiplicador do ritmo gravado (2 = duas vezes mais rápido, 0 = sem pausas)
+        telegram_latency: Latência simulada de cada envio do bot (segundos)
+        coalesce_window: Substituir KEEPA_COALESCE_WINDOW durante o replay
+        drain_timeout: Tempo máximo para as tarefas terminarem depois da última mensagem
+
+    Returns:
+        dict: Resultado com contagens, vazão, resumo por etapa e estado do agendador
+    """
+    from bot import message_processor
+    from keepa.scheduler import keepa_scheduler
+    from keepa.circuit_breaker import circuit_breakers
+    from keepa.rate_limiter import rate_limiters
+    from utils.tracing import tracer
+
+    message_processor.post_info.clear()
+    message_processor.settings.SOURCE_CHAT_ID = SOURCE_CHAT
+    message_processor.settings.DESTINATION_CHAT_ID = DESTINATION_CHAT
+    message_processor.settings.ADMIN_ID = ADMIN_CHAT
+    if coalesce_window is not None:
+        message_processor.settings.KEEPA_COALESCE_WINDOW = coalesce_window
+
+    tracker = ReplayTracker()
+    keepa_scheduler.use_pool(InstrumentedPool(backend, tracker))
+
+    # Medir a saída da coalescência: o momento em que a atualização entra na fila
+    submit = keepa_scheduler.submit
+
+    def instrumented_submit(account_identifier, operation, *args, **kwargs):
+        if getattr(operation, "__name__", "") in ("update_keepa_product", "delete_keepa_tracking"):
+            tracker.job_submitted(args[0])
+        return submit(account_identifier, operation, *args, **kwargs)
+
+    keepa_scheduler.submit = instrumented_submit
+
+    application = FakeApplication()
+    context = SimpleNamespace(bot=FakeBot(tracker, telegram_latency), application=application)
+
+    start = time.monotonic()
+    posts = comments = 0
+    for event in events:
+        if speed > 0:
+            delay = start + event.at / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        received = time.monotonic()
+        asin = tracker.message_received(event, received)
+        if event.reply_to is None:
+            posts += 1
+        elif asin is not None:
+            comments += 1
+        await message_processor.process_message(_make_update(event), context)
+        tracker.recorder.add("handler", time.monotonic() - received)
+    fed = time.monotonic() - start
+
+    drained = await application.drain(drain_timeout)
+    elapsed = (tracker.last_completion or time.monotonic()) - start
+    completed = sum(tracker.outcomes.values())
+
+    result = {
+        "events": len(events),
+        "posts": posts,
+        "comments": comments,
+        "feed_seconds": fed,
+        "elapsed_seconds": elapsed,
+        "completed": completed,
+        "pending": tracker.pending,
+        "drained": drained,
+        "throughput": completed / elapsed if elapsed > 0 else 0.0,
+        "outcomes": dict(tracker.outcomes),
+        "admin_messages": tracker.admin_messages,
+        "stages": tracker.recorder.summary(),
+        "priorities": keepa_scheduler.priority_stats(),
+        "queues": keepa_scheduler.stats(),
+        "breakers": circuit_breakers.stats(),
+        "rate_limits": rate_limiters.stats(),
+        "spans": tracer.stats(),
+    }
+    await keepa_scheduler.shutdown()
+    return result
+
+
+def format_report(result):
+    """Formatar o resultado do replay como texto"""
+    lines = [
+        f"Replay: {result['events']} mensagens ({result['posts']} posts, {result['comments']} comentários) "
+        f"entregues em {result['feed_seconds']:.1f}s",
+        f"Concluídos: {result['completed']} em {result['elapsed_seconds']:.1f}s "
+        f"({result['throughput']:.2f} comentários/s), pendentes: {result['pending']}"
+        + ("" if result["drained"] else " (tempo esgotado)"),
+        "Resultados: " + ", ".join(f"{name} {count}" for name, count in result["outcomes"].items()),
+        "",
+        f"{'etapa':<12}{'n':>6}{'média':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'máx':>9}",
+    ]
+    for stage, info in result["stages"].items():
+        lines.append(
+            f"{stage:<12}{info['count']:>6}{info['mean']:>9.3f}{info['p50']:>9.3f}"
+            f"{info['p95']:>9.3f}{info['p99']:>9.3f}{info['max']:>9.3f}"
+        )
+    lines.append("")
+    lines.append("Espera na fila por prioridade:")
+    for name, info in result["priorities"].items():
+        if info["started"]:
+            lines.append(f"  {name}: {info['started']} jobs, média {info['avg_wait']:.2f}s, máx. {info['max_wait']:.2f}s")
+    for account_identifier, info in result["breakers"].items():
+        if info["opened_total"]:
+            lines.append(f"Disjuntor {account_identifier}: aberto {info['opened_total']}x ({info['last_reason']})")
+    for account_identifier, info in result["rate_limits"].items():
+        if info["throttled_seconds"]:
+            lines.append(f"Limite de ritmo {account_identifier}: {info['throttled_seconds']:.1f}s aguardando fichas")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de tráfego do Telegram pelo process_message")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--traffic", help="Tráfego gravado em JSONL")
+    source.add_argument("--posts", help="post_info.json usado para sintetizar o tráfego")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de posts sintetizados")
+    parser.add_argument("--comments-per-post", type=int, default=1)
+    parser.add_argument("--correction-ratio", type=float, default=0.2)
+    parser.add_argument("--delete-ratio", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=2.0, help="Posts por segundo no tráfego sintetizado")
+    parser.add_argument("--comment-delay", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--save-traffic", help="Gravar o tráfego usado em JSONL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Multiplicador do ritmo (0 = sem pausas)")
+    parser.add_argument("--backend", choices=("simulated", "browser"), default="simulated")
+    parser.add_argument("--fake-server", action="store_true", help="Iniciar keepa/fake_server.py para o backend browser")
+    parser.add_argument("--login", type=float, default=SimulatedLatencies.login)
+    parser.add_argument("--page-load", type=float, default=SimulatedLatencies.page_load)
+    parser.add_argument("--form", type=float, default=SimulatedLatencies.form)
+    parser.add_argument("--failure-rate", type=float, default=SimulatedLatencies.failure_rate)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--coalesce-window", type=float, default=None)
+    parser.add_argument("--drain-timeout", type=float, default=600)
+    parser.add_argument("--workdir", default=None, help="Diretório dos arquivos do bot (padrão: temporário)")
+    parser.add_argument("--json", help="Gravar o resultado em JSON")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar os logs do bot")
+    args = parser.parse_args()
+
+    # Caminhos de entrada e saída relativos ao diretório de onde o replay foi chamado
+    traffic_path, posts_path, save_path, json_path = (
+        os.path.abspath(path) if path else None
+        for path in (args.traffic, args.posts, args.save_traffic, args.json)
+    )
+
+    if traffic_path:
+        events = load_traffic(traffic_path)
+    else:
+        with open(posts_path, "r") as f:
+            post_info = json.load(f)
+        events = synthesize_traffic(
+            post_info, limit=args.limit, comments_per_post=args.comments_per_post,
+            correction_ratio=args.correction_ratio, delete_ratio=args.delete_ratio,
+            rate=args.rate, comment_delay=args.comment_delay, seed=args.seed
+        )
+    if save_path:
+        save_traffic(events, save_path)
+
+    fake_server = None
+    base_url = None
+    if args.backend == "browser" and args.fake_server:
+        from keepa.fake_server import start_fake_keepa
+
+        fake_server, base_url = start_fake_keepa()
+    prepare_environment(args.workdir or tempfile.mkdtemp(prefix="keepa-replay-"), base_url)
+
+    from utils.logger import setup_logging
+
+    setup_logging(log_level=logging.INFO if args.verbose else logging.WARNING, file_output=False)
+
+    if args.backend == "simulated":
+        backend = SimulatedKeepaPool(
+            SimulatedLatencies(login=args.login, page_load=args.page_load, form=args.form, failure_rate=args.failure_rate),
+            seed=args.seed
+        )
+    else:
+        from keepa.driver_pool import driver_pool
+
+        backend = driver_pool
+
+    try:
+        result = asyncio.run(run_replay(
+            events, backend, speed=args.speed, telegram_latency=args.telegram_latency,
+            coalesce_window=args.coalesce_window, drain_timeout=args.drain_timeout
+        ))
+    finally:
+        if args.backend == "browser":
+            backend.close_all()
+        if fake_server is not None:
+            fake_server.shutdown()
+
+    result["backend"] = args.backend
+    print(format_report(result))
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
-from typing import Dict
+from typing import Dict, List
 
 @dataclass
 class KeepaAccount:
@@ -22,6 +22,95 @@ class Settings:
     KEEPA_ACCOUNTS: Dict[str, KeepaAccount]
     # Conta padrão a ser usada se nenhum identificador específico for encontrado
     DEFAULT_KEEPA_ACCOUNT: str
+    # Número máximo de threads para operações Selenium bloqueantes
+    KEEPA_MAX_WORKERS: int = 5
+    # Endereço do Keepa usado pelo navegador (ex.: o servidor falso de keepa/fake_server.py)
+    KEEPA_BASE_URL: str = "https://keepa.com"
+    # Diretório onde os cookies de sessão de cada conta são persistidos
+    KEEPA_SESSION_DIR: str = "keepa_sessions"
+    # Tipos de recurso bloqueados no Chrome ("images", "fonts", "media", "third_party")
+    KEEPA_BLOCK_RESOURCES: List[str] = field(default_factory=lambda: ["images", "fonts", "media"])
+    # Reciclar o driver após este número de operações (0 desativa)
+    KEEPA_DRIVER_MAX_OPERATIONS: int = 200
+    # Reciclar o driver quando a árvore de processos do Chrome passar deste RSS em MB (0 desativa)
+    KEEPA_DRIVER_MAX_RSS_MB: int = 1500
+    # Intervalo em segundos da verificação de memória e limpeza de processos órfãos
+    KEEPA_REAPER_INTERVAL: int = 300
+    # Arquivo para memorizar o caminho do chromedriver entre reinícios (vazio desativa)
+    CHROMEDRIVER_CACHE_FILE: str = ""
+    # Aquecer (abrir e logar) drivers na inicialização
+    KEEPA_PREWARM: bool = True
+    # Contas a aquecer na inicialização (vazio = todas as configuradas)
+    KEEPA_PREWARM_ACCOUNTS: List[str] = field(default_factory=list)
+    # Pré-carregar a página do produto no driver aquecido ao ver um post novo
+    KEEPA_PREFETCH: bool = False
+    # Máximo de abas pré-carregadas abertas por driver
+    KEEPA_PREFETCH_MAX_TABS: int = 5
+    # Operações de produto da mesma conta carregadas em paralelo, em abas do mesmo Chrome
+    KEEPA_TABS_PER_ACCOUNT: int = 3
+    # Instâncias do Chrome por conta (as extras usam clones do perfil) e ociosidade até encerrá-las
+    KEEPA_INSTANCES_PER_ACCOUNT: int = 1
+    KEEPA_INSTANCE_IDLE_TIMEOUT: int = 300
+    # Janela em segundos para agrupar comentários seguidos do mesmo ASIN (0 = sem espera)
+    KEEPA_COALESCE_WINDOW: float = 5.0
+    # Cache do último preço aplicado por (conta, ASIN); TTL em segundos (0 = desativado)
+    KEEPA_TRACKING_CACHE_FILE: str = "tracking_cache.json"
+    KEEPA_TRACKING_CACHE_TTL: int = 43200
+    # Snapshot da lista de rastreamento: idade máxima para consultas e intervalo de leitura (0 = só sob demanda)
+    KEEPA_TRACKING_SNAPSHOT_MAX_AGE: int = 900
+    KEEPA_TRACKING_SNAPSHOT_INTERVAL: int = 1800
+    # Reconciliação do estado desejado com a lista de rastreamento (intervalo 0 = desativada)
+    KEEPA_RECONCILE_INTERVAL: int = 600
+    KEEPA_RECONCILE_GRACE: int = 60
+    KEEPA_RECONCILE_MAX_ATTEMPTS: int = 3
+    KEEPA_DESIRED_STATE_FILE: str = "desired_state.json"
+    # Disjuntor por conta: falhas seguidas até pausar a fila e espera inicial/máxima (segundos)
+    KEEPA_BREAKER_FAILURE_THRESHOLD: int = 3
+    KEEPA_BREAKER_BASE_DELAY: float = 30.0
+    KEEPA_BREAKER_MAX_DELAY: float = 900.0
+    # Ritmo máximo por conta (0 = sem limite): operações por minuto e logins por hora, com rajadas
+    KEEPA_RATE_OPERATIONS_PER_MINUTE: int = 20
+    KEEPA_RATE_OPERATIONS_BURST: int = 5
+    KEEPA_RATE_LOGINS_PER_HOUR: int = 6
+    KEEPA_RATE_LOGINS_BURST: int = 3
+    # Spans de latência por etapa: arquivo JSONL ("" = só em memória) e registros recentes mantidos
+    KEEPA_TRACE_FILE: str = "logs/keepa_traces.jsonl"
+    KEEPA_TRACE_RECENT: int = 2000
+
+def _env_int(name: str, default: int) -> int:
+    """Ler um inteiro de uma variável de ambiente, usando o padrão se inválido"""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    """Ler um número decimal de uma variável de ambiente, usando o padrão se inválido"""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        return default
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Ler um booleano de uma variável de ambiente ("true", "1", "sim"...)"""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "sim", "on")
+
+def _env_list(name: str, default: List[str], lowercase: bool = True) -> List[str]:
+    """Ler uma lista separada por vírgulas de uma variável de ambiente"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    return [item.lower() for item in items] if lowercase else items
 
 def load_settings() -> Settings:
     """Carregar configurações das variáveis de ambiente"""
@@ -60,7 +149,40 @@ def load_settings() -> Settings:
         UPDATE_EXISTING_TRACKING=os.getenv("UPDATE_EXISTING_TRACKING", update_existing),
         DATA_FILE=os.getenv("DATA_FILE", data_file),
         KEEPA_ACCOUNTS=keepa_accounts,
-        DEFAULT_KEEPA_ACCOUNT=default_account
+        DEFAULT_KEEPA_ACCOUNT=default_account,
+        KEEPA_MAX_WORKERS=max(1, _env_int("KEEPA_MAX_WORKERS", 5)),
+        KEEPA_BASE_URL=(os.getenv("KEEPA_BASE_URL") or "https://keepa.com").rstrip("/"),
+        KEEPA_SESSION_DIR=os.getenv("KEEPA_SESSION_DIR", "keepa_sessions"),
+        KEEPA_BLOCK_RESOURCES=_env_list("KEEPA_BLOCK_RESOURCES", ["images", "fonts", "media"]),
+        KEEPA_DRIVER_MAX_OPERATIONS=_env_int("KEEPA_DRIVER_MAX_OPERATIONS", 200),
+        KEEPA_DRIVER_MAX_RSS_MB=_env_int("KEEPA_DRIVER_MAX_RSS_MB", 1500),
+        KEEPA_REAPER_INTERVAL=max(10, _env_int("KEEPA_REAPER_INTERVAL", 300)),
+        CHROMEDRIVER_CACHE_FILE=os.getenv("CHROMEDRIVER_CACHE_FILE", ""),
+        KEEPA_PREWARM=_env_bool("KEEPA_PREWARM", True),
+        KEEPA_PREWARM_ACCOUNTS=_env_list("KEEPA_PREWARM_ACCOUNTS", [], lowercase=False),
+        KEEPA_PREFETCH=_env_bool("KEEPA_PREFETCH", False),
+        KEEPA_PREFETCH_MAX_TABS=max(1, _env_int("KEEPA_PREFETCH_MAX_TABS", 5)),
+        KEEPA_TABS_PER_ACCOUNT=max(1, _env_int("KEEPA_TABS_PER_ACCOUNT", 3)),
+        KEEPA_INSTANCES_PER_ACCOUNT=max(1, _env_int("KEEPA_INSTANCES_PER_ACCOUNT", 1)),
+        KEEPA_INSTANCE_IDLE_TIMEOUT=max(10, _env_int("KEEPA_INSTANCE_IDLE_TIMEOUT", 300)),
+        KEEPA_COALESCE_WINDOW=max(0.0, _env_float("KEEPA_COALESCE_WINDOW", 5.0)),
+        KEEPA_TRACKING_CACHE_FILE=os.getenv("KEEPA_TRACKING_CACHE_FILE", "tracking_cache.json"),
+        KEEPA_TRACKING_CACHE_TTL=max(0, _env_int("KEEPA_TRACKING_CACHE_TTL", 43200)),
+        KEEPA_TRACKING_SNAPSHOT_MAX_AGE=max(0, _env_int("KEEPA_TRACKING_SNAPSHOT_MAX_AGE", 900)),
+        KEEPA_TRACKING_SNAPSHOT_INTERVAL=max(0, _env_int("KEEPA_TRACKING_SNAPSHOT_INTERVAL", 1800)),
+        KEEPA_RECONCILE_INTERVAL=max(0, _env_int("KEEPA_RECONCILE_INTERVAL", 600)),
+        KEEPA_RECONCILE_GRACE=max(0, _env_int("KEEPA_RECONCILE_GRACE", 60)),
+        KEEPA_RECONCILE_MAX_ATTEMPTS=max(0, _env_int("KEEPA_RECONCILE_MAX_ATTEMPTS", 3)),
+        KEEPA_DESIRED_STATE_FILE=os.getenv("KEEPA_DESIRED_STATE_FILE", "desired_state.json"),
+        KEEPA_BREAKER_FAILURE_THRESHOLD=max(1, _env_int("KEEPA_BREAKER_FAILURE_THRESHOLD", 3)),
+        KEEPA_BREAKER_BASE_DELAY=max(1.0, _env_float("KEEPA_BREAKER_BASE_DELAY", 30.0)),
+        KEEPA_BREAKER_MAX_DELAY=max(1.0, _env_float("KEEPA_BREAKER_MAX_DELAY", 900.0)),
+        KEEPA_RATE_OPERATIONS_PER_MINUTE=max(0, _env_int("KEEPA_RATE_OPERATIONS_PER_MINUTE", 20)),
+        KEEPA_RATE_OPERATIONS_BURST=max(1, _env_int("KEEPA_RATE_OPERATIONS_BURST", 5)),
+        KEEPA_RATE_LOGINS_PER_HOUR=max(0, _env_int("KEEPA_RATE_LOGINS_PER_HOUR", 6)),
+        KEEPA_RATE_LOGINS_BURST=max(1, _env_int("KEEPA_RATE_LOGINS_BURST", 3)),
+        KEEPA_TRACE_FILE=os.getenv("KEEPA_TRACE_FILE", "logs/keepa_traces.jsonl"),
+        KEEPA_TRACE_RECENT=max(100, _env_int("KEEPA_TRACE_RECENT", 2000))
     )
     
     return settings
\ No newline at end of file
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+
+from config.settings import load_settings
+
+from utils.logger import get_logger
+from utils.text_parser import normalize_price
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+
+class TrackingCache:
+    """
+    Cache persistente do último preço aplicado com sucesso por (conta, ASIN)
+
+    Permite pular atualizações que não mudariam nada no Keepa sem abrir o
+    navegador. Entradas mais antigas que KEEPA_TRACKING_CACHE_TTL são ignoradas,
+    forçando uma nova atualização que volta a confirmar o estado no Keepa.
+    """
+
+    def __init__(self, path, ttl):
+        self._path = path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(account_identifier, asin):
+        return f"{account_identifier}:{asin.upper()}"
+
+    def _load(self):
+        try:
+            with open(self._path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        try:
+            # Gravar em arquivo temporário para não corromper o cache se o processo cair
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível salvar o cache de rastreamento: {str(e)}")
+
+    @property
+    def enabled(self):
+        return self._ttl > 0
+
+    def get(self, account_identifier, asin):
+        """
+        Obter o último preço aplicado, se ainda estiver dentro do TTL
+
+        Returns:
+            dict: {"price", "updated_at"} ou None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(account_identifier, asin))
+        if entry and time.time() - entry["updated_at"] < self._ttl:
+            return entry
+        return None
+
+    def is_applied(self, account_identifier, asin, price):
+        """
+        Verificar se o preço já foi aplicado recentemente para a conta e o ASIN
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+            asin: ASIN do produto
+            price: Preço desejado
+
+        Returns:
+            bool: True se a atualização pode ser pulada
+        """
+        entry = self.get(account_identifier, asin)
+        applied = entry is not None and entry["price"] == normalize_price(price)
+        if applied:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return applied
+
+    def record(self, account_identifier, asin, price):
+        """Registrar um preço aplicado com sucesso"""
+        if not self.enabled:
+            return
+        normalized = normalize_price(price)
+        if normalized is None:
+            return
+        with self._lock:
+            self._entries[self._key(account_identifier, asin)] = {
+                "price": normalized,
+                "updated_at": time.time()
+            }
+            self._save()
+
+    def invalidate(self, account_identifier, asin):
+        """Esquecer o estado de um ASIN (ex.: após DELETE ou falha na atualização)"""
+        with self._lock:
+            if self._entries.pop(self._key(account_identifier, asin), None) is not None:
+                self._save()
+
+    def prune(self):
+        """
+        Remover entradas expiradas
+
+        Returns:
+            int: Número de entradas removidas
+        """
+        now = time.time()
+        with self._lock:
+            expired = [
+                key for key, entry in self._entries.items()
+                if now - entry["updated_at"] >= self._ttl
+            ]
+            for key in expired:
+                del self._entries[key]
+            if expired:
+                self._save()
+        return len(expired)
+
+    def clear(self):
+        """Remover todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def stats(self):
+        """
+        Obter tamanho do cache e aproveitamento
+
+        Returns:
+            dict: entries, hits e misses
+        """
+        with self._lock:
+            entries = len(self._entries)
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+# Cache compartilhado entre message_processor e handlers
+tracking_cache = TrackingCache(settings.KEEPA_TRACKING_CACHE_FILE, settings.KEEPA_TRACKING_CACHE_TTL)
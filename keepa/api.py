@@ -1,21 +1,50 @@
 import time
-import random
 import logging
 import os
 import re  # Adicionar esta importação para expressões regulares
+import asyncio
+import contextvars
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from config.settings import load_settings, KeepaAccount
+from keepa.session_store import save_session, restore_session, record_session_result
+from keepa.browser import apply_resource_blocking
 
 from utils.logger import get_logger
+from utils.tracing import tracer
 
 logger = get_logger(__name__)
 settings = load_settings()
 
-# Dicionário para armazenar sessões de navegador para diferentes contas
-browser_sessions = {}
+# Executor limitado para o trabalho bloqueante do Selenium, mantendo o event loop livre
+keepa_executor = ThreadPoolExecutor(
+    max_workers=settings.KEEPA_MAX_WORKERS,
+    thread_name_prefix="keepa"
+)
+
+class KeepaCaptchaError(Exception):
+    """O Keepa exibiu um CAPTCHA: a conta precisa de uma pausa antes de novas tentativas"""
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Executar uma função bloqueante no executor do Keepa
+    
+    Args:
+        func: Função síncrona a ser executada
+        *args, **kwargs: Argumentos repassados para a função
+        
+    Returns:
+        O retorno da função
+    """
+    loop = asyncio.get_running_loop()
+    # Levar o contexto (id de correlação do comentário) para a thread do executor
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(keepa_executor, functools.partial(context.run, func, *args, **kwargs))
 
 # Funções de espera por elementos
 def wait_for_element(driver, selector, by=By.CSS_SELECTOR, timeout=20):
@@ -50,6 +79,175 @@ def check_element_visible(driver, selector, by=By.CSS_SELECTOR, timeout=5):
     except TimeoutException:
         return False
 
+# Campo de preço-alvo da Amazon no formulário de rastreamento
+AMAZON_PRICE_INPUT_XPATH = "//label[contains(.,'Amazon')]/ancestor::div[contains(@class,'mdc-text-field')]//input"
+
+# Estatísticas por etapa: tempo realmente esperado vs. pausa fixa usada anteriormente
+wait_stats = {}
+
+def _record_wait(step, elapsed, legacy_sleep):
+    """Registrar o tempo gasto em uma etapa e quanto foi economizado em relação à pausa fixa"""
+    saved = max(0.0, legacy_sleep - elapsed)
+    stats = wait_stats.setdefault(step, {"count": 0, "waited": 0.0, "saved": 0.0})
+    stats["count"] += 1
+    stats["waited"] += elapsed
+    stats["saved"] += saved
+    logger.info(f"⏱️ Etapa '{step}': {elapsed:.2f}s (economia de {saved:.2f}s)")
+
+def get_wait_stats():
+    """
+    Obter as estatísticas acumuladas de espera por etapa
+    
+    Returns:
+        dict: Por etapa, número de execuções, tempo esperado e tempo economizado (segundos)
+    """
+    return {step: dict(stats) for step, stats in wait_stats.items()}
+
+def wait_for_condition(driver, step, condition, timeout, legacy_sleep=0.0):
+    """
+    Aguardar uma condição de prontidão com limite superior, em vez de uma pausa fixa
+    
+    Args:
+        driver: Instância do Selenium WebDriver
+        step: Nome da etapa (usado nas estatísticas)
+        condition: Callable recebendo o driver, verdadeiro quando a etapa estiver pronta
+        timeout: Tempo máximo de espera em segundos
+        legacy_sleep: Pausa fixa que esta espera substitui, para cálculo da economia
+        
+    Returns:
+        bool: True se a condição foi satisfeita dentro do limite
+    """
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(condition)
+        ready = True
+    except TimeoutException:
+        logger.warning(f"⚠️ Etapa '{step}' não ficou pronta em {timeout}s")
+        ready = False
+    _record_wait(step, time.monotonic() - start, legacy_sleep)
+    return ready
+
+def page_ready(driver):
+    """Condição: documento completamente carregado"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+def any_element_present(*selectors):
+    """Condição: pelo menos um dos seletores CSS está presente"""
+    def condition(driver):
+        return any(driver.find_elements(By.CSS_SELECTOR, selector) for selector in selectors)
+    return condition
+
+# Instala um MutationObserver na página e retorna o tempo desde a última mutação
+# do DOM junto com o número de recursos de rede já carregados
+DOM_ACTIVITY_SCRIPT = """
+if (!window.__kpupObserver) {
+    window.__kpupLastMutation = Date.now();
+    window.__kpupObserver = new MutationObserver(function() {
+        window.__kpupLastMutation = Date.now();
+    });
+    window.__kpupObserver.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+}
+return {
+    idle: Date.now() - window.__kpupLastMutation,
+    resources: performance.getEntriesByType('resource').length
+};
+"""
+
+class dom_settled:
+    """
+    Condição: DOM sem mutações e sem novos recursos de rede por `quiet_ms`
+    
+    Usada após ações cujo resultado não tem um seletor próprio (ex.: envio do
+    formulário de rastreamento).
+    """
+    
+    def __init__(self, quiet_ms=400):
+        self.quiet_ms = quiet_ms
+        self.resources = None
+        self.resources_since = None
+    
+    def __call__(self, driver):
+        activity = driver.execute_script(DOM_ACTIVITY_SCRIPT)
+        now = time.monotonic()
+        if activity["resources"] != self.resources:
+            self.resources = activity["resources"]
+            self.resources_since = now
+            return False
+        network_idle = (now - self.resources_since) * 1000 >= self.quiet_ms
+        return network_idle and activity["idle"] >= self.quiet_ms
+
+# Lê todo o estado da aba de rastreamento em uma única chamada ao navegador
+TRACKING_STATE_SCRIPT = """
+var xpath = arguments[0];
+function visible(el) {
+    return !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+}
+var priceInput = document.evaluate(
+    xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+var errors = [];
+document.querySelectorAll('[id*="rror"], .error, .errorMessage, .mdc-snackbar__label').forEach(function(el) {
+    var text = (el.innerText || '').trim();
+    if (text && visible(el)) { errors.push(text); }
+});
+var hasUpdate = !!document.getElementById('updateTracking');
+var hasSubmit = !!document.getElementById('submitTracking');
+var hasDelete = !!document.getElementById('deleteTracking');
+return {
+    ready: hasUpdate || hasSubmit || hasDelete,
+    hasUpdate: hasUpdate,
+    hasSubmit: hasSubmit,
+    hasDelete: hasDelete,
+    hasPriceInput: !!priceInput,
+    currentPrice: priceInput ? priceInput.value : null,
+    errors: errors
+};
+"""
+
+def probe_tracking_state(driver):
+    """
+    Obter o estado da aba de rastreamento com um único execute_script
+    
+    Args:
+        driver: Instância do Selenium WebDriver (com a página do produto aberta)
+        
+    Returns:
+        dict: ready, hasUpdate (alerta existente), hasSubmit, hasDelete,
+              hasPriceInput, currentPrice (valor atual do preço-alvo) e errors
+    """
+    return driver.execute_script(TRACKING_STATE_SCRIPT, AMAZON_PRICE_INPUT_XPATH)
+
+def wait_for_tracking_state(driver, step, timeout=8, legacy_sleep=3):
+    """
+    Aguardar a aba de rastreamento renderizar e retornar seu estado
+    
+    Cada verificação é um único probe, então o caminho (criar, atualizar ou
+    excluir) é escolhido assim que o formulário aparece.
+    
+    Returns:
+        dict: Estado retornado por probe_tracking_state, ou None se a aba não carregou
+    """
+    probed = {}
+    
+    def condition(d):
+        probed["state"] = probe_tracking_state(d)
+        return probed["state"]["ready"]
+    
+    if not wait_for_condition(driver, step, condition, timeout=timeout, legacy_sleep=legacy_sleep):
+        return None
+    
+    state = probed["state"]
+    if state["errors"]:
+        logger.warning(f"⚠️ Mensagens de erro na aba de rastreamento: {'; '.join(state['errors'])}")
+    return state
+
+def _same_price(current, price):
+    """Comparar o preço atual do formulário com o preço desejado"""
+    try:
+        return current is not None and float(str(current).replace(',', '.')) == float(str(price).replace(',', '.'))
+    except ValueError:
+        return False
+
 def check_logged_in_account(driver, account_identifier):
     """
     Verificar se já está logado na conta especificada
@@ -62,11 +260,11 @@ def check_logged_in_account(driver, account_identifier):
         bool: True se estiver logado na conta correta, False caso contrário
     """
     try:
-        # Aguardar um pouco para a página carregar completamente
-        time.sleep(2)
+        # Aguardar a página carregar completamente
+        wait_for_condition(driver, "verificar login: carregamento", page_ready, timeout=10, legacy_sleep=2)
         
         # Primeiro verificar se o menu do usuário está presente
-        if not check_element_exists(driver, "#panelUserMenu", timeout=3):
+        if not check_element_exists(driver, "#panelUserMenu", timeout=1):
             logger.info("Menu do usuário não encontrado. Provavelmente não está logado.")
             return False
             
@@ -118,41 +316,46 @@ def login_to_keepa(driver, account_identifier=None):
     
     Returns:
         bool: True se o login for bem-sucedido, False caso contrário
+    
+    Raises:
+        KeepaCaptchaError: Se o Keepa exibir um CAPTCHA no formulário de login
     """
-    # Código existente...
+    account = settings.KEEPA_ACCOUNTS.get(account_identifier)
     
     try:
         # Primeiro carregar a página inicial do Keepa
-        driver.get("https://keepa.com")
-        time.sleep(random.uniform(2, 4)) 
+        driver.get(settings.KEEPA_BASE_URL)
+        # Aguardar até que o menu do usuário ou o acesso ao login estejam disponíveis
+        wait_for_condition(
+            driver, "login: página inicial",
+            lambda d: page_ready(d) and any_element_present("#panelUserMenu", "#loginOverlay", "a.loginLink")(d),
+            timeout=10, legacy_sleep=3
+        )
         
-        # Verificar se já está logado na conta correta
+        # Verificação barata: a sessão do perfil ainda está válida?
         if check_logged_in_account(driver, account_identifier):
             logger.info(f"✅ Já logado como {account_identifier}")
-            
-            # NOVO: Verificar se a sessão está realmente ativa tentando acessar uma funcionalidade
-            try:
-                # Tentar acessar uma funcionalidade básica do Keepa
-                driver.get("https://keepa.com/#!tracking")
-                time.sleep(3)
-                
-                # Verificar se a página carregou corretamente
-                if check_element_exists(driver, "#trackingTable", timeout=5):
-                    logger.info("✅ Sessão ativa e funcionando corretamente")
-                    return True
-                else:
-                    logger.warning("⚠️ Sessão pode estar expirada. Forçando re-login...")
-                    # Forçar logout e re-login
-                    driver.delete_all_cookies()
-                    driver.refresh()
-                    time.sleep(3)
-                    # Continuar com processo de login normal
-            except Exception as e:
-                logger.warning(f"⚠️ Erro ao verificar sessão ativa: {str(e)}. Tentando re-login...")
-                driver.delete_all_cookies()
-                driver.refresh()
-                time.sleep(3)
+            record_session_result("hits")
+            return True
         
+        # Tentar restaurar a sessão salva antes de digitar credenciais
+        if restore_session(driver, account_identifier):
+            driver.refresh()
+            wait_for_condition(
+                driver, "login: restaurar sessão",
+                lambda d: page_ready(d) and any_element_present("#panelUserMenu", "#loginOverlay", "a.loginLink")(d),
+                timeout=10, legacy_sleep=3
+            )
+            if check_logged_in_account(driver, account_identifier):
+                logger.info(f"✅ Sessão restaurada para {account_identifier}, login completo evitado")
+                record_session_result("restored")
+                return True
+            logger.info(f"Sessão salva de {account_identifier} expirou, fazendo login completo")
+        
+        if account is None:
+            logger.error(f"❌ Conta '{account_identifier}' não encontrada na configuração")
+            record_session_result("failed")
+            return False
         
         # Tornar a sobreposição de login visível - usar um método mais robusto
         try:
@@ -170,14 +373,23 @@ def login_to_keepa(driver, account_identifier=None):
                 }
             ''')
             logger.info("Sobreposição de login tornada visível ou botão de login clicado.")
-            time.sleep(2)  # Aguardar a sobreposição aparecer
+            # Aguardar a sobreposição aparecer
+            wait_for_condition(
+                driver, "login: sobreposição",
+                EC.visibility_of_element_located((By.ID, "username")),
+                timeout=5, legacy_sleep=2
+            )
         except Exception as e:
             logger.warning(f"Erro ao tornar a sobreposição de login visível: {str(e)}")
             # Tentar método alternativo - procurar por um botão de login
             try:
                 if check_element_visible(driver, "a.loginLink", timeout=3):
                     click_element(driver, "a.loginLink")
-                    time.sleep(2)
+                    wait_for_condition(
+                        driver, "login: sobreposição",
+                        EC.visibility_of_element_located((By.ID, "username")),
+                        timeout=5, legacy_sleep=2
+                    )
                     logger.info("Botão de login clicado.")
             except Exception as login_e:
                 logger.warning(f"Erro ao clicar no botão de login: {str(login_e)}")
@@ -188,51 +400,56 @@ def login_to_keepa(driver, account_identifier=None):
             screenshot_path = os.path.join(os.getcwd(), "login_form_error.png")
             driver.save_screenshot(screenshot_path)
             logger.info(f"Screenshot salvo em: {screenshot_path}")
+            record_session_result("failed")
             return False
 
         # Verificar CAPTCHA
         if check_element_visible(driver, "iframe[title='reCAPTCHA']", timeout=3):
             logger.warning("⚠️ CAPTCHA detectado. O modo automatizado não pode prosseguir.")
             driver.save_screenshot("captcha_detected.png")
-            return False
+            record_session_result("failed")
+            raise KeepaCaptchaError(f"CAPTCHA exibido no login da conta {account_identifier}")
 
         # Esperar explicitamente pelo campo de usuário
         username_field = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.ID, "username"))
         )
         
-        # Preencher nome de usuário com ações mais robustas
+        # Preencher nome de usuário (de uma vez, sem pausas entre caracteres)
+        start = time.monotonic()
         username_field.clear()
-        time.sleep(random.uniform(0.5, 1.5))
-        # Preencher caractere por caractere
-        for char in account.username:
-            username_field.send_keys(char)
-            time.sleep(random.uniform(0.05, 0.15))  # Pequena pausa entre caracteres
+        username_field.send_keys(account.username)
+        _record_wait("login: preencher usuário", time.monotonic() - start, 1.0 + 0.1 * len(account.username))
         logger.info("Nome de usuário preenchido.")
 
         # Preencher senha
+        start = time.monotonic()
         password_field = wait_for_element(driver, "#password")
         password_field.clear()
-        time.sleep(random.uniform(0.5, 1.5))
-        # Preencher caractere por caractere
-        for char in account.password:
-            password_field.send_keys(char)
-            time.sleep(random.uniform(0.05, 0.15))  # Pequena pausa entre caracteres
+        password_field.send_keys(account.password)
+        _record_wait("login: preencher senha", time.monotonic() - start, 1.0 + 0.1 * len(account.password))
         logger.info("Senha preenchida.")
 
-        # Clicar no botão de login
-        time.sleep(random.uniform(1, 2))
+        # Clicar no botão de login assim que estiver clicável
+        start = time.monotonic()
         submit_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.ID, "submitLogin"))
         )
+        _record_wait("login: botão de envio", time.monotonic() - start, 1.5)
         driver.execute_script("arguments[0].click();", submit_button)
         logger.info("Botão de login clicado. Aguardando autenticação...")
         
-        # Aguardar o carregamento da página ou aparecimento do OTP
-        WebDriverWait(driver, 15).until(  # Aumentar tempo de espera
-            lambda driver: driver.execute_script("return document.readyState") == "complete"
+        # Aguardar o resultado da autenticação: menu do usuário, erro ou OTP
+        wait_for_condition(
+            driver, "login: autenticação",
+            lambda d: page_ready(d) and d.execute_script(
+                "var e = document.getElementById('loginError');"
+                "var u = document.getElementById('panelUsername');"
+                "var o = document.getElementById('sectionLoginOtp');"
+                "return !!((e && e.innerText.trim()) || (u && u.innerText.trim()) || (o && o.offsetParent));"
+            ),
+            timeout=15, legacy_sleep=3
         )
-        time.sleep(3)  # Buffer adicional aumentado
 
         # Capturar screenshot para diagnóstico
         screenshot_path = os.path.join(os.getcwd(), "post_login_screen.png")
@@ -243,118 +460,269 @@ def login_to_keepa(driver, account_identifier=None):
         if check_element_visible(driver, "#loginError", timeout=2) and driver.find_element(By.ID, "loginError").text:
             error_text = driver.find_element(By.ID, "loginError").text
             logger.error(f"❌ Erro de login: {error_text}")
+            record_session_result("failed")
             return False
         
         # Verificar se o OTP é necessário
         if check_element_visible(driver, "#sectionLoginOtp", timeout=2):
             logger.warning("⚠️ Autenticação OTP necessária!")
             logger.warning("Por favor, verifique seu e-mail para o OTP enviado pelo Keepa.")
+            record_session_result("failed")
             return False
         
-        # Verificar se o login foi bem-sucedido (tentando várias vezes)
-        for attempt in range(3):
-            time.sleep(2)  # Aguardar um pouco
-            if check_logged_in_account(driver, account_identifier):
-                logger.info(f"✅ Login bem-sucedido com a conta: {account_identifier}!")
-                return True
-            logger.info(f"Tentativa {attempt+1}: Ainda verificando login...")
+        # Verificar se o login foi bem-sucedido assim que o nome de usuário aparecer
+        wait_for_condition(
+            driver, "login: nome de usuário",
+            lambda d: d.execute_script(
+                "var u = document.getElementById('panelUsername'); return !!(u && u.innerText.trim());"
+            ),
+            timeout=6, legacy_sleep=6
+        )
+        if check_logged_in_account(driver, account_identifier):
+            logger.info(f"✅ Login bem-sucedido com a conta: {account_identifier}!")
+            record_session_result("full_logins")
+            save_session(driver, account_identifier)
+            return True
         
         # Verificação final - tentar determinar estado
         if check_element_visible(driver, "#panelUserMenu", timeout=2):
             # Estamos logados, mas pode não ser a conta correta
             logger.warning(f"⚠️ Logado, mas pode não ser na conta {account_identifier}. Prosseguindo mesmo assim.")
+            record_session_result("full_logins")
+            save_session(driver, account_identifier)
             return True
         else:
             logger.warning(f"⚠️ Login pode ter falhado para conta: {account_identifier}")
+            record_session_result("failed")
             return False
     
+    except KeepaCaptchaError:
+        # Propagado para o disjuntor da conta pausar as tentativas
+        raise
     except Exception as e:
         logger.error(f"❌ Erro durante o login: {str(e)}")
+        record_session_result("failed")
         driver.save_screenshot("login_error.png")
         return False
 
-def update_keepa_product(driver, asin, price):
+def product_url(asin):
+    """URL da página do produto no Keepa (domínio 12 = Amazon Brasil)"""
+    return f"{settings.KEEPA_BASE_URL}/#!product/12-{asin}"
+
+# Abas com páginas de produto pré-carregadas, por sessão do driver: {session_id: {asin: handle}}
+prefetched_tabs = {}
+
+# Abas abertas por window.open que já receberam o bloqueio de recursos: {session_id: {handle}}
+blocked_tabs = {}
+
+def prefetch_product_page(driver, asin, max_tabs=None):
+    """
+    Abrir a página do produto em uma aba em segundo plano
+    
+    A aba carrega enquanto o driver continua na janela atual; quando o
+    comentário com o preço chegar, a atualização só precisa trocar de aba.
+    
+    Args:
+        driver: Instância do Selenium WebDriver
+        asin: ASIN do produto
+        max_tabs: Limite de abas pré-carregadas (padrão KEEPA_PREFETCH_MAX_TABS)
+        
+    Returns:
+        bool: True se a aba estiver aberta
+    """
+    max_tabs = max_tabs or settings.KEEPA_PREFETCH_MAX_TABS
+    tabs = prefetched_tabs.setdefault(driver.session_id, OrderedDict())
+    handles = driver.window_handles
+    if asin in tabs and tabs[asin] in handles:
+        return True
+    
+    # window.open carrega a aba sem tirar o foco do Selenium da janela atual
+    before = set(handles)
+    driver.execute_script("window.open(arguments[0], '_blank');", product_url(asin))
+    opened = set(driver.window_handles) - before
+    if not opened:
+        logger.warning(f"⚠️ Não foi possível abrir aba de pré-carregamento para {asin}")
+        return False
+    tabs[asin] = opened.pop()
+    logger.info(f"🔮 Página do produto {asin} pré-carregando em segundo plano")
+    
+    # Fechar as abas mais antigas acima do limite
+    while len(tabs) > max_tabs:
+        old_asin, old_handle = tabs.popitem(last=False)
+        _close_tab(driver, old_handle)
+        logger.info(f"Aba pré-carregada de {old_asin} descartada (limite de abas)")
+    return True
+
+def forget_prefetched_tabs(driver):
+    """Descartar o registro de abas pré-carregadas de um driver encerrado"""
+    prefetched_tabs.pop(getattr(driver, "session_id", None), None)
+    blocked_tabs.pop(getattr(driver, "session_id", None), None)
+
+def _close_tab(driver, handle):
+    """Fechar uma aba e voltar para a janela em que o driver estava"""
+    current = driver.current_window_handle
+    if handle == current or handle not in driver.window_handles:
+        return
+    driver.switch_to.window(handle)
+    driver.close()
+    driver.switch_to.window(current)
+    blocked_tabs.get(driver.session_id, set()).discard(handle)
+
+def _open_product_page(driver, asin):
+    """
+    Abrir a página do produto, usando a aba pré-carregada se existir
+    
+    Returns:
+        bool: True se a aba pré-carregada foi usada
+    """
+    handle = prefetched_tabs.get(driver.session_id, {}).pop(asin, None)
+    if handle and handle in driver.window_handles:
+        driver.switch_to.window(handle)
+        # O bloqueio via CDP é por aba: as requisições seguintes desta aba também ficam enxutas
+        blocked = blocked_tabs.setdefault(driver.session_id, set())
+        if handle not in blocked:
+            apply_resource_blocking(driver)
+            blocked.add(handle)
+        logger.info(f"🔮 Usando página pré-carregada para {asin}")
+        return True
+    driver.get(product_url(asin))
+    return False
+
+def _return_to_window(driver, origin):
+    """Fechar a aba pré-carregada usada pela operação e voltar à janela original"""
+    try:
+        current = driver.current_window_handle
+        if current != origin:
+            driver.close()
+            driver.switch_to.window(origin)
+            blocked_tabs.get(driver.session_id, set()).discard(current)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao voltar para a janela principal: {str(e)}")
+
+def _wait_for_submit(driver, step, verify):
+    """
+    Aguardar o Keepa processar o envio do formulário de alerta
+    
+    Com verify=False a espera é só o suficiente para a requisição sair antes
+    de a aba ser reutilizada; a confirmação fica a cargo do reconciliador.
+    """
+    if verify:
+        wait_for_condition(driver, step, dom_settled(), timeout=8, legacy_sleep=4)
+    else:
+        wait_for_condition(driver, step, dom_settled(quiet_ms=150), timeout=2, legacy_sleep=4)
+
+def update_keepa_product(driver, asin, price, verify=True):
     """
     Atualizar preço-alvo para um produto no Keepa
+    
+    Args:
+        driver: Instância do Selenium WebDriver
+        asin: ASIN do produto
+        price: Preço-alvo
+        verify: Aguardar a página confirmar o envio (False quando o reconciliador
+                vai conferir o resultado pela lista de rastreamento)
     """
+    origin = driver.current_window_handle
+    try:
+        return _update_keepa_product(driver, asin, price, verify)
+    finally:
+        _return_to_window(driver, origin)
+
+def _update_keepa_product(driver, asin, price, verify=True):
     logger.info(f"Atualizando produto ASIN {asin} com preço {price}")
     
     try:
-        # Navegar para a página do produto
-        driver.get(f"https://keepa.com/#!product/12-{asin}")
-        
-        # Verificar se a página carregou corretamente
-        try:
-            wait_for_element(driver, "#productInfoBox", timeout=10)
-        except TimeoutException:
-            logger.warning(f"⚠️ A página do produto para {asin} não carregou corretamente")
-            return False
+        with tracer.span("página do produto", asin=asin, operation="update") as span:
+            # Navegar para a página do produto (ou usar a aba pré-carregada)
+            span["prefetched"] = _open_product_page(driver, asin)
+            
+            # Verificar se a página carregou corretamente
+            try:
+                wait_for_element(driver, "#productInfoBox", timeout=10)
+            except TimeoutException:
+                span["status"] = "timeout"
+                logger.warning(f"⚠️ A página do produto para {asin} não carregou corretamente")
+                return False
 
         # Clicar na aba de rastreamento
-        try:
-            click_element(driver, "#tabTrack")
-            time.sleep(3)  # Esperar animações
-        except Exception as e:
-            logger.error(f"❌ Falha ao acessar a aba de rastreamento: {str(e)}")
+        with tracer.span("aba de rastreamento", asin=asin, operation="update") as span:
+            try:
+                click_element(driver, "#tabTrack")
+                # Esperar o formulário de rastreamento ser renderizado e ler seu estado
+                state = wait_for_tracking_state(driver, "atualizar: aba de rastreamento", timeout=8, legacy_sleep=3)
+            except Exception as e:
+                span["status"] = "erro"
+                logger.error(f"❌ Falha ao acessar a aba de rastreamento: {str(e)}")
+                return False
+            if state is None:
+                span["status"] = "timeout"
+        
+        if state is None:
+            logger.error(f"❌ Formulário de rastreamento não carregou para {asin}")
             return False
 
         # Verificar se o rastreamento já existe
-        if settings.UPDATE_EXISTING_TRACKING and check_element_exists(driver, "#updateTracking"):
+        if state["hasUpdate"] and _same_price(state["currentPrice"], price):
+            logger.info(f"✅ Alerta para {asin} já está com preço {price}, nada a fazer")
+            return True
+        
+        if settings.UPDATE_EXISTING_TRACKING and state["hasUpdate"]:
             logger.info("🔄 Alerta existente encontrado, atualizando...")
             try:
-                click_element(driver, "#updateTracking")
-                time.sleep(2)  # Esperar carregamento
-                
-                # Encontrar e preencher o campo de preço
-                price_container = wait_for_element(
-                    driver,
-                    "//label[contains(.,'Amazon')]/ancestor::div[contains(@class,'mdc-text-field')]//input",
-                    By.XPATH
-                )
-                driver.execute_script(f"""
-                    var input = arguments[0];
-                    input.value = '';
-                    input.value = '{price}';
-                    input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    input.dispatchEvent(new Event('change'));
-                """, price_container)
+                with tracer.span("formulário", asin=asin, alert="existente"):
+                    click_element(driver, "#updateTracking")
+                    
+                    # Encontrar e preencher o campo de preço assim que estiver visível
+                    wait_for_condition(
+                        driver, "atualizar: formulário de alerta",
+                        EC.visibility_of_element_located((By.XPATH, AMAZON_PRICE_INPUT_XPATH)),
+                        timeout=8, legacy_sleep=2
+                    )
+                    price_container = wait_for_element(driver, AMAZON_PRICE_INPUT_XPATH, By.XPATH)
+                    driver.execute_script(f"""
+                        var input = arguments[0];
+                        input.value = '';
+                        input.value = '{price}';
+                        input.dispatchEvent(new Event('input', {{ bubbles: true }}));
+                        input.dispatchEvent(new Event('change'));
+                    """, price_container)
                 
                 # Enviar atualização
-                btn_submit = wait_for_element(driver, "#submitTracking", timeout=8)
-                driver.execute_script("arguments[0].click();", btn_submit)
+                with tracer.span("envio", asin=asin, alert="existente", verify=verify):
+                    btn_submit = wait_for_element(driver, "#submitTracking", timeout=8)
+                    driver.execute_script("arguments[0].click();", btn_submit)
+                    _wait_for_submit(driver, "atualizar: confirmação", verify)
                 logger.info(f"✅ Alerta atualizado com sucesso para {asin}")
-                time.sleep(4)
                 return True
             except Exception as e:
                 logger.error(f"❌ Erro ao atualizar alerta: {str(e)}")
                 return False
-        elif check_element_exists(driver, "#updateTracking"):
+        elif state["hasUpdate"]:
             logger.info(f"✅ Alerta já existe para {asin}, mas não foi atualizado")
             return True
 
         # Criar novo alerta
         try:
-            # Encontrar campo de preço usando o rótulo
-            price_container = wait_for_element(
-                driver,
-                "//label[contains(.,'Amazon')]/ancestor::div[contains(@class,'mdc-text-field')]//input",
-                By.XPATH
-            )
-            
-            # Preencher valor
-            driver.execute_script(f"""
-                var input = arguments[0];
-                input.value = '';
-                input.value = '{price}';
-                input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                input.dispatchEvent(new Event('change'));
-            """, price_container)
+            with tracer.span("formulário", asin=asin, alert="novo"):
+                # Encontrar campo de preço usando o rótulo
+                price_container = wait_for_element(driver, AMAZON_PRICE_INPUT_XPATH, By.XPATH)
+                
+                # Preencher valor
+                driver.execute_script(f"""
+                    var input = arguments[0];
+                    input.value = '';
+                    input.value = '{price}';
+                    input.dispatchEvent(new Event('input', {{ bubbles: true }}));
+                    input.dispatchEvent(new Event('change'));
+                """, price_container)
             
             # Tentar criar novo alerta
-            btn_submit = wait_for_element(driver, "#submitTracking", timeout=8)
-            driver.execute_script("arguments[0].click();", btn_submit)
+            with tracer.span("envio", asin=asin, alert="novo", verify=verify):
+                btn_submit = wait_for_element(driver, "#submitTracking", timeout=8)
+                driver.execute_script("arguments[0].click();", btn_submit)
+                # Esperar confirmação
+                _wait_for_submit(driver, "criar: confirmação", verify)
             logger.info(f"✅ Novo alerta criado para {asin}")
-            time.sleep(4)  # Esperar confirmação
             return True
         except Exception as e:
             logger.error(f"❌ Erro ao criar alerta: {str(e)}")
@@ -367,6 +735,84 @@ def update_keepa_product(driver, asin, price):
         return False
     
     
+def _tab_limit():
+    """Abas pré-carregadas permitidas quando várias operações rodam em paralelo"""
+    return max(settings.KEEPA_TABS_PER_ACCOUNT, settings.KEEPA_PREFETCH_MAX_TABS)
+
+def run_product_operations(driver, operations, trace_ids=None):
+    """
+    Executar várias operações de produto da mesma conta com os carregamentos em paralelo
+    
+    O WebDriver só controla uma aba por vez, mas o Chrome carrega abas em
+    segundo plano simultaneamente. Todas as páginas de produto são abertas
+    de uma vez e cada operação encontra sua aba já carregada (ou quase).
+    
+    Args:
+        driver: Instância do Selenium WebDriver logada na conta
+        operations: Lista de tuplas (operação, asin, *args); a operação recebe
+                    (driver, asin, *args) e deve abrir o produto com _open_product_page
+        trace_ids: Id de correlação de cada operação, na mesma ordem (para os spans)
+        
+    Returns:
+        list: Uma tupla (True, retorno) ou (False, exceção) por operação, na mesma ordem
+    """
+    try:
+        with tracer.span("abrir abas", tabs=len(operations)):
+            for _, asin, *_ in operations:
+                prefetch_product_page(driver, asin, max_tabs=_tab_limit())
+    except Exception as e:
+        # Sem abas, cada operação carrega sua página normalmente
+        logger.warning(f"⚠️ Erro ao abrir abas em paralelo: {str(e)}")
+    
+    trace_ids = trace_ids or [None] * len(operations)
+    results = []
+    for (operation, *args), trace_id in zip(operations, trace_ids):
+        try:
+            with tracer.trace(trace_id):
+                results.append((True, operation(driver, *args)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+def update_keepa_products_batch(driver, items, verify=True):
+    """
+    Atualizar vários produtos da mesma conta reutilizando um único driver logado
+    
+    Falhas individuais não interrompem o lote.
+    
+    Args:
+        driver: Instância do Selenium WebDriver já logada na conta
+        items: Lista de tuplas (asin, preço)
+        verify: Repassado para update_keepa_product
+        
+    Returns:
+        list: Um dicionário por item com asin, price, success e error
+    """
+    logger.info(f"📦 Atualizando lote de {len(items)} produtos")
+    results = []
+    
+    for index, (asin, price) in enumerate(items, 1):
+        # Manter os próximos produtos do lote carregando em abas enquanto este é atualizado
+        try:
+            for next_asin, _ in items[index:index + settings.KEEPA_TABS_PER_ACCOUNT - 1]:
+                prefetch_product_page(driver, next_asin, max_tabs=_tab_limit())
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao abrir abas do lote: {str(e)}")
+        try:
+            success = update_keepa_product(driver, asin, price, verify)
+            error = None if success else "Falha ao atualizar no Keepa"
+        except Exception as e:
+            success = False
+            error = str(e)
+        
+        if not success:
+            logger.warning(f"⚠️ Item {index}/{len(items)} do lote falhou ({asin}): {error}")
+        results.append({"asin": asin, "price": price, "success": success, "error": error})
+    
+    succeeded = sum(1 for result in results if result["success"])
+    logger.info(f"📦 Lote concluído: {succeeded}/{len(items)} produtos atualizados")
+    return results
+    
 def delete_keepa_tracking(driver, asin):
     """
     Excluir rastreamento para um produto no Keepa
@@ -378,36 +824,54 @@ def delete_keepa_tracking(driver, asin):
     Returns:
         bool: True se a exclusão for bem-sucedida, False caso contrário
     """
+    origin = driver.current_window_handle
+    try:
+        return _delete_keepa_tracking(driver, asin)
+    finally:
+        _return_to_window(driver, origin)
+
+def _delete_keepa_tracking(driver, asin):
     logger.info(f"🗑️ Tentando excluir rastreamento para ASIN {asin}")
     
     try:
-        # Navegar para a página do produto
-        driver.get(f"https://keepa.com/#!product/12-{asin}")
-        
-        # Verificar se a página carregou corretamente
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "productInfoBox"))
-            )
-            logger.info(f"Página do produto para {asin} carregada corretamente")
-        except TimeoutException:
-            logger.warning(f"⚠️ A página do produto para {asin} não carregou corretamente")
-            return False
+        with tracer.span("página do produto", asin=asin, operation="delete") as span:
+            # Navegar para a página do produto (ou usar a aba pré-carregada)
+            span["prefetched"] = _open_product_page(driver, asin)
+            
+            # Verificar se a página carregou corretamente
+            try:
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.ID, "productInfoBox"))
+                )
+                logger.info(f"Página do produto para {asin} carregada corretamente")
+            except TimeoutException:
+                span["status"] = "timeout"
+                logger.warning(f"⚠️ A página do produto para {asin} não carregou corretamente")
+                return False
 
         # Clicar na aba de rastreamento
-        try:
-            tracking_tab = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "tabTrack"))
-            )
-            driver.execute_script("arguments[0].click();", tracking_tab)
-            time.sleep(5)  # Esperar animações
-            logger.info("Aba de rastreamento aberta")
-        except Exception as e:
-            logger.error(f"❌ Falha ao acessar a aba de rastreamento: {str(e)}")
+        with tracer.span("aba de rastreamento", asin=asin, operation="delete") as span:
+            try:
+                tracking_tab = WebDriverWait(driver, 10).until(
+                    EC.element_to_be_clickable((By.ID, "tabTrack"))
+                )
+                driver.execute_script("arguments[0].click();", tracking_tab)
+                # Esperar o formulário de rastreamento ser renderizado e ler seu estado
+                state = wait_for_tracking_state(driver, "excluir: aba de rastreamento", timeout=8, legacy_sleep=5)
+                logger.info("Aba de rastreamento aberta")
+            except Exception as e:
+                span["status"] = "erro"
+                logger.error(f"❌ Falha ao acessar a aba de rastreamento: {str(e)}")
+                return False
+            if state is None:
+                span["status"] = "timeout"
+        
+        if state is None:
+            logger.error(f"❌ Formulário de rastreamento não carregou para {asin}")
             return False
 
         # Verificar se o rastreamento existe (botão deleteTracking deve estar presente)
-        if not check_element_exists(driver, "#deleteTracking"):
+        if not state["hasDelete"]:
             logger.warning(f"⚠️ Nenhum rastreamento encontrado para ASIN {asin}")
             return False
         
@@ -415,14 +879,20 @@ def delete_keepa_tracking(driver, asin):
         logger.info("Rastreamento existe, tentando excluir")
         
         try:
-            # Clicar no botão de excluir rastreamento
-            delete_button = driver.find_element(By.ID, "deleteTracking")
-            driver.execute_script("arguments[0].click();", delete_button)
-            time.sleep(3)  # Esperar que a ação seja concluída
-            
-            # Verificar se o botão sumiu (o que indica sucesso na exclusão)
-            # Usamos um timeout curto porque esperamos que não encontre o elemento
-            if check_element_exists(driver, "#deleteTracking", timeout=2):
+            with tracer.span("envio", asin=asin, operation="delete") as span:
+                # Clicar no botão de excluir rastreamento
+                delete_button = driver.find_element(By.ID, "deleteTracking")
+                driver.execute_script("arguments[0].click();", delete_button)
+                
+                # Esperar o botão sumir (o que indica sucesso na exclusão)
+                deleted = wait_for_condition(
+                    driver, "excluir: confirmação",
+                    EC.invisibility_of_element_located((By.ID, "deleteTracking")),
+                    timeout=8, legacy_sleep=5
+                )
+                if not deleted:
+                    span["status"] = "timeout"
+            if not deleted:
                 logger.warning(f"⚠️ Botão de exclusão ainda presente após clicar, a exclusão pode ter falhado")
                 return False
             else:
@@ -437,4 +907,119 @@ def delete_keepa_tracking(driver, asin):
         logger.error(f"❌ Erro crítico durante exclusão: {str(e)}")
         screenshot_path = f"delete_error_{asin}.png"
         driver.save_screenshot(screenshot_path)
-        return False
\ No newline at end of file
+        return False
+
+def tracking_list_url():
+    """URL da lista de produtos rastreados da conta"""
+    return f"{settings.KEEPA_BASE_URL}/#!tracking"
+
+# Coleta as linhas visíveis da lista de rastreamento e rola a grade uma "página".
+# A grade é virtualizada: só as linhas na tela existem no DOM, então o Python
+# chama o script repetidamente até chegar ao fim da lista.
+TRACKING_LIST_SCRIPT = """
+var asinPattern = /product\\/\\d+-([A-Z0-9]{10})/;
+var pricePattern = /(\\d{1,3}(?:\\.\\d{3})*,\\d{2}|\\d+(?:[.,]\\d{1,2})?)/;
+var rows = document.querySelectorAll('.ag-center-cols-container .ag-row, #trackingTable tr, .trackingRow');
+var items = [];
+rows.forEach(function(row) {
+    var link = row.querySelector('a[href*="product/"]');
+    var match = link ? asinPattern.exec(link.getAttribute('href')) : null;
+    var asin = match ? match[1] : (row.getAttribute('data-asin') || null);
+    if (!asin) { return; }
+    var price = null;
+    row.querySelectorAll('[col-id], td, [data-type]').forEach(function(cell) {
+        var column = (cell.getAttribute('col-id') || cell.getAttribute('data-type') || '').toLowerCase();
+        if (price === null && column.indexOf('amazon') !== -1) {
+            var priceMatch = pricePattern.exec(cell.innerText || '');
+            if (priceMatch) { price = priceMatch[1]; }
+        }
+    });
+    items.push({asin: asin, price: price});
+});
+var viewport = document.querySelector('.ag-body-viewport, #trackingTable');
+var atEnd = !viewport || viewport.scrollTop + viewport.clientHeight >= viewport.scrollHeight - 1;
+var empty = !!document.querySelector('.ag-overlay-no-rows-center, #trackingEmpty');
+// Total de linhas da grade (aria-rowcount inclui a linha de cabeçalho); a tabela simples não é virtualizada
+var total = null;
+var grid = document.querySelector('.ag-root[aria-rowcount], [role="grid"][aria-rowcount]');
+if (grid) {
+    total = parseInt(grid.getAttribute('aria-rowcount'), 10) - 1;
+} else if (document.querySelector('#trackingTable')) {
+    total = document.querySelectorAll('#trackingTable tr').length;
+}
+if (empty) { total = 0; }
+return {items: items, atEnd: atEnd, empty: empty, total: isNaN(total) ? null : total, ready: rows.length > 0 || empty};
+"""
+
+TRACKING_LIST_SCROLL_SCRIPT = """
+var viewport = document.querySelector('.ag-body-viewport, #trackingTable');
+if (viewport) { viewport.scrollTop = viewport.scrollTop + viewport.clientHeight; }
+"""
+
+def scrape_tracking_list(driver, max_pages=200):
+    """
+    Ler a lista de rastreamento da conta em um único carregamento de página
+    
+    Args:
+        driver: Instância do Selenium WebDriver logada na conta
+        max_pages: Limite de rolagens da grade, para listas muito grandes
+        
+    Returns:
+        tuple: (ASIN -> preço-alvo da Amazon como exibido ou None, completa),
+               ou None se a lista não carregou. completa só é True quando a
+               quantidade de ASINs lidos bate com o total informado pela grade
+    """
+    driver.get(tracking_list_url())
+    
+    probed = {}
+    
+    def condition(d):
+        probed["page"] = d.execute_script(TRACKING_LIST_SCRIPT)
+        return probed["page"]["ready"]
+    
+    if not wait_for_condition(driver, "lista de rastreamento", condition, timeout=20, legacy_sleep=5):
+        logger.warning("⚠️ Lista de rastreamento não carregou")
+        return None
+    
+    items = {}
+    for _ in range(max_pages):
+        page = probed["page"]
+        for item in page["items"]:
+            items[item["asin"]] = item["price"]
+        if page["empty"] or page["atEnd"]:
+            break
+        
+        # Rolar e aguardar a grade renderizar as linhas da nova posição
+        previous_rows = [item["asin"] for item in page["items"]]
+        driver.execute_script(TRACKING_LIST_SCROLL_SCRIPT)
+        
+        def rows_changed(d):
+            probed["page"] = d.execute_script(TRACKING_LIST_SCRIPT)
+            return [item["asin"] for item in probed["page"]["items"]] != previous_rows
+        
+        if not wait_for_condition(driver, "rolagem da lista", rows_changed, timeout=5, legacy_sleep=0.2):
+            break
+    
+    total = page["total"]
+    complete = total is not None and len(items) == total
+    if complete:
+        logger.info(f"📋 Lista de rastreamento lida: {len(items)} produtos")
+    else:
+        logger.warning(f"⚠️ Lista de rastreamento incompleta: {len(items)} de {total if total is not None else '?'} produtos")
+    return items, complete
+
+async def login_to_keepa_async(driver, account_identifier=None):
+    """Versão aguardável de login_to_keepa executada no executor do Keepa"""
+    return await run_blocking(login_to_keepa, driver, account_identifier)
+
+async def update_keepa_product_async(driver, asin, price, verify=True):
+    """Versão aguardável de update_keepa_product executada no executor do Keepa"""
+    return await run_blocking(update_keepa_product, driver, asin, price, verify)
+
+async def update_keepa_products_batch_async(driver, items, verify=True):
+    """Versão aguardável de update_keepa_products_batch executada no executor do Keepa"""
+    return await run_blocking(update_keepa_products_batch, driver, items, verify)
+
+async def delete_keepa_tracking_async(driver, asin):
+    """Versão aguardável de delete_keepa_tracking executada no executor do Keepa"""
+    return await run_blocking(delete_keepa_tracking, driver, asin)
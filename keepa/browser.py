@@ -3,14 +3,158 @@ import time
 import random
 import logging
 import uuid
+import re
+import json
+import shutil
+import threading
 import subprocess
+import tempfile
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
+from config.settings import load_settings
 from utils.logger import get_logger
+from utils.process_metrics import get_process_tree, get_rss_mb
+from keepa.profiles import master_profile_dir
 
 logger = get_logger(__name__)
+settings = load_settings()
+
+# Padrões de URL bloqueados por tipo de recurso (via CDP Network.setBlockedURLs)
+RESOURCE_BLOCK_PATTERNS = {
+    "images": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*graph.keepa.com*"],
+    "fonts": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.m4a", "*.ogg", "*.wav"],
+}
+
+# Domínios de scripts de terceiros que o fluxo de atualização não usa.
+# Resolvidos para NOTFOUND no Chrome inteiro, valendo para todas as abas.
+THIRD_PARTY_HOSTS = [
+    "google-analytics.com", "*.google-analytics.com",
+    "googletagmanager.com", "*.googletagmanager.com",
+    "*.doubleclick.net", "*.googlesyndication.com", "adservice.google.com",
+    "connect.facebook.net", "*.hotjar.com", "*.clarity.ms",
+]
+
+def _configure_lean_browsing(chrome_options, resources):
+    """
+    Adicionar opções do Chrome que evitam baixar recursos desnecessários
+    
+    Args:
+        chrome_options: Opções do Chrome sendo montadas
+        resources: Tipos de recurso a bloquear
+    """
+    prefs = {}
+    if "images" in resources:
+        # Configuração de conteúdo vale para todas as abas do perfil
+        prefs["profile.managed_default_content_settings.images"] = 2
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    if "media" in resources:
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+    if prefs:
+        chrome_options.add_experimental_option("prefs", prefs)
+    if "third_party" in resources:
+        rules = ", ".join(f"MAP {host} ~NOTFOUND" for host in THIRD_PARTY_HOSTS)
+        chrome_options.add_argument(f"--host-resolver-rules={rules}")
+    if resources:
+        logger.info(f"Modo de navegação enxuta ativo, bloqueando: {', '.join(resources)}")
+
+def apply_resource_blocking(driver, resources=None):
+    """
+    Bloquear por URL os tipos de recurso configurados na aba atual
+    
+    O bloqueio via CDP vale por aba, então deve ser reaplicado em abas novas.
+    
+    Args:
+        driver: Instância do WebDriver
+        resources: Tipos de recurso a bloquear (padrão: KEEPA_BLOCK_RESOURCES)
+    """
+    resources = settings.KEEPA_BLOCK_RESOURCES if resources is None else resources
+    patterns = [pattern for resource in resources for pattern in RESOURCE_BLOCK_PATTERNS.get(resource, [])]
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        logger.warning(f"Não foi possível aplicar bloqueio de recursos: {str(e)}")
+
+def get_driver_rss_mb(driver):
+    """
+    Obter a memória residente do chromedriver e de todos os processos do Chrome dele
+    
+    Returns:
+        float: RSS em MB (0 se o PID não puder ser determinado)
+    """
+    try:
+        return get_rss_mb(get_process_tree(driver.service.process.pid))
+    except Exception:
+        return 0.0
+
+def measure_page_load(driver, url, ready_selector=None, timeout=30):
+    """
+    Medir o carregamento de uma página
+    
+    Args:
+        driver: Instância do WebDriver
+        url: URL a carregar
+        ready_selector: Seletor CSS que indica que a página está pronta (opcional)
+        timeout: Tempo máximo de espera em segundos
+        
+    Returns:
+        dict: load_ms, resources (quantidade), transfer_kb e rss_mb
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.common.by import By
+    
+    start = time.monotonic()
+    driver.get(url)
+    WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+        and (not ready_selector or d.find_elements(By.CSS_SELECTOR, ready_selector))
+    )
+    load_ms = (time.monotonic() - start) * 1000
+    
+    resources = driver.execute_script(
+        "var r = performance.getEntriesByType('resource');"
+        "return {count: r.length, bytes: r.reduce(function(t, e) { return t + (e.transferSize || 0); }, 0)};"
+    )
+    return {
+        "load_ms": load_ms,
+        "resources": resources["count"],
+        "transfer_kb": resources["bytes"] / 1024,
+        "rss_mb": get_driver_rss_mb(driver),
+    }
+
+def compare_lean_browsing(url, ready_selector=None):
+    """
+    Comparar carregamento e memória com e sem o modo de navegação enxuta
+    
+    Usa perfis temporários próprios, apagados ao final, sem afetar os drivers das contas.
+    
+    Returns:
+        dict: {"full": medição, "lean": medição}
+    """
+    results = {}
+    for label, resources in (("full", []), ("lean", settings.KEEPA_BLOCK_RESOURCES)):
+        profile_dir = tempfile.mkdtemp(prefix=f"keepa-benchmark-{label}-")
+        try:
+            driver = initialize_driver(f"benchmark-{label}", block_resources=resources, profile_dir=profile_dir)
+            try:
+                # Primeira carga aquece o cache de disco do perfil; a segunda é a medida
+                measure_page_load(driver, url, ready_selector)
+                results[label] = measure_page_load(driver, url, ready_selector)
+            finally:
+                driver.quit()
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+    
+    logger.info(
+        f"Navegação enxuta: {results['full']['load_ms']:.0f}ms/{results['full']['rss_mb']:.0f}MB -> "
+        f"{results['lean']['load_ms']:.0f}ms/{results['lean']['rss_mb']:.0f}MB"
+    )
+    return results
 
 def find_chromedriver_manually():
     """
@@ -58,12 +202,145 @@ def find_chromedriver_manually():
         logger.error(f"Erro ao procurar o chromedriver: {str(e)}")
         return None
 
-def initialize_driver(account_identifier=None):
+# Caminho do chromedriver resolvido uma única vez por processo
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+# Binários do Chrome procurados para descobrir a versão instalada
+CHROME_BINARIES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"]
+
+def _binary_major_version(path):
+    """
+    Obter a versão principal de um binário do Chrome/chromedriver via --version
+    
+    Returns:
+        int: Versão principal ou None se não for possível determinar
+    """
+    try:
+        result = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10)
+        match = re.search(r'(\d+)\.\d+', result.stdout)
+        return int(match.group(1)) if match else None
+    except Exception:
+        return None
+
+def get_chrome_major_version():
+    """
+    Obter a versão principal do Chrome instalado
+    
+    Returns:
+        int: Versão principal ou None se o Chrome não for encontrado
+    """
+    candidates = [os.environ.get("CHROME_BIN")] + [shutil.which(name) for name in CHROME_BINARIES]
+    for path in candidates:
+        if path and os.path.exists(path):
+            version = _binary_major_version(path)
+            if version:
+                return version
+    return None
+
+def _load_chromedriver_cache(chrome_version):
+    """Ler o caminho salvo em disco, se ainda for válido para o Chrome instalado"""
+    cache_file = settings.CHROMEDRIVER_CACHE_FILE
+    if not cache_file or not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, "r") as f:
+            cached = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    
+    path = cached.get("path")
+    if path and os.access(path, os.X_OK) and cached.get("chrome_version") == chrome_version:
+        return path
+    return None
+
+def _save_chromedriver_cache(path, chrome_version, driver_version):
+    cache_file = settings.CHROMEDRIVER_CACHE_FILE
+    if not cache_file:
+        return
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, "w") as f:
+            json.dump({"path": path, "chrome_version": chrome_version, "driver_version": driver_version}, f)
+    except OSError as e:
+        logger.warning(f"Não foi possível salvar o cache do chromedriver: {str(e)}")
+
+def _chromedriver_candidates():
+    """Gerar caminhos candidatos ao chromedriver, do mais barato ao mais caro"""
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path and os.path.exists(env_path):
+        yield env_path
+    
+    manual_path = find_chromedriver_manually()
+    if manual_path:
+        yield manual_path
+    
+    # Último recurso: baixar via webdriver_manager (acessa a rede)
+    try:
+        logger.info("Tentando usar webdriver_manager como último recurso...")
+        yield ChromeDriverManager().install()
+    except Exception as e:
+        logger.error(f"Falha ao obter chromedriver via webdriver_manager: {str(e)}")
+
+def resolve_chromedriver_path(force=False):
+    """
+    Descobrir, verificar e memorizar o caminho do chromedriver
+    
+    A busca acontece uma vez por processo (e opcionalmente é salva em
+    CHROMEDRIVER_CACHE_FILE). Um candidato só é aceito sem aviso se a versão
+    principal bater com a do Chrome instalado.
+    
+    Args:
+        force: Ignorar os caches e procurar novamente
+        
+    Returns:
+        str: Caminho do chromedriver
+    """
+    global _chromedriver_path
+    
+    with _chromedriver_lock:
+        if _chromedriver_path and not force and os.path.exists(_chromedriver_path):
+            return _chromedriver_path
+        
+        chrome_version = get_chrome_major_version()
+        
+        if not force:
+            cached_path = _load_chromedriver_cache(chrome_version)
+            if cached_path:
+                logger.info(f"Chromedriver carregado do cache em disco: {cached_path}")
+                _chromedriver_path = cached_path
+                return cached_path
+        
+        fallback = None
+        for path in _chromedriver_candidates():
+            driver_version = _binary_major_version(path)
+            if chrome_version is None or driver_version == chrome_version:
+                logger.info(f"✅ Chromedriver {driver_version} verificado para Chrome {chrome_version}: {path}")
+                _chromedriver_path = path
+                _save_chromedriver_cache(path, chrome_version, driver_version)
+                return path
+            logger.warning(
+                f"⚠️ Chromedriver em {path} é da versão {driver_version}, mas o Chrome instalado é {chrome_version}"
+            )
+            fallback = fallback or path
+        
+        if not fallback:
+            raise Exception("Chromedriver não encontrado")
+        
+        logger.warning(f"⚠️ Nenhum chromedriver compatível encontrado, usando {fallback}")
+        _chromedriver_path = fallback
+        return fallback
+
+def initialize_driver(account_identifier=None, block_resources=None, profile_dir=None):
     """
     Inicializar WebDriver Selenium para Chrome
     
     Args:
         account_identifier: Identificador opcional para criar diretórios de dados separados para diferentes contas
+        block_resources: Tipos de recurso a bloquear (padrão: KEEPA_BLOCK_RESOURCES)
+        profile_dir: Diretório de perfil a usar no lugar do perfil principal da conta (ex.: um clone)
     
     Returns:
         WebDriver: Instância configurada do WebDriver Chrome
@@ -72,8 +349,7 @@ def initialize_driver(account_identifier=None):
     session_id = account_identifier or "default"
     
     # Usar um diretório fixo para cada conta
-    chrome_data_dir = os.getenv("CHROME_USER_DATA_DIR", "/app/chrome-sessions")
-    account_data_dir = f"{chrome_data_dir}/{session_id}"
+    account_data_dir = profile_dir or master_profile_dir(account_identifier)
     
     # Garantir que o diretório exista
     os.makedirs(account_data_dir, exist_ok=True)
@@ -95,51 +371,29 @@ def initialize_driver(account_identifier=None):
     chrome_options.add_argument("user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     
-    # Tentar criar e configurar o driver
+    # Modo de navegação enxuta
+    block_resources = settings.KEEPA_BLOCK_RESOURCES if block_resources is None else block_resources
+    _configure_lean_browsing(chrome_options, block_resources)
+    
+    # Caminho do chromedriver resolvido uma única vez por processo
+    chromedriver_path = resolve_chromedriver_path()
     try:
-        # Primeiro tentar caminho direto da variável de ambiente
-        chromedriver_path = os.environ.get('CHROMEDRIVER_PATH')
-        if chromedriver_path and os.path.exists(chromedriver_path):
-            logger.info(f"Usando ChromeDriver do caminho da variável de ambiente: {chromedriver_path}")
-            service = Service(executable_path=chromedriver_path)
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            logger.info(f"Chrome inicializado com sucesso usando caminho da variável de ambiente: {chromedriver_path}")
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            logger.info(f"Sessão do navegador inicializada para conta: {account_identifier}")
-            return driver
+        driver = webdriver.Chrome(service=Service(executable_path=chromedriver_path), options=chrome_options)
     except Exception as e:
-        logger.warning(f"Falha ao inicializar Chrome usando caminho da variável de ambiente: {str(e)}")
-    
-    # Tentar encontrar chromedriver manualmente
-    chromedriver_path = find_chromedriver_manually()
-    
-    if chromedriver_path:
+        # O binário memorizado pode ter sido removido ou atualizado: procurar de novo uma vez
+        logger.warning(f"Falha ao inicializar Chrome com {chromedriver_path}: {str(e)}. Procurando chromedriver novamente...")
         try:
-            service = Service(executable_path=chromedriver_path)
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            logger.info(f"Chrome inicializado com sucesso usando caminho manual: {chromedriver_path}")
-            
-            # Desabilitar flag webdriver
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            logger.info(f"Sessão do navegador inicializada para conta: {account_identifier}")
-            return driver
-        except Exception as e:
-            logger.error(f"Erro ao usar caminho manual do chromedriver: {str(e)}")
-            raise Exception(f"Falha ao inicializar Chrome. Erro: {str(e)}")
-    else:
-        # Último recurso: Tentar usar Chrome integrado
-        try:
-            logger.info("Tentando usar webdriver_manager como último recurso...")
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            logger.info("Chrome inicializado com sucesso usando ChromeDriverManager")
-            
-            # Desabilitar flag webdriver
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            logger.info(f"Sessão do navegador inicializada para conta: {account_identifier}")
-            return driver
+            chromedriver_path = resolve_chromedriver_path(force=True)
+            driver = webdriver.Chrome(service=Service(executable_path=chromedriver_path), options=chrome_options)
         except Exception as e:
             logger.error(f"Falha ao inicializar Chrome com todos os métodos. Erro: {str(e)}")
-            raise Exception(f"Falha ao inicializar Chrome com todos os métodos. Erro: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Falha ao inicializar Chrome com todos os métodos. Erro: {str(e)}")
+    
+    logger.info(f"Chrome inicializado com sucesso usando: {chromedriver_path}")
+    
+    # Desabilitar flag webdriver
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    apply_resource_blocking(driver, block_resources)
+    
+    logger.info(f"Sessão do navegador inicializada para conta: {account_identifier}")
+    return driver
@@ -0,0 +1,192 @@
+import random
+import time
+
+from config.settings import load_settings
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+# Estados do disjuntor
+CLOSED = "fechado"       # conta saudável, jobs fluem normalmente
+OPEN = "aberto"          # fila da conta pausada até o fim da espera
+HALF_OPEN = "meio-aberto"  # um único job de sonda decide se a conta volta
+
+# Motivos de falha que abrem o disjuntor na hora, sem esperar o limite de falhas
+IMMEDIATE_REASONS = ("captcha", "login")
+
+
+def backoff_delay(attempt, base, maximum=None):
+    """
+    Espera exponencial com jitter para a tentativa informada
+
+    A espera dobra a cada tentativa (limitada a maximum) e é sorteada entre
+    metade e o valor cheio, para que contas e comentários que falharam juntos
+    não voltem todos no mesmo instante.
+
+    Args:
+        attempt: Número da tentativa (1 = primeira espera)
+        base: Espera da primeira tentativa em segundos
+        maximum: Limite da espera em segundos (padrão: sem limite)
+
+    Returns:
+        float: Segundos a esperar
+    """
+    delay = base * 2 ** max(0, attempt - 1)
+    if maximum is not None:
+        delay = min(delay, maximum)
+    return random.uniform(delay / 2, delay)
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de saúde de uma conta Keepa (fechado / aberto / meio-aberto)
+
+    Falhas seguidas de operações, um login recusado ou um CAPTCHA abrem o
+    disjuntor e a fila da conta fica pausada por uma espera exponencial com
+    jitter. Terminada a espera, o disjuntor fica meio-aberto e libera um único
+    job: se ele der certo a conta volta ao normal, se falhar a pausa recomeça
+    com o dobro do tempo.
+    """
+
+    def __init__(self, account_identifier):
+        self.account_identifier = account_identifier
+        self.state = CLOSED
+        self.failures = 0
+        # Aberturas seguidas sem nenhum sucesso, usadas no cálculo da espera
+        self.trips = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.last_reason = None
+        self.opened_total = 0
+        # ASINs com operação malsucedida desde o último sucesso
+        self.failed_asins = set()
+
+    def wait_time(self):
+        """
+        Tempo até a fila da conta poder voltar a executar jobs
+
+        Returns:
+            float: 0 se um job pode começar agora, os segundos restantes da
+                   pausa, ou None se uma sonda está em andamento (esperar o resultado)
+        """
+        if self.state == CLOSED:
+            return 0
+        if self.state == HALF_OPEN and self.probing:
+            return None
+        return max(0.0, self.open_until - time.monotonic())
+
+    def begin(self):
+        """Registrar o início de um job; após a pausa, ele passa a ser a sonda da conta"""
+        if self.state == OPEN and time.monotonic() >= self.open_until:
+            self.state = HALF_OPEN
+            logger.info(f"🟡 Disjuntor da conta {self.account_identifier} meio-aberto, enviando job de sonda")
+        if self.state == HALF_OPEN:
+            self.probing = True
+
+    def record_success(self):
+        """Uma operação da conta deu certo: fechar o disjuntor"""
+        if self.state != CLOSED:
+            logger.info(f"🟢 Disjuntor da conta {self.account_identifier} fechado, fila retomada")
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.probing = False
+        self.failed_asins.clear()
+
+    def record_neutral(self):
+        """Resultado que não diz nada sobre a conta: liberar a sonda para o próximo job"""
+        self.probing = False
+
+    def record_failure(self, reason, asins=()):
+        """
+        Registrar uma falha da conta
+
+        Uma operação que retornou falha ("falha") pode ser culpa do produto
+        (ASIN inexistente, página que não carrega), então só conta quando
+        atinge um ASIN que ainda não tinha falhado desde o último sucesso.
+
+        Args:
+            reason: "captcha", "login", "erro" (exceção) ou "falha" (operação retornou falha)
+            asins: ASINs dos jobs que falharam (usados apenas com "falha")
+
+        Returns:
+            bool: True se a falha abriu o disjuntor
+        """
+        if reason == "falha":
+            new_asins = set(asins) - self.failed_asins
+            if not new_asins:
+                self.record_neutral()
+                return False
+            self.failed_asins |= new_asins
+        self.failures += 1
+        self.last_reason = reason
+        if (
+            self.state != CLOSED
+            or reason in IMMEDIATE_REASONS
+            or self.failures >= settings.KEEPA_BREAKER_FAILURE_THRESHOLD
+        ):
+            self._open(reason)
+            return True
+        return False
+
+    def _open(self, reason):
+        self.trips += 1
+        self.opened_total += 1
+        delay = backoff_delay(self.trips, settings.KEEPA_BREAKER_BASE_DELAY, settings.KEEPA_BREAKER_MAX_DELAY)
+        self.state = OPEN
+        self.probing = False
+        self.open_until = time.monotonic() + delay
+        logger.warning(
+            f"🔴 Disjuntor da conta {self.account_identifier} aberto ({reason}, {self.failures} falha(s)): "
+            f"fila pausada por {delay:.0f}s"
+        )
+
+    def stats(self):
+        """
+        Obter o estado do disjuntor
+
+        Returns:
+            dict: state, failures, last_reason, opened_total e retry_in (segundos até a próxima sonda)
+        """
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_reason": self.last_reason,
+            "opened_total": self.opened_total,
+            "retry_in": max(0.0, self.open_until - time.monotonic()) if self.state == OPEN else 0.0,
+        }
+
+
+class CircuitBreakers:
+    """Disjuntores criados sob demanda, um por conta Keepa"""
+
+    def __init__(self):
+        self._breakers = {}
+
+    def get(self, account_identifier):
+        if account_identifier not in self._breakers:
+            self._breakers[account_identifier] = CircuitBreaker(account_identifier)
+        return self._breakers[account_identifier]
+
+    def is_closed(self, account_identifier):
+        """Verificar se a conta está saudável (contas sem histórico contam como saudáveis)"""
+        breaker = self._breakers.get(account_identifier)
+        return breaker is None or breaker.state == CLOSED
+
+    def stats(self):
+        """
+        Obter o estado dos disjuntores
+
+        Returns:
+            dict: Por conta, o resultado de CircuitBreaker.stats
+        """
+        return {
+            account_identifier: breaker.stats()
+            for account_identifier, breaker in sorted(self._breakers.items())
+        }
+
+
+# Disjuntores compartilhados entre o agendador, message_processor e handlers
+circuit_breakers = CircuitBreakers()
@@ -0,0 +1,378 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from config.settings import load_settings
+from keepa.browser import initialize_driver
+from keepa.profiles import clone_profile, worker_profile_dir, ProfileLock
+from keepa.api import login_to_keepa, run_blocking, forget_prefetched_tabs
+from utils.process_metrics import list_processes, get_process_tree, get_rss_mb
+from utils.tracing import tracer
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+# Nomes de processo (comm, até 15 caracteres) considerados parte do Chrome
+CHROME_PROCESS_NAMES = ("chrome", "chromedriver", "chrome_crashpad", "google-chrome")
+
+
+class KeepaLoginError(Exception):
+    """Falha ao autenticar uma conta Keepa em um driver novo"""
+
+
+class ProfileInUseError(Exception):
+    """O diretório de perfil já está aberto por outra instância do Chrome"""
+
+
+@dataclass
+class PooledDriver:
+    """Driver do pool com a árvore de processos e contadores de uso"""
+    driver: object
+    root_pid: int
+    pids: set = field(default_factory=set)
+    profile_lock: object = None
+    operations: int = 0
+    rss_mb: float = 0.0
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class DriverPool:
+    """
+    Pool de drivers Chrome já logados, indexados por identificador de conta
+
+    Cada driver ocupa uma vaga (conta, instância). A instância 0 usa o perfil
+    principal da conta; as demais usam clones dele, recriados a cada
+    inicialização, o que permite vários Chrome logados na mesma conta.
+    O acesso a cada vaga é serializado com um lock próprio e cada perfil é
+    protegido por um arquivo de trava. O pool também acompanha a árvore de
+    processos de cada driver, recicla drivers após muitas operações ou acima
+    do limite de memória e mata processos do Chrome que ficaram órfãos.
+    """
+
+    def __init__(self):
+        self._drivers = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        # Drivers sendo criados (ou abertos fora do pool) não estão registrados; a limpeza de órfãos espera
+        self._launching = 0
+
+    def _lock_for(self, slot):
+        with self._guard:
+            if slot not in self._locks:
+                self._locks[slot] = threading.Lock()
+            return self._locks[slot]
+
+    @staticmethod
+    def _label(slot):
+        """Nome da vaga usado em logs e no status (ex.: "Premium" ou "Premium#2")"""
+        account_identifier, instance = slot
+        return f"{account_identifier}#{instance}" if instance else account_identifier
+
+    def _slots_of(self, account_identifier):
+        return [slot for slot in list(self._drivers.keys()) if slot[0] == account_identifier]
+
+    def _is_healthy(self, driver):
+        """Verificar se o navegador ainda responde a comandos"""
+        try:
+            driver.execute_script("return document.readyState")
+            return True
+        except Exception as e:
+            logger.warning(f"Driver não respondeu ao health check: {str(e)}")
+            return False
+
+    def _refresh_process_info(self, entry):
+        """Atualizar a árvore de processos (o Chrome cria renderers sob demanda) e o RSS"""
+        tree = get_process_tree(entry.root_pid)
+        if tree:
+            entry.pids = tree
+        entry.rss_mb = get_rss_mb(entry.pids)
+
+    def _kill_pids(self, pids):
+        """Matar processos que sobreviveram ao driver.quit()"""
+        killed = 0
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+            except (ProcessLookupError, PermissionError):
+                continue
+            # Coletar o processo se for filho direto do bot, evitando zumbis
+            try:
+                os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                pass
+        return killed
+
+    def _quit(self, slot, entry):
+        self._refresh_process_info(entry)
+        forget_prefetched_tabs(entry.driver)
+        try:
+            entry.driver.quit()
+            logger.info(f"Sessão do driver Chrome fechada para a conta {self._label(slot)}")
+        except Exception as e:
+            logger.error(f"Erro ao fechar o driver Chrome: {str(e)}")
+
+        survivors = entry.pids & set(list_processes().keys())
+        if survivors:
+            killed = self._kill_pids(survivors)
+            logger.info(f"🧹 {killed} processo(s) do Chrome remanescente(s) da conta {self._label(slot)} finalizado(s)")
+
+        # Só liberar o perfil depois que nenhum processo do Chrome o usa mais
+        if entry.profile_lock is not None:
+            entry.profile_lock.release()
+
+    def _launch(self, slot):
+        """Abrir o Chrome da vaga com o perfil travado (clonado, se não for a instância 0)"""
+        account_identifier, instance = slot
+        profile_lock = ProfileLock(worker_profile_dir(account_identifier, instance))
+        if not profile_lock.acquire():
+            raise ProfileInUseError(f"Perfil da conta {self._label(slot)} já está em uso ({profile_lock.path})")
+
+        try:
+            profile_dir = clone_profile(account_identifier, instance) if instance else None
+            driver = initialize_driver(account_identifier, profile_dir=profile_dir)
+        except Exception:
+            profile_lock.release()
+            raise
+        return PooledDriver(driver=driver, root_pid=driver.service.process.pid, profile_lock=profile_lock)
+
+    def _get_or_create(self, slot):
+        """Retornar um driver saudável e logado, criando um novo se necessário"""
+        account_identifier = slot[0]
+        entry = self._drivers.get(slot)
+
+        if entry is not None:
+            if self._is_healthy(entry.driver):
+                logger.info(f"♻️ Reutilizando driver aquecido para conta {self._label(slot)}")
+                return entry
+            logger.info(f"Descartando driver inválido da conta {self._label(slot)}")
+            self._drivers.pop(slot, None)
+            self._quit(slot, entry)
+
+        start = time.monotonic()
+        with self._guard:
+            self._launching += 1
+        try:
+            with tracer.span("chrome: iniciar", account=account_identifier, instance=slot[1]):
+                entry = self._launch(slot)
+                self._refresh_process_info(entry)
+            try:
+                with tracer.span("login", account=account_identifier, instance=slot[1]) as span:
+                    login_success = login_to_keepa(entry.driver, account_identifier)
+                    if not login_success:
+                        span["status"] = "falha"
+            except Exception:
+                self._quit(slot, entry)
+                raise
+
+            if not login_success:
+                self._quit(slot, entry)
+                raise KeepaLoginError(f"Falha ao fazer login no Keepa com a conta {account_identifier}")
+
+            self._drivers[slot] = entry
+        finally:
+            with self._guard:
+                self._launching -= 1
+
+        logger.info(f"Driver aquecido para conta {self._label(slot)} em {time.monotonic() - start:.1f}s")
+        return entry
+
+    def _recycle_if_needed(self, slot, entry):
+        """Reciclar o driver após N operações ou acima do limite de memória"""
+        self._refresh_process_info(entry)
+        reason = None
+        if settings.KEEPA_DRIVER_MAX_OPERATIONS and entry.operations >= settings.KEEPA_DRIVER_MAX_OPERATIONS:
+            reason = f"{entry.operations} operações"
+        elif settings.KEEPA_DRIVER_MAX_RSS_MB and entry.rss_mb >= settings.KEEPA_DRIVER_MAX_RSS_MB:
+            reason = f"{entry.rss_mb:.0f} MB de memória"
+
+        if reason:
+            logger.info(f"♻️ Reciclando driver da conta {self._label(slot)} ({reason})")
+            self._discard_locked(slot)
+
+    @contextmanager
+    def session(self, account_identifier, instance=0):
+        """
+        Obter acesso exclusivo ao driver logado de uma conta
+
+        Se o bloco gerar uma exceção o driver é reciclado, para que a próxima
+        operação comece com um navegador novo.
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+            instance: Instância do Chrome da conta (0 = perfil principal)
+
+        Yields:
+            WebDriver: Driver logado na conta
+        """
+        slot = (account_identifier, instance)
+        with self._lock_for(slot):
+            entry = self._get_or_create(slot)
+            try:
+                yield entry.driver
+            except Exception:
+                self._discard_locked(slot)
+                raise
+            entry.operations += 1
+            self._recycle_if_needed(slot, entry)
+
+    def _discard_locked(self, slot):
+        entry = self._drivers.pop(slot, None)
+        if entry is not None:
+            self._quit(slot, entry)
+
+    def discard(self, account_identifier, instance=None):
+        """
+        Reciclar drivers de uma conta (ex.: após uma operação falhar)
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+            instance: Instância a reciclar (padrão: todas as instâncias da conta)
+        """
+        slots = self._slots_of(account_identifier) if instance is None else [(account_identifier, instance)]
+        for slot in slots:
+            with self._lock_for(slot):
+                self._discard_locked(slot)
+
+    def run(self, account_identifier, operation, *args, instance=0):
+        """
+        Executar uma operação síncrona com o driver logado da conta
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+            operation: Função que recebe o driver como primeiro argumento
+            *args: Argumentos adicionais da operação
+            instance: Instância do Chrome da conta (0 = perfil principal)
+
+        Returns:
+            O retorno da operação
+        """
+        with self.session(account_identifier, instance) as driver:
+            return operation(driver, *args)
+
+    async def run_async(self, account_identifier, operation, *args, instance=0):
+        """Versão aguardável de run, executada no executor do Keepa"""
+        return await run_blocking(self.run, account_identifier, operation, *args, instance=instance)
+
+    async def discard_async(self, account_identifier, instance=None):
+        """Versão aguardável de discard, executada no executor do Keepa"""
+        await run_blocking(self.discard, account_identifier, instance)
+
+    def accounts(self):
+        """Listar contas com driver aquecido"""
+        return sorted({account_identifier for account_identifier, _ in list(self._drivers.keys())})
+
+    def is_warm(self, account_identifier, instance=0):
+        """Verificar se a instância da conta (padrão: perfil principal) já tem um driver aberto e logado"""
+        return (account_identifier, instance) in self._drivers
+
+    def stats(self):
+        """
+        Obter uso de cada driver aquecido
+
+        Returns:
+            dict: Por conta (e instância), operações, RSS em MB, número de processos e idade em segundos
+        """
+        now = time.monotonic()
+        return {
+            self._label(slot): {
+                "operations": entry.operations,
+                "rss_mb": entry.rss_mb,
+                "processes": len(entry.pids),
+                "age": now - entry.created_at,
+            }
+            for slot, entry in list(self._drivers.items())
+        }
+
+    @contextmanager
+    def unmanaged_chrome(self):
+        """
+        Suspender a limpeza de órfãos enquanto um Chrome fora do pool está aberto
+
+        Usado por operações que criam o próprio driver (ex.: /lean_benchmark),
+        cujos processos reap_orphans consideraria órfãos.
+        """
+        with self._guard:
+            self._launching += 1
+        try:
+            yield
+        finally:
+            with self._guard:
+                self._launching -= 1
+
+    def reap_orphans(self):
+        """
+        Matar processos do Chrome que não pertencem a nenhum driver do pool
+
+        São considerados órfãos processos do Chrome cujo pai é o init (PID 1)
+        ou o próprio bot, e que não estão na árvore de um driver ativo.
+
+        Returns:
+            int: Número de processos finalizados
+        """
+        # O guard fica preso da leitura do /proc até o kill: um Chrome novo só
+        # começa a ser aberto depois de incrementar _launching sob o mesmo guard
+        with self._guard:
+            if self._launching:
+                return 0
+
+            processes = list_processes()
+            tracked = set()
+            for entry in list(self._drivers.values()):
+                tracked |= get_process_tree(entry.root_pid, processes) or entry.pids
+
+            own_pid = os.getpid()
+            orphans = set()
+            for pid, (name, ppid) in processes.items():
+                if pid in tracked or pid == own_pid or not name.startswith(CHROME_PROCESS_NAMES):
+                    continue
+                if ppid in (1, own_pid):
+                    orphans |= get_process_tree(pid, processes)
+
+            orphans -= tracked
+            if not orphans:
+                return 0
+
+            killed = self._kill_pids(orphans)
+        logger.info(f"🧹 {killed} processo(s) órfão(s) do Chrome finalizado(s)")
+        return killed
+
+    def check_memory(self):
+        """Reciclar drivers ociosos que passaram do limite de memória"""
+        for slot in list(self._drivers.keys()):
+            lock = self._lock_for(slot)
+            # Drivers em uso são verificados ao final da operação atual
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                entry = self._drivers.get(slot)
+                if entry is not None:
+                    self._recycle_if_needed(slot, entry)
+            finally:
+                lock.release()
+
+    async def run_maintenance(self, interval=None):
+        """Verificar memória e limpar processos órfãos periodicamente"""
+        interval = interval or settings.KEEPA_REAPER_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_blocking(self.check_memory)
+                await run_blocking(self.reap_orphans)
+            except Exception as e:
+                logger.error(f"Erro na manutenção dos drivers: {str(e)}")
+
+    def close_all(self):
+        """Fechar todos os drivers do pool"""
+        for account_identifier, instance in list(self._drivers.keys()):
+            self.discard(account_identifier, instance)
+
+
+# Pool compartilhado entre message_processor e handlers
+driver_pool = DriverPool()
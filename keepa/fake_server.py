@@ -0,0 +1,479 @@
+"""
+Servidor HTTP local que imita as páginas do Keepa usadas pelo bot
+
+Serve uma página única com os mesmos seletores que keepa/api.py procura
+(#panelUserMenu, #loginOverlay, #productInfoBox, #tabTrack, #updateTracking,
+#submitTracking, #deleteTracking e a lista #trackingTable), com latências e
+falhas artificiais configuráveis. Com KEEPA_BASE_URL apontando para ele, o
+login, a atualização, a exclusão e a leitura da lista de rastreamento rodam
+de ponta a ponta no Chrome sem acessar o keepa.com.
+
+Uso:
+    python -m keepa.fake_server --port 8765 --page-latency 0.5 --submit-failure-rate 0.05
+    KEEPA_BASE_URL=http://127.0.0.1:8765 python main.py
+"""
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field, asdict, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_COOKIE = "keepa_session"
+ASIN_PATTERN = re.compile(r"^[A-Z0-9]{10}$")
+PRICE_PATTERN = re.compile(r"^\d[\d.,]*$")
+
+
+@dataclass
+class FakeKeepaOptions:
+    """Latências (segundos) e taxas de falha (0 a 1) do servidor falso"""
+    # Resposta do HTML da página (simula o carregamento inicial do Keepa)
+    page_latency: float = 0.3
+    # Resposta das chamadas de API (produto, login, salvar/excluir alerta, lista)
+    api_latency: float = 0.15
+    # Tempo que a página leva para renderizar o produto e o formulário depois da resposta
+    render_latency: float = 0.2
+    # Variação aleatória aplicada às latências (0.3 = ±30%)
+    jitter: float = 0.3
+    # Página do produto que nunca renderiza #productInfoBox
+    product_failure_rate: float = 0.0
+    # Envio ou exclusão de alerta recusado com mensagem de erro
+    submit_failure_rate: float = 0.0
+    # Formulário de login exibido com CAPTCHA
+    captcha_rate: float = 0.0
+    # Login recusado com #loginError
+    login_failure_rate: float = 0.0
+    # Usuário -> senha aceitos (vazio = qualquer usuário e senha)
+    accounts: dict = field(default_factory=dict)
+    # Semente do sorteio das falhas, para execuções reproduzíveis
+    seed: Optional[int] = None
+
+
+class FakeKeepaState:
+    """Sessões, alertas por usuário, contadores e sorteio de falhas, compartilhados entre as threads"""
+
+    def __init__(self, options):
+        self.options = options
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.alerts = {}
+        self.stats = {}
+        self.random = random.Random(options.seed)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def chance(self, rate):
+        """Sortear uma falha com a taxa informada"""
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self, seconds):
+        """Dormir a latência configurada com jitter"""
+        if seconds <= 0:
+            return
+        with self.lock:
+            factor = 1 + self.random.uniform(-self.options.jitter, self.options.jitter)
+        time.sleep(max(0.0, seconds * factor))
+
+    def jittered(self, seconds):
+        with self.lock:
+            return max(0.0, seconds * (1 + self.random.uniform(-self.options.jitter, self.options.jitter)))
+
+    def reset(self):
+        with self.lock:
+            self.sessions.clear()
+            self.alerts.clear()
+            self.stats.clear()
+            self.random = random.Random(self.options.seed)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": dict(self.stats),
+                "sessions": len(self.sessions),
+                "alerts": {user: len(alerts) for user, alerts in self.alerts.items()},
+                "options": asdict(self.options),
+            }
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Keepa (servidor falso)</title>
+<style>
+body { font-family: sans-serif; margin: 0; }
+#topMenu { padding: 8px; background: #eee; }
+#loginOverlay { display: none; padding: 16px; border: 1px solid #ccc; }
+#content { padding: 16px; }
+.hidden { display: none; }
+.tab { display: inline-block; padding: 4px 8px; border: 1px solid #999; cursor: pointer; }
+</style>
+</head>
+<body>
+<div id="topMenu"></div>
+<div id="content"></div>
+<script>
+var FAKE = __CONFIG__;
+
+function el(id) { return document.getElementById(id); }
+
+function api(method, path, body) {
+    return fetch(path, {
+        method: method,
+        credentials: "same-origin",
+        headers: {"Content-Type": "application/json"},
+        body: body ? JSON.stringify(body) : undefined
+    }).then(function(response) {
+        return response.json().then(function(data) { data.ok = response.ok; return data; });
+    });
+}
+
+function renderMenu() {
+    var menu = el("topMenu");
+    if (FAKE.user) {
+        menu.innerHTML = '<div id="panelUserMenu"><span id="panelUsername"></span></div>';
+        el("panelUsername").textContent = FAKE.user;
+        return;
+    }
+    menu.innerHTML =
+        '<a class="loginLink" href="javascript:void(0)">Log in</a>' +
+        '<div id="loginOverlay">' +
+        '<label>Username <input id="username" type="text"></label>' +
+        '<label>Password <input id="password" type="password"></label>' +
+        '<button id="submitLogin">Log in</button>' +
+        '<div id="loginError"></div>' +
+        '<div id="sectionLoginOtp" class="hidden">OTP</div>' +
+        (FAKE.captcha ? '<iframe title="reCAPTCHA" src="about:blank" width="300" height="80"></iframe>' : '') +
+        '</div>';
+    document.querySelector("a.loginLink").onclick = function() { el("loginOverlay").style.display = "block"; };
+    el("submitLogin").onclick = function() {
+        api("POST", "/api/login", {username: el("username").value, password: el("password").value}).then(function(data) {
+            if (!data.ok) { el("loginError").textContent = data.error; return; }
+            FAKE.user = data.username;
+            renderMenu();
+        });
+    };
+}
+
+function renderTrackPanel(asin, price) {
+    var panel = el("trackPanel");
+    var exists = price !== null;
+    panel.innerHTML =
+        (exists ? '<button id="updateTracking">Update tracking</button><button id="deleteTracking">Delete tracking</button>' : '') +
+        '<div id="trackForm"' + (exists ? ' class="hidden"' : '') + '>' +
+        '<div class="mdc-text-field"><label>Amazon</label><input type="text"></div>' +
+        '<button id="submitTracking">Track</button></div>' +
+        '<div class="mdc-snackbar__label"></div>';
+    panel.querySelector("input").value = exists ? price : "";
+    function fail(data) { panel.querySelector(".mdc-snackbar__label").textContent = data.error; }
+    if (exists) {
+        el("updateTracking").onclick = function() { el("trackForm").className = ""; };
+        el("deleteTracking").onclick = function() {
+            api("DELETE", "/api/tracking/" + asin).then(function(data) {
+                if (data.ok) { renderTrackPanel(asin, null); } else { fail(data); }
+            });
+        };
+    }
+    el("submitTracking").onclick = function() {
+        var value = panel.querySelector("input").value;
+        api("POST", "/api/tracking/" + asin, {price: value}).then(function(data) {
+            if (data.ok) { renderTrackPanel(asin, data.price); } else { fail(data); }
+        });
+    };
+}
+
+function renderProduct(asin) {
+    var content = el("content");
+    content.innerHTML = '<div class="loading">Carregando...</div>';
+    api("GET", "/api/product/" + asin).then(function(data) {
+        if (!data.ok || location.hash.indexOf(asin) === -1) { return; }
+        setTimeout(function() {
+            content.innerHTML =
+                '<div id="productInfoBox"><h2></h2></div>' +
+                '<div id="tabTrack" class="tab">Track Product</div>' +
+                '<div id="trackPanel"></div>';
+            content.querySelector("h2").textContent = data.title;
+            el("tabTrack").onclick = function() {
+                setTimeout(function() { renderTrackPanel(asin, data.tracking); }, data.render_ms / 2);
+            };
+        }, data.render_ms);
+    });
+}
+
+function renderTracking() {
+    var content = el("content");
+    content.innerHTML = '<div class="loading">Carregando...</div>';
+    api("GET", "/api/tracking").then(function(data) {
+        if (!data.ok) { content.innerHTML = '<div class="error"></div>'; content.firstChild.textContent = data.error; return; }
+        if (!data.items.length) { content.innerHTML = '<div id="trackingEmpty">Nenhum produto rastreado</div>'; return; }
+        var table = document.createElement("table");
+        table.id = "trackingTable";
+        data.items.forEach(function(item) {
+            var row = table.insertRow();
+            row.setAttribute("data-asin", item.asin);
+            var link = document.createElement("a");
+            link.href = "#!product/12-" + item.asin;
+            link.textContent = item.asin;
+            row.insertCell().appendChild(link);
+            var price = row.insertCell();
+            price.setAttribute("data-type", "amazon");
+            price.textContent = item.price;
+        });
+        content.innerHTML = "";
+        content.appendChild(table);
+    });
+}
+
+function route() {
+    var product = /^#!product\\/\\d+-([A-Z0-9]{10})/.exec(location.hash);
+    if (product) { return renderProduct(product[1]); }
+    if (location.hash.indexOf("#!tracking") === 0) { return renderTracking(); }
+    el("content").innerHTML = '<div id="homePage">Keepa</div>';
+}
+
+renderMenu();
+window.addEventListener("hashchange", route);
+route();
+</script>
+</body>
+</html>
+"""
+
+
+class FakeKeepaHandler(BaseHTTPRequestHandler):
+    """Rotas da página e da API do servidor falso; o estado fica em server.state"""
+
+    server_version = "FakeKeepa/1.0"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _session_user(self):
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == SESSION_COOKIE:
+                with self.state.lock:
+                    return self.state.sessions.get(value)
+        return None
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Cache-Control", "no-store")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _asin(self, path, prefix):
+        asin = path[len(prefix):].upper()
+        return asin if ASIN_PATTERN.match(asin) else None
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        options = self.state.options
+
+        if path == "/":
+            self.state.count("page")
+            self.state.delay(options.page_latency)
+            user = self._session_user()
+            captcha = user is None and self.state.chance(options.captcha_rate)
+            if captcha:
+                self.state.count("captcha")
+            # Evitar que um nome de usuário feche a tag <script>
+            config = json.dumps({"user": user, "captcha": captcha}).replace("</", "<\\/")
+            self._send(200, PAGE_TEMPLATE.replace("__CONFIG__", config), "text/html")
+        elif path.startswith("/api/product/"):
+            self.state.count("product")
+            self.state.delay(options.api_latency)
+            asin = self._asin(path, "/api/product/")
+            if asin is None:
+                self._send(404, {"error": "ASIN inválido"})
+                return
+            if self.state.chance(options.product_failure_rate):
+                self.state.count("product_failure")
+                self._send(503, {"error": "Produto indisponível"})
+                return
+            user = self._session_user()
+            with self.state.lock:
+                tracking = self.state.alerts.get(user, {}).get(asin) if user else None
+            self._send(200, {
+                "asin": asin,
+                "title": f"Produto {asin}",
+                "tracking": tracking,
+                "render_ms": int(self.state.jittered(options.render_latency) * 1000),
+            })
+        elif path == "/api/tracking":
+            self.state.count("tracking_list")
+            self.state.delay(options.api_latency)
+            user = self._session_user()
+            if user is None:
+                self._send(401, {"error": "Faça login para ver a lista de rastreamento"})
+                return
+            with self.state.lock:
+                items = [{"asin": asin, "price": price} for asin, price in sorted(self.state.alerts.get(user, {}).items())]
+            self._send(200, {"items": items})
+        elif path == "/__stats":
+            self._send(200, self.state.snapshot())
+        else:
+            self._send(404, {"error": "não encontrado"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        options = self.state.options
+        body = self._read_json()
+
+        if path == "/api/login":
+            self.state.count("login")
+            self.state.delay(options.api_latency)
+            username, password = str(body.get("username", "")).strip(), str(body.get("password", ""))
+            accepted = username and password and (not options.accounts or options.accounts.get(username) == password)
+            if not accepted or self.state.chance(options.login_failure_rate):
+                self.state.count("login_failure")
+                self._send(401, {"error": "Usuário ou senha inválidos"})
+                return
+            token = secrets.token_hex(16)
+            with self.state.lock:
+                self.state.sessions[token] = username
+            self._send(200, {"username": username}, headers={
+                "Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/; Max-Age=2592000; SameSite=Lax"
+            })
+        elif path.startswith("/api/tracking/"):
+            self.state.count("submit")
+            self.state.delay(options.api_latency)
+            user = self._session_user()
+            asin = self._asin(path, "/api/tracking/")
+            price = str(body.get("price", "")).strip()
+            if user is None:
+                self._send(401, {"error": "Faça login para rastrear produtos"})
+            elif asin is None or not PRICE_PATTERN.match(price):
+                self._send(400, {"error": "Preço inválido"})
+            elif self.state.chance(options.submit_failure_rate):
+                self.state.count("submit_failure")
+                self._send(503, {"error": "Erro ao salvar o alerta, tente novamente"})
+            else:
+                with self.state.lock:
+                    self.state.alerts.setdefault(user, {})[asin] = price
+                self._send(200, {"asin": asin, "price": price})
+        elif path == "/__config":
+            with self.state.lock:
+                for option in fields(FakeKeepaOptions):
+                    if option.name in body:
+                        setattr(self.state.options, option.name, body[option.name])
+            logger.info(f"Configuração do servidor falso alterada: {body}")
+            self._send(200, asdict(self.state.options))
+        elif path == "/__reset":
+            self.state.reset()
+            self._send(200, {"reset": True})
+        else:
+            self._send(404, {"error": "não encontrado"})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        options = self.state.options
+        if not path.startswith("/api/tracking/"):
+            self._send(404, {"error": "não encontrado"})
+            return
+
+        self.state.count("delete")
+        self.state.delay(options.api_latency)
+        user = self._session_user()
+        asin = self._asin(path, "/api/tracking/")
+        if user is None or asin is None:
+            self._send(401, {"error": "Faça login para excluir alertas"})
+        elif self.state.chance(options.submit_failure_rate):
+            self.state.count("delete_failure")
+            self._send(503, {"error": "Erro ao excluir o alerta, tente novamente"})
+        else:
+            with self.state.lock:
+                self.state.alerts.get(user, {}).pop(asin, None)
+            self._send(200, {"asin": asin})
+
+
+def start_fake_keepa(host="127.0.0.1", port=0, options=None):
+    """
+    Iniciar o servidor falso em uma thread em segundo plano
+
+    Args:
+        host: Endereço de escuta
+        port: Porta (0 = porta livre qualquer)
+        options: FakeKeepaOptions (padrão: latências padrão e sem falhas)
+
+    Returns:
+        tuple: (servidor, URL base); chame servidor.shutdown() para encerrar
+    """
+    server = ThreadingHTTPServer((host, port), FakeKeepaHandler)
+    server.daemon_threads = True
+    server.state = FakeKeepaState(options or FakeKeepaOptions())
+    thread = threading.Thread(target=server.serve_forever, name="fake-keepa", daemon=True)
+    thread.start()
+    url = f"http://{host}:{server.server_address[1]}"
+    logger.info(f"🧪 Keepa falso ouvindo em {url}")
+    return server, url
+
+
+def _parse_accounts(value):
+    accounts = {}
+    for item in value.split(","):
+        username, _, password = item.strip().partition(":")
+        if username:
+            accounts[username] = password
+    return accounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita as páginas do Keepa usadas pelo bot")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    defaults = FakeKeepaOptions()
+    for option in ("page_latency", "api_latency", "render_latency", "jitter",
+                   "product_failure_rate", "submit_failure_rate", "captcha_rate", "login_failure_rate"):
+        parser.add_argument(f"--{option.replace('_', '-')}", type=float, default=getattr(defaults, option))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--accounts", default="", help="usuario:senha separados por vírgula (vazio = aceitar qualquer login)")
+    args = parser.parse_args()
+
+    options = FakeKeepaOptions(
+        **{option.name: getattr(args, option.name) for option in fields(FakeKeepaOptions) if option.name != "accounts"},
+        accounts=_parse_accounts(args.accounts)
+    )
+    server, url = start_fake_keepa(args.host, args.port, options)
+    print(f"Keepa falso em {url} — use KEEPA_BASE_URL={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import fcntl
+import os
+import shutil
+import subprocess
+import time
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Diretórios de cache do Chrome: grandes e descartáveis, não vale copiar para os clones
+PROFILE_SKIP_DIRS = {
+    "Cache", "Code Cache", "GPUCache", "ShaderCache", "GrShaderCache",
+    "GraphiteDawnCache", "DawnCache", "CacheStorage", "ScriptCache",
+    "Crashpad", "component_crx_cache", "optimization_guide_model_store",
+}
+# Arquivos de trava de uma instância do Chrome em execução
+PROFILE_SKIP_FILES = {"SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile", "LOCK"}
+
+def chrome_data_dir():
+    """Diretório base dos perfis do Chrome"""
+    return os.getenv("CHROME_USER_DATA_DIR", "/app/chrome-sessions")
+
+def master_profile_dir(account_identifier):
+    """Perfil principal da conta, onde a sessão do Keepa é mantida"""
+    return os.path.join(chrome_data_dir(), account_identifier or "default")
+
+def worker_profile_dir(account_identifier, instance):
+    """Perfil da instância; a instância 0 usa o próprio perfil principal"""
+    if not instance:
+        return master_profile_dir(account_identifier)
+    return os.path.join(chrome_data_dir(), f"{account_identifier or 'default'}-worker{instance}")
+
+def _ignore_profile_entries(directory, names):
+    return [name for name in names if name in PROFILE_SKIP_DIRS or name in PROFILE_SKIP_FILES]
+
+def _reflink_copy(source, destination):
+    """
+    Copiar com cópia sob demanda (reflink) quando o sistema de arquivos suporta
+
+    Em btrfs/XFS os clones compartilham os blocos do perfil principal até
+    serem modificados; em outros sistemas "cp" faz uma cópia normal.
+    """
+    # cp não tem filtro de exclusão: copiar tudo e remover caches e travas em seguida
+    subprocess.run(
+        ["cp", "-a", "--reflink=auto", f"{source}/.", destination],
+        check=True, capture_output=True
+    )
+    for root, dirs, files in os.walk(destination, topdown=True):
+        for name in list(dirs):
+            if name in PROFILE_SKIP_DIRS:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                dirs.remove(name)
+        for name in files:
+            if name in PROFILE_SKIP_FILES:
+                os.remove(os.path.join(root, name))
+
+def clone_profile(account_identifier, instance):
+    """
+    Recriar o perfil de uma instância a partir do perfil principal da conta
+
+    Cookies e armazenamento local (a sessão logada) são copiados; caches e
+    travas do Chrome são ignorados. Hardlinks não são usados porque o Chrome
+    altera os bancos SQLite do perfil no próprio arquivo, o que corromperia
+    o perfil principal.
+
+    Args:
+        account_identifier: Identificador da conta
+        instance: Número da instância (>= 1)
+
+    Returns:
+        str: Caminho do perfil clonado
+    """
+    source = master_profile_dir(account_identifier)
+    destination = worker_profile_dir(account_identifier, instance)
+    start = time.monotonic()
+
+    shutil.rmtree(destination, ignore_errors=True)
+    if not os.path.isdir(source):
+        # Sem perfil principal ainda: a instância começa vazia e faz login
+        os.makedirs(destination, exist_ok=True)
+        return destination
+
+    os.makedirs(destination, exist_ok=True)
+    try:
+        _reflink_copy(source, destination)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.info(f"Cópia com reflink indisponível ({str(e)}), copiando perfil normalmente")
+        shutil.rmtree(destination, ignore_errors=True)
+        shutil.copytree(
+            source, destination,
+            ignore=_ignore_profile_entries, symlinks=True,
+            ignore_dangling_symlinks=True
+        )
+
+    logger.info(
+        f"📂 Perfil da conta {account_identifier} clonado para a instância {instance} "
+        f"em {time.monotonic() - start:.1f}s"
+    )
+    return destination
+
+
+class ProfileLock:
+    """
+    Trava exclusiva de um diretório de perfil (arquivo <perfil>.lock)
+
+    Impede que duas instâncias do Chrome, deste ou de outro processo do bot,
+    abram o mesmo perfil ao mesmo tempo.
+    """
+
+    def __init__(self, profile_dir):
+        self.path = f"{profile_dir}.lock"
+        self._fd = None
+
+    def acquire(self):
+        """
+        Obter a trava sem bloquear
+
+        Returns:
+            bool: True se a trava foi obtida
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
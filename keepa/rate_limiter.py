@@ -0,0 +1,138 @@
+import time
+
+from config.settings import load_settings
+
+settings = load_settings()
+
+
+class TokenBucket:
+    """
+    Balde de fichas: até capacity operações de uma vez, reabastecido a rate fichas por segundo
+
+    Com rate 0 o balde fica desativado e nunca limita.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def available(self):
+        """Fichas disponíveis agora (infinitas se o balde estiver desativado)"""
+        if not self.enabled:
+            return float("inf")
+        self._refill()
+        return self.tokens
+
+    def wait_time(self, count=1):
+        """Segundos até haver count fichas"""
+        if not self.enabled:
+            return 0.0
+        missing = count - self.available()
+        return max(0.0, missing / self.rate)
+
+    def consume(self, count=1):
+        if self.enabled:
+            self._refill()
+            self.tokens -= count
+
+
+class AccountRateLimiter:
+    """
+    Limites de ritmo de uma conta Keepa: operações por minuto e logins por hora
+
+    Cada job consome uma ficha de operação (um grupo de abas consome uma por
+    produto) e cada Chrome novo da conta consome uma ficha de login, já que
+    abre o Keepa e pode precisar digitar as credenciais. Os baldes permitem
+    rajadas curtas e mantêm a média no limite seguro configurado.
+    """
+
+    def __init__(self, account_identifier):
+        self.account_identifier = account_identifier
+        self.operations = TokenBucket(
+            settings.KEEPA_RATE_OPERATIONS_PER_MINUTE / 60,
+            settings.KEEPA_RATE_OPERATIONS_BURST
+        )
+        self.logins = TokenBucket(
+            settings.KEEPA_RATE_LOGINS_PER_HOUR / 3600,
+            settings.KEEPA_RATE_LOGINS_BURST
+        )
+        self.throttled_seconds = 0.0
+
+    def wait_time(self, login=False):
+        """
+        Segundos até o próximo job da conta poder começar
+
+        Args:
+            login: O job vai abrir um Chrome novo (precisa de uma ficha de login)
+        """
+        wait = self.operations.wait_time()
+        if login:
+            wait = max(wait, self.logins.wait_time())
+        return wait
+
+    def acquire(self, operations=1, login=False):
+        """Consumir as fichas de um job (ou grupo) que vai começar"""
+        self.operations.consume(operations)
+        if login:
+            self.logins.consume()
+
+    def spare_operations(self):
+        """Fichas de operação inteiras ainda disponíveis, usadas para limitar um grupo de abas"""
+        return int(self.operations.available()) if self.operations.enabled else None
+
+    def record_throttle(self, seconds):
+        """Registrar o tempo que a fila da conta ficou parada esperando fichas"""
+        self.throttled_seconds += seconds
+
+    def stats(self):
+        """
+        Obter o estado dos baldes
+
+        Returns:
+            dict: operations e logins (fichas disponíveis, None se sem limite)
+                  e throttled_seconds (tempo total da fila parada esperando fichas)
+        """
+        return {
+            "operations": self.operations.available() if self.operations.enabled else None,
+            "logins": self.logins.available() if self.logins.enabled else None,
+            "throttled_seconds": self.throttled_seconds,
+        }
+
+
+class RateLimiters:
+    """Limitadores criados sob demanda, um por conta Keepa"""
+
+    def __init__(self):
+        self._limiters = {}
+
+    def get(self, account_identifier):
+        if account_identifier not in self._limiters:
+            self._limiters[account_identifier] = AccountRateLimiter(account_identifier)
+        return self._limiters[account_identifier]
+
+    def stats(self):
+        """
+        Obter o estado dos limitadores
+
+        Returns:
+            dict: Por conta, o resultado de AccountRateLimiter.stats
+        """
+        return {
+            account_identifier: limiter.stats()
+            for account_identifier, limiter in sorted(self._limiters.items())
+        }
+
+
+# Limitadores compartilhados entre o agendador e handlers
+rate_limiters = RateLimiters()
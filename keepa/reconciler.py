@@ -0,0 +1,307 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+from config.settings import load_settings
+from keepa.api import update_keepa_product, delete_keepa_tracking
+from keepa.scheduler import keepa_scheduler, update_job_key, JobSuperseded, PRIORITY_LOW
+from keepa.tracking_index import tracking_index
+from data.tracking_cache import tracking_cache
+
+from utils.logger import get_logger
+from utils.text_parser import normalize_price
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+
+class Reconciler:
+    """
+    Confere em lote o estado desejado (comentários processados) com a lista de rastreamento
+
+    Cada preço pedido ou DELETE processado é registrado como estado desejado.
+    Periodicamente, uma leitura da lista de rastreamento por conta confirma
+    os ASINs que chegaram ao estado esperado e reaplica só os divergentes,
+    permitindo que as escritas retornem sem esperar a confirmação da página.
+    """
+
+    def __init__(self, path, scheduler):
+        self._path = path
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self.last_report = None
+
+    @property
+    def enabled(self):
+        return settings.KEEPA_RECONCILE_INTERVAL > 0
+
+    @staticmethod
+    def _key(account_identifier, asin):
+        return f"{account_identifier}:{asin.upper()}"
+
+    def _load(self):
+        try:
+            with open(self._path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        try:
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            logger.warning(f"⚠️ Não foi possível salvar o estado desejado: {str(e)}")
+
+    def _set(self, account_identifier, asin, action, price=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[self._key(account_identifier, asin)] = {
+                "account": account_identifier,
+                "asin": asin.upper(),
+                "action": action,
+                "price": price,
+                "requested_at": time.time(),
+                "attempts": 0
+            }
+            self._save()
+
+    def set_desired_price(self, account_identifier, asin, price):
+        """Registrar o preço pedido por um comentário"""
+        self._set(account_identifier, asin, "update", price)
+
+    def set_desired_deleted(self, account_identifier, asin):
+        """Registrar um DELETE processado"""
+        self._set(account_identifier, asin, "delete")
+
+    def _due_entries(self, account_identifier):
+        """Entradas da conta cuja escrita já teve tempo de aparecer na lista"""
+        now = time.time()
+        with self._lock:
+            return [
+                dict(entry) for entry in self._entries.values()
+                if entry["account"] == account_identifier
+                and now - entry["requested_at"] >= settings.KEEPA_RECONCILE_GRACE
+            ]
+
+    def _drop(self, entry):
+        key = self._key(entry["account"], entry["asin"])
+        with self._lock:
+            current = self._entries.get(key)
+            # Um comentário novo pode ter substituído a entrada durante a conferência
+            if current and current["requested_at"] == entry["requested_at"]:
+                del self._entries[key]
+
+    def _is_current(self, entry):
+        """Verificar se nenhum comentário mais novo substituiu a entrada"""
+        key = self._key(entry["account"], entry["asin"])
+        with self._lock:
+            current = self._entries.get(key)
+            return bool(current) and current["requested_at"] == entry["requested_at"]
+
+    def _retry(self, entry):
+        """
+        Contar uma nova tentativa da entrada
+
+        Returns:
+            bool: False se um comentário mais novo substituiu a entrada (não reaplicar)
+        """
+        key = self._key(entry["account"], entry["asin"])
+        with self._lock:
+            current = self._entries.get(key)
+            if not current or current["requested_at"] != entry["requested_at"]:
+                return False
+            current["attempts"] += 1
+            current["requested_at"] = time.time()
+            entry.update(current)
+            return True
+
+    async def _reapply(self, entry):
+        """
+        Reaplicar um ASIN divergente, desta vez aguardando a confirmação da página
+
+        O job usa a mesma chave dos comentários: um preço ou DELETE mais novo
+        o remove da fila, e o cache e o índice só são atualizados se a entrada
+        continuar sendo a mais recente.
+
+        Returns:
+            bool: True se a reaplicação deu certo
+        """
+        account_identifier, asin = entry["account"], entry["asin"]
+        try:
+            if entry["action"] == "delete":
+                success = await self._scheduler.submit(
+                    account_identifier, delete_keepa_tracking, asin,
+                    description=f"reconciliar delete {asin}",
+                    key=update_job_key(asin),
+                    priority=PRIORITY_LOW
+                )
+            else:
+                success = await self._scheduler.submit(
+                    account_identifier, update_keepa_product, asin, entry["price"], True,
+                    description=f"reconciliar {asin}",
+                    key=update_job_key(asin),
+                    priority=PRIORITY_LOW
+                )
+        except JobSuperseded:
+            logger.info(f"⏭️ Reaplicação do ASIN {asin} descartada: comentário mais recente na fila")
+            return False
+
+        if not success or not self._is_current(entry):
+            return False
+        if entry["action"] == "delete":
+            tracking_index.mark_deleted(account_identifier, asin)
+        else:
+            tracking_index.mark_applied(account_identifier, asin, entry["price"])
+            tracking_cache.record(account_identifier, asin, entry["price"])
+        return True
+
+    async def reconcile_account(self, account_identifier):
+        """
+        Conferir e corrigir os ASINs pendentes de uma conta
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+
+        Returns:
+            dict: confirmed, unknown, retried (ASINs reaplicados) e failed
+                  (ASINs que esgotaram as tentativas); None se nada foi conferido
+        """
+        entries = self._due_entries(account_identifier)
+        if not entries:
+            return None
+
+        items = await tracking_index.refresh(account_identifier)
+        if items is None:
+            logger.warning(f"⚠️ Reconciliação da conta {account_identifier} adiada: lista de rastreamento indisponível")
+            return None
+
+        report = {"confirmed": 0, "unknown": 0, "retried": [], "failed": []}
+        for entry in entries:
+            asin = entry["asin"]
+            if entry["action"] == "delete":
+                if asin not in items and not tracking_index.is_complete(account_identifier):
+                    # Leitura incompleta da lista: a ausência não confirma a exclusão
+                    report["unknown"] += 1
+                    self._drop(entry)
+                    continue
+                matches = asin not in items
+            elif asin in items and items[asin] is None:
+                # Alerta existe, mas o preço não pôde ser lido da lista
+                report["unknown"] += 1
+                self._drop(entry)
+                continue
+            else:
+                matches = asin in items and items[asin] == normalize_price(entry["price"])
+
+            if matches:
+                report["confirmed"] += 1
+                self._drop(entry)
+                continue
+
+            logger.warning(
+                f"⚠️ Divergência no ASIN {asin} da conta {account_identifier}: "
+                f"esperado {entry['price'] if entry['action'] == 'update' else 'sem rastreamento'}, "
+                f"encontrado {items.get(asin, 'sem rastreamento')}"
+            )
+            tracking_cache.invalidate(account_identifier, asin)
+
+            if entry["attempts"] >= settings.KEEPA_RECONCILE_MAX_ATTEMPTS:
+                report["failed"].append(asin)
+                self._drop(entry)
+                continue
+
+            # A entrada fica pendente até a próxima leitura confirmar a correção
+            if not self._retry(entry):
+                # Um comentário mais novo substituiu a entrada durante a conferência
+                continue
+            report["retried"].append(asin)
+            try:
+                await self._reapply(entry)
+            except Exception as e:
+                logger.error(f"❌ Erro ao reaplicar ASIN {asin} na conta {account_identifier}: {str(e)}")
+
+        with self._lock:
+            self._save()
+
+        logger.info(
+            f"🔁 Reconciliação da conta {account_identifier}: {report['confirmed']} confirmados, "
+            f"{len(report['retried'])} reaplicados, {len(report['failed'])} sem correção, "
+            f"{report['unknown']} sem preço legível"
+        )
+        return report
+
+    async def reconcile(self):
+        """
+        Reconciliar todas as contas com estado desejado pendente
+
+        Returns:
+            dict: Conta -> relatório de reconcile_account
+        """
+        with self._lock:
+            accounts = sorted({entry["account"] for entry in self._entries.values()})
+
+        reports = {}
+        for account_identifier in accounts:
+            try:
+                report = await self.reconcile_account(account_identifier)
+            except Exception as e:
+                logger.error(f"❌ Erro na reconciliação da conta {account_identifier}: {str(e)}")
+                continue
+            if report is not None:
+                reports[account_identifier] = report
+
+        self.last_report = {"finished_at": time.time(), "accounts": reports}
+        return reports
+
+    async def run_periodic(self, bot=None, interval=None):
+        """Reconciliar periodicamente e avisar o administrador sobre divergências"""
+        interval = interval or settings.KEEPA_RECONCILE_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            reports = await self.reconcile()
+
+            drift = {
+                account_identifier: report for account_identifier, report in reports.items()
+                if report["retried"] or report["failed"]
+            }
+            if not drift or not bot or not settings.ADMIN_ID:
+                continue
+
+            lines = ["🔁 Divergências encontradas na reconciliação:"]
+            for account_identifier, report in drift.items():
+                if report["retried"]:
+                    lines.append(f"• {account_identifier}: reaplicados {', '.join(report['retried'])}")
+                if report["failed"]:
+                    lines.append(f"• {account_identifier}: sem correção após {settings.KEEPA_RECONCILE_MAX_ATTEMPTS} tentativas: {', '.join(report['failed'])}")
+            try:
+                await bot.send_message(chat_id=settings.ADMIN_ID, text="\n".join(lines))
+            except Exception as e:
+                logger.error(f"Erro ao enviar relatório de reconciliação: {str(e)}")
+
+    def stats(self):
+        """
+        Obter entradas pendentes e o resultado da última reconciliação
+
+        Returns:
+            dict: pending, confirmed, retried e failed (somados entre as contas)
+        """
+        with self._lock:
+            pending = len(self._entries)
+        reports = (self.last_report or {}).get("accounts", {}).values()
+        return {
+            "pending": pending,
+            "confirmed": sum(report["confirmed"] for report in reports),
+            "retried": sum(len(report["retried"]) for report in reports),
+            "failed": sum(len(report["failed"]) for report in reports),
+        }
+
+
+# Reconciliador compartilhado entre message_processor, handlers e main
+reconciler = Reconciler(settings.KEEPA_DESIRED_STATE_FILE, keepa_scheduler)
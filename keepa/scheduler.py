@@ -0,0 +1,571 @@
+import asyncio
+import contextvars
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from config.settings import load_settings
+from keepa.api import (
+    update_keepa_product, delete_keepa_tracking, run_product_operations, login_to_keepa, prefetch_product_page,
+    KeepaCaptchaError
+)
+from keepa.driver_pool import driver_pool, KeepaLoginError
+from keepa.circuit_breaker import circuit_breakers, CLOSED
+from keepa.rate_limiter import rate_limiters
+
+from utils.logger import get_logger
+from utils.tracing import tracer, current_trace_id
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+# Operações que recebem o ASIN como primeiro argumento e podem dividir o driver em abas
+TAB_OPERATIONS = (update_keepa_product, delete_keepa_tracking)
+
+# Prioridades dos jobs (menor = executa antes)
+PRIORITY_MANUAL = 0   # comandos do administrador (/update, /test_account, /start_keepa)
+PRIORITY_DELETE = 1   # DELETE nos comentários: rápido e libera o rastreamento
+PRIORITY_COMMENT = 2  # preços vindos de comentários
+PRIORITY_LOW = 3      # lote, reconciliação, leitura da lista de rastreamento e pré-carregamento
+
+PRIORITY_NAMES = {
+    PRIORITY_MANUAL: "manual",
+    PRIORITY_DELETE: "delete",
+    PRIORITY_COMMENT: "comentário",
+    PRIORITY_LOW: "baixa",
+}
+
+# Ordem de chegada, usada para desempatar jobs da mesma prioridade
+_job_sequence = itertools.count()
+
+# Motivos de falha enviados ao disjuntor, do mais grave para o menos grave
+FAILURE_REASONS = ("captcha", "login", "erro", "falha")
+
+
+def update_job_key(asin):
+    """Chave dos jobs que definem o alerta de um ASIN; supersede() com ela descarta os que ainda estão na fila"""
+    return f"update:{asin.upper()}"
+
+
+class JobSuperseded(Exception):
+    """Job removido da fila porque um job mais recente com a mesma chave o substituiu"""
+
+
+def _warm_driver(driver):
+    """Operação vazia: obter o driver do pool já o abre e faz login"""
+    return True
+
+
+@dataclass
+class KeepaJob:
+    """Operação Keepa enfileirada para uma conta"""
+    account_identifier: str
+    operation: Callable
+    args: tuple
+    description: str
+    future: asyncio.Future
+    key: Optional[str] = None
+    # Instância do Chrome obrigatória (ex.: aquecer o perfil principal); None = qualquer uma
+    instance: Optional[int] = None
+    priority: int = PRIORITY_COMMENT
+    seq: int = field(default_factory=lambda: next(_job_sequence))
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Id de correlação do comentário que originou o job, usado nos spans de latência
+    trace_id: Optional[str] = field(default_factory=current_trace_id)
+
+    @property
+    def asin(self):
+        """ASIN da operação de produto, usado para não processar o mesmo produto em paralelo"""
+        return self.args[0] if self.operation in TAB_OPERATIONS else None
+
+
+class KeepaScheduler:
+    """
+    Agendador com uma fila ordenada e workers por conta Keepa
+
+    Contas diferentes são processadas em paralelo, enquanto as operações de uma
+    mesma conta são executadas por prioridade (PRIORITY_*) e, dentro da mesma
+    prioridade, na ordem de chegada pelo worker da instância 0 (perfil
+    principal). Quando a fila acumula, workers extras são iniciados, até
+    KEEPA_INSTANCES_PER_ACCOUNT, cada um com seu Chrome em um clone do
+    perfil; eles são encerrados após KEEPA_INSTANCE_IDLE_TIMEOUT sem trabalho.
+    Operações do mesmo ASIN nunca rodam ao mesmo tempo. Atualizações e
+    exclusões seguidas de produtos diferentes são agrupadas (até
+    KEEPA_TABS_PER_ACCOUNT) e carregam em abas paralelas do mesmo Chrome.
+    O resultado de cada job alimenta o disjuntor da conta, que pausa só a
+    fila dela quando a conta falha seguidamente, recusa o login ou exibe CAPTCHA.
+    O ritmo de cada conta (operações por minuto e Chrome novos por hora) é
+    limitado pelos baldes de fichas do limitador da conta.
+    """
+
+    def __init__(self, pool, breakers, limiters):
+        self._pool = pool
+        self._breakers = breakers
+        self._limiters = limiters
+        self._queues = {}
+        self._wakeups = {}
+        self._workers = {}
+        self._running = {}
+        self._busy_asins = {}
+        # Tempo de espera na fila por prioridade e por conta: {chave: {"count", "total", "max"}}
+        self._wait_stats = {}
+        self._account_waits = {}
+
+    def use_pool(self, pool):
+        """Trocar o pool de drivers (ex.: pelo backend simulado do replay) antes do primeiro job"""
+        self._pool = pool
+
+    def _ensure_worker(self, account_identifier):
+        """Criar a fila e o worker principal da conta na primeira utilização"""
+        if account_identifier not in self._queues:
+            self._queues[account_identifier] = deque()
+            self._wakeups[account_identifier] = asyncio.Event()
+            self._workers[account_identifier] = {}
+            self._busy_asins[account_identifier] = set()
+
+        worker = self._workers[account_identifier].get(0)
+        if worker is None or worker.done():
+            self._start_worker(account_identifier, 0)
+
+    def _start_worker(self, account_identifier, instance):
+        # A tarefa copia o contexto de quem a cria: em um contexto vazio, o worker
+        # não herda o id de correlação do comentário que o iniciou
+        self._workers[account_identifier][instance] = contextvars.Context().run(
+            asyncio.create_task,
+            self._worker(account_identifier, instance),
+            name=f"keepa-worker-{account_identifier}-{instance}"
+        )
+        if instance:
+            logger.info(f"📈 Iniciando instância extra {instance} para a conta {account_identifier}")
+
+    def _scale(self, account_identifier):
+        """Iniciar uma instância extra se a fila tem jobs e todos os workers estão ocupados"""
+        workers = self._workers[account_identifier]
+        live = [instance for instance, task in workers.items() if not task.done()]
+        busy = [instance for instance in live if (account_identifier, instance) in self._running]
+        if not self._queues[account_identifier] or len(busy) < len(live):
+            return
+        if len(live) >= settings.KEEPA_INSTANCES_PER_ACCOUNT:
+            return
+        instance = next(i for i in range(settings.KEEPA_INSTANCES_PER_ACCOUNT) if i not in live)
+        self._start_worker(account_identifier, instance)
+
+    def submit(self, account_identifier, operation, *args, description=None, key=None, instance=None,
+               priority=PRIORITY_COMMENT) -> asyncio.Future:
+        """
+        Enfileirar uma operação para a conta
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+            operation: Função síncrona que recebe o driver como primeiro argumento
+            *args: Argumentos adicionais da operação
+            description: Texto curto usado nos logs e no status da fila
+            key: Chave opcional (ex.: "update:ASIN") usada por supersede()
+            instance: Executar apenas nesta instância do Chrome da conta
+            priority: Prioridade do job (PRIORITY_MANUAL ... PRIORITY_LOW)
+
+        Returns:
+            asyncio.Future: Resolvido com o retorno da operação
+        """
+        self._ensure_worker(account_identifier)
+
+        job = KeepaJob(
+            account_identifier=account_identifier,
+            operation=operation,
+            args=args,
+            description=description or getattr(operation, "__name__", "operação"),
+            future=asyncio.get_running_loop().create_future(),
+            key=key,
+            instance=instance,
+            priority=priority
+        )
+        self._queues[account_identifier].append(job)
+        self._wakeups[account_identifier].set()
+        self._scale(account_identifier)
+
+        logger.info(
+            f"📥 Job '{job.description}' enfileirado para conta {account_identifier} "
+            f"(prioridade {PRIORITY_NAMES.get(priority, priority)}, fila: {len(self._queues[account_identifier])})"
+        )
+        return job.future
+
+    def supersede(self, account_identifier, key) -> int:
+        """
+        Remover da fila os jobs ainda não iniciados com a chave informada
+
+        Os futures desses jobs recebem JobSuperseded.
+
+        Returns:
+            int: Número de jobs removidos
+        """
+        queue = self._queues.get(account_identifier)
+        if not queue:
+            return 0
+
+        superseded = [job for job in queue if job.key == key]
+        for job in superseded:
+            queue.remove(job)
+            if not job.future.done():
+                job.future.set_exception(JobSuperseded(f"Job '{job.description}' substituído"))
+
+        if superseded:
+            logger.info(f"⏭️ {len(superseded)} job(s) '{key}' substituído(s) na fila da conta {account_identifier}")
+        return len(superseded)
+
+    def _runnable(self, job, instance, busy_asins, manual_only=False):
+        if manual_only and job.priority != PRIORITY_MANUAL:
+            return False
+        return (job.instance is None or job.instance == instance) and job.asin not in busy_asins
+
+    def _ordered(self, account_identifier):
+        """
+        Jobs da fila na ordem de execução: prioridade efetiva e depois chegada
+
+        Um job herda a prioridade mais alta entre os jobs do mesmo ASIN que
+        estão atrás dele, para que um DELETE prioritário não ultrapasse uma
+        atualização anterior do mesmo produto (ela é adiantada junto).
+        """
+        queue = self._queues[account_identifier]
+        for job in [job for job in queue if job.future.done()]:
+            # Quem enviou o job desistiu dele (ex.: cancelamento)
+            queue.remove(job)
+
+        asin_priority = {}
+        for job in queue:
+            if job.asin is not None:
+                asin_priority[job.asin] = min(asin_priority.get(job.asin, job.priority), job.priority)
+
+        def sort_key(job):
+            priority = asin_priority[job.asin] if job.asin is not None else job.priority
+            return priority, job.seq
+
+        return sorted(queue, key=sort_key)
+
+    def _pop_runnable(self, account_identifier, instance, manual_only=False):
+        """
+        Retirar o próximo job que esta instância pode executar
+
+        Jobs de um ASIN em andamento em outra instância ficam na fila, assim
+        como os seguintes do mesmo ASIN, preservando a ordem por produto.
+        Com manual_only, apenas comandos do administrador são retirados.
+        """
+        busy_asins = self._busy_asins[account_identifier]
+        skipped_asins = set()
+        for job in self._ordered(account_identifier):
+            if job.asin is not None and job.asin in skipped_asins:
+                continue
+            if self._runnable(job, instance, busy_asins, manual_only):
+                self._queues[account_identifier].remove(job)
+                return job
+            if job.asin is not None:
+                skipped_asins.add(job.asin)
+        return None
+
+    async def _next_job(self, account_identifier, instance, idle_timeout=None) -> Optional[KeepaJob]:
+        """
+        Aguardar um job executável; None se a instância ficou ociosa por idle_timeout
+
+        Enquanto o disjuntor da conta estiver aberto a fila fica parada (só
+        comandos do administrador passam); ao fim da pausa, o primeiro job
+        retirado é a sonda que decide se a conta volta ao normal. Sem fichas
+        no limitador da conta, nenhum job sai da fila até o balde reabastecer.
+        """
+        wakeup = self._wakeups[account_identifier]
+        breaker = self._breakers.get(account_identifier)
+        limiter = self._limiters.get(account_identifier)
+        idle_deadline = time.monotonic() + idle_timeout if idle_timeout is not None else None
+        while True:
+            paused = breaker.wait_time()
+            # Sem driver aquecido nesta instância, o job vai abrir um Chrome e fazer login
+            login = not self._pool.is_warm(account_identifier, instance)
+            throttled = limiter.wait_time(login)
+            job = None if throttled else self._pop_runnable(account_identifier, instance, manual_only=paused != 0)
+            if job is not None:
+                limiter.acquire(operations=0 if job.operation is _warm_driver else 1, login=login)
+                breaker.begin()
+                return job
+
+            timeouts = [wait for wait in (paused, throttled) if wait]
+            if idle_deadline is not None:
+                remaining = idle_deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                timeouts.append(remaining)
+            wakeup.clear()
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=min(timeouts) if timeouts else None)
+            except asyncio.TimeoutError:
+                pass
+            # Contabilizar pela instância 0 para não somar a mesma espera de várias instâncias
+            if throttled and not instance and self._queues[account_identifier]:
+                limiter.record_throttle(time.monotonic() - started)
+
+    def _take_tab_group(self, account_identifier, instance, job):
+        """
+        Juntar ao job os próximos jobs de produto da fila, até o limite de abas
+
+        Para no primeiro job seguinte que não seja de produto ou cujo ASIN já
+        está no grupo ou em andamento, mantendo a ordem da fila. Cada job
+        extra consome uma ficha de operação do limitador da conta.
+        """
+        group = [job]
+        if settings.KEEPA_TABS_PER_ACCOUNT <= 1 or job.asin is None:
+            return group
+        # Conta em recuperação: a sonda vai sozinha
+        if self._breakers.get(account_identifier).state != CLOSED:
+            return group
+
+        limiter = self._limiters.get(account_identifier)
+        spare = limiter.spare_operations()
+        max_size = settings.KEEPA_TABS_PER_ACCOUNT if spare is None else min(settings.KEEPA_TABS_PER_ACCOUNT, 1 + spare)
+
+        queue = self._queues[account_identifier]
+        asins = {job.asin} | self._busy_asins[account_identifier]
+        for candidate in self._ordered(account_identifier):
+            if len(group) >= max_size:
+                break
+            if candidate.asin is None or candidate.asin in asins or not self._runnable(candidate, instance, asins):
+                break
+            queue.remove(candidate)
+            group.append(candidate)
+            asins.add(candidate.asin)
+        limiter.acquire(operations=len(group) - 1)
+        return group
+
+    async def _run_group(self, account_identifier, instance, group):
+        """Executar um job (ou um grupo de jobs de produto em abas) no driver da instância"""
+        started = time.monotonic()
+        if len(group) == 1:
+            job = group[0]
+            try:
+                # Spans do Chrome, login e páginas ficam com o id de correlação do job
+                with tracer.trace(job.trace_id):
+                    results = [(True, await self._pool.run_async(
+                        account_identifier, job.operation, *job.args, instance=instance
+                    ))]
+            except Exception as e:
+                results = [(False, e)]
+        else:
+            try:
+                results = await self._pool.run_async(
+                    account_identifier, run_product_operations,
+                    [(job.operation, *job.args) for job in group],
+                    [job.trace_id for job in group],
+                    instance=instance
+                )
+            except Exception as e:
+                results = [(False, e)] * len(group)
+
+        elapsed = time.monotonic() - started
+        for job, (ok, value) in zip(group, results):
+            tracer.record(
+                "keepa: job", elapsed, trace_id=job.trace_id, account=account_identifier,
+                instance=instance, tabs=len(group), job=job.description,
+                status=self._failure_reason(job, ok, value) or "ok"
+            )
+
+        if self._record_outcome(account_identifier, group, results):
+            # Conta com problema: o próximo job (a sonda) começa em um Chrome novo
+            await self._pool.discard_async(account_identifier, instance)
+
+        for job, (ok, value) in zip(group, results):
+            if job.future.done():
+                continue
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+    @staticmethod
+    def _failure_reason(job, ok, value):
+        """Classificar o resultado de um job para o disjuntor; None se deu certo"""
+        if not ok:
+            if isinstance(value, KeepaCaptchaError):
+                return "captcha"
+            if isinstance(value, KeepaLoginError):
+                return "login"
+            return "erro"
+        if value is False or value is None:
+            return "login" if job.operation is login_to_keepa else "falha"
+        return None
+
+    def _record_outcome(self, account_identifier, group, results):
+        """
+        Alimentar o disjuntor da conta com o resultado do job (ou do grupo de abas)
+
+        Basta um job do grupo dar certo para a conta ser considerada saudável.
+        Pré-carregamentos não contam, e uma operação que retornou falha só
+        conta quando é de um produto (ASIN) que ainda não tinha falhado:
+        exceções, login recusado e CAPTCHA continuam contando sempre.
+
+        Returns:
+            bool: True se o resultado abriu o disjuntor
+        """
+        breaker = self._breakers.get(account_identifier)
+        outcomes = [
+            (job, self._failure_reason(job, ok, value))
+            for job, (ok, value) in zip(group, results)
+            if job.operation is not prefetch_product_page
+        ]
+        if any(reason is None for _, reason in outcomes):
+            breaker.record_success()
+            return False
+        # Falha sem ASIN (ex.: lista de rastreamento que não carregou) não aponta para a conta
+        outcomes = [(job, reason) for job, reason in outcomes if reason != "falha" or job.asin is not None]
+        if not outcomes:
+            breaker.record_neutral()
+            return False
+        reason = min((reason for _, reason in outcomes), key=FAILURE_REASONS.index)
+        return breaker.record_failure(reason, [job.asin for job, _ in outcomes] if reason == "falha" else ())
+
+    async def _worker(self, account_identifier, instance):
+        """Processar os jobs de uma conta em uma instância do Chrome, um por vez (ou em grupo de abas)"""
+        # Instâncias extras são encerradas quando ficam ociosas
+        idle_timeout = settings.KEEPA_INSTANCE_IDLE_TIMEOUT if instance else None
+        busy_asins = self._busy_asins[account_identifier]
+        while True:
+            job = await self._next_job(account_identifier, instance, idle_timeout)
+            if job is None:
+                break
+
+            group = self._take_tab_group(account_identifier, instance, job)
+            asins = {item.asin for item in group if item.asin is not None}
+            busy_asins |= asins
+            self._running[(account_identifier, instance)] = (
+                job.description if len(group) == 1
+                else f"{len(group)} abas: " + ", ".join(item.description for item in group)
+            )
+            self._scale(account_identifier)
+
+            now = time.monotonic()
+            for item in group:
+                self._record_wait(account_identifier, item.priority, now - item.enqueued_at)
+                tracer.record(
+                    "fila", now - item.enqueued_at, trace_id=item.trace_id, account=account_identifier,
+                    priority=PRIORITY_NAMES.get(item.priority, item.priority), job=item.description
+                )
+
+            what = f"job '{job.description}'" if len(group) == 1 else f"{len(group)} jobs em abas paralelas"
+            where = f"{account_identifier} (instância {instance})" if instance else account_identifier
+            logger.info(
+                f"▶️ Iniciando {what} da conta {where} "
+                f"após {time.monotonic() - job.enqueued_at:.1f}s na fila"
+            )
+            try:
+                await self._run_group(account_identifier, instance, group)
+            finally:
+                self._running.pop((account_identifier, instance), None)
+                busy_asins -= asins
+                # Jobs que esperavam por estes ASINs podem ser executados agora
+                self._wakeups[account_identifier].set()
+
+        logger.info(f"📉 Instância {instance} da conta {account_identifier} ociosa, encerrando")
+        self._workers[account_identifier].pop(instance, None)
+        await self._pool.discard_async(account_identifier, instance)
+
+    def _record_wait(self, account_identifier, priority, wait_time):
+        for stats in (
+            self._wait_stats.setdefault(priority, {"count": 0, "total": 0.0, "max": 0.0}),
+            self._account_waits.setdefault(account_identifier, {"count": 0, "total": 0.0, "max": 0.0}),
+        ):
+            stats["count"] += 1
+            stats["total"] += wait_time
+            stats["max"] = max(stats["max"], wait_time)
+
+    def warm_up(self, account_identifier, description="aquecer driver", priority=PRIORITY_COMMENT) -> asyncio.Future:
+        """Enfileirar a abertura e login do driver principal da conta sem executar nenhuma operação"""
+        return self.submit(account_identifier, _warm_driver, description=description, instance=0, priority=priority)
+
+    async def prewarm(self, account_identifiers):
+        """
+        Aquecer drivers de várias contas em paralelo
+
+        Args:
+            account_identifiers: Contas a aquecer
+
+        Returns:
+            dict: Conta -> True se o driver ficou pronto
+        """
+        start = time.monotonic()
+        logger.info(f"🔥 Aquecendo drivers para: {', '.join(account_identifiers)}")
+        results = await asyncio.gather(
+            *(self.warm_up(account_identifier) for account_identifier in account_identifiers),
+            return_exceptions=True
+        )
+
+        summary = {}
+        for account_identifier, result in zip(account_identifiers, results):
+            summary[account_identifier] = result is True
+            if result is not True:
+                logger.warning(f"⚠️ Não foi possível aquecer o driver da conta {account_identifier}: {result}")
+        logger.info(
+            f"🔥 {sum(summary.values())}/{len(summary)} drivers aquecidos em {time.monotonic() - start:.1f}s"
+        )
+        return summary
+
+    def stats(self) -> dict:
+        """
+        Obter o estado atual das filas
+
+        Returns:
+            dict: Por conta, quantidade de jobs na fila, jobs em execução, instâncias
+                  ativas e espera média/máxima na fila (segundos)
+        """
+        stats = {}
+        for account_identifier, queue in self._queues.items():
+            running = [
+                description for (account, _), description in sorted(self._running.items())
+                if account == account_identifier
+            ]
+            waits = self._account_waits.get(account_identifier, {"count": 0, "total": 0.0, "max": 0.0})
+            stats[account_identifier] = {
+                "queued": len(queue),
+                "running": "; ".join(running) or None,
+                "instances": sum(1 for task in self._workers[account_identifier].values() if not task.done()),
+                "avg_wait": waits["total"] / waits["count"] if waits["count"] else 0.0,
+                "max_wait": waits["max"],
+            }
+        return stats
+
+    def priority_stats(self) -> dict:
+        """
+        Obter profundidade da fila e tempo de espera por prioridade, somando as contas
+
+        Returns:
+            dict: Por nome de prioridade, jobs na fila, jobs iniciados e espera média/máxima (segundos)
+        """
+        queued = {}
+        for queue in self._queues.values():
+            for job in queue:
+                if not job.future.done():
+                    queued[job.priority] = queued.get(job.priority, 0) + 1
+
+        stats = {}
+        for priority, name in PRIORITY_NAMES.items():
+            waits = self._wait_stats.get(priority, {"count": 0, "total": 0.0, "max": 0.0})
+            stats[name] = {
+                "queued": queued.get(priority, 0),
+                "started": waits["count"],
+                "avg_wait": waits["total"] / waits["count"] if waits["count"] else 0.0,
+                "max_wait": waits["max"],
+            }
+        return stats
+
+    async def shutdown(self):
+        """Cancelar os workers e os jobs pendentes"""
+        for workers in self._workers.values():
+            for worker in workers.values():
+                worker.cancel()
+        for queue in self._queues.values():
+            while queue:
+                job = queue.popleft()
+                if not job.future.done():
+                    job.future.cancel()
+        self._workers.clear()
+
+
+# Agendador compartilhado entre message_processor e handlers
+keepa_scheduler = KeepaScheduler(driver_pool, circuit_breakers, rate_limiters)
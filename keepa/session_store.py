@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+
+from config.settings import load_settings
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+# Contadores de reaproveitamento de sessão
+# hits: já estava logado; restored: logado após restaurar cookies salvos;
+# full_logins: precisou digitar credenciais; failed: login falhou
+session_stats = {"hits": 0, "restored": 0, "full_logins": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+def _session_file(account_identifier):
+    return os.path.join(settings.KEEPA_SESSION_DIR, f"{account_identifier or 'default'}.json")
+
+def record_session_result(result):
+    """
+    Registrar o resultado de uma verificação de sessão
+
+    Args:
+        result (str): "hits", "restored", "full_logins" ou "failed"
+    """
+    with _stats_lock:
+        session_stats[result] = session_stats.get(result, 0) + 1
+
+def get_session_stats():
+    """
+    Obter métricas de reaproveitamento de sessão
+
+    Returns:
+        dict: Contadores e hit_rate (fração de logins evitados)
+    """
+    with _stats_lock:
+        stats = dict(session_stats)
+    total = stats["hits"] + stats["restored"] + stats["full_logins"] + stats["failed"]
+    stats["hit_rate"] = (stats["hits"] + stats["restored"]) / total if total else 0.0
+    return stats
+
+def save_session(driver, account_identifier):
+    """
+    Salvar os cookies de autenticação da conta em disco
+
+    Args:
+        driver: Instância do Selenium WebDriver logada na conta
+        account_identifier: Identificador da conta
+
+    Returns:
+        bool: True se a sessão foi salva
+    """
+    try:
+        os.makedirs(settings.KEEPA_SESSION_DIR, exist_ok=True)
+        path = _session_file(account_identifier)
+        cookies = driver.get_cookies()
+
+        # Arquivo contém tokens de sessão: permitir leitura apenas ao dono
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(cookies, f)
+
+        logger.info(f"Sessão da conta {account_identifier} salva ({len(cookies)} cookies)")
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível salvar a sessão da conta {account_identifier}: {str(e)}")
+        return False
+
+def restore_session(driver, account_identifier):
+    """
+    Restaurar cookies salvos da conta no navegador
+
+    O driver precisa estar em uma página do domínio do Keepa.
+
+    Args:
+        driver: Instância do Selenium WebDriver
+        account_identifier: Identificador da conta
+
+    Returns:
+        bool: True se algum cookie foi restaurado
+    """
+    path = _session_file(account_identifier)
+    if not os.path.exists(path):
+        return False
+
+    try:
+        with open(path, "r") as f:
+            cookies = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"⚠️ Sessão salva inválida para conta {account_identifier}: {str(e)}")
+        return False
+
+    restored = 0
+    for cookie in cookies:
+        # O Chrome rejeita valores de sameSite fora do padrão
+        if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+            cookie.pop("sameSite", None)
+        if "expiry" in cookie:
+            cookie["expiry"] = int(cookie["expiry"])
+        try:
+            driver.add_cookie(cookie)
+            restored += 1
+        except Exception:
+            # Cookies de outros domínios não podem ser adicionados nesta página
+            continue
+
+    logger.info(f"Sessão da conta {account_identifier} restaurada ({restored} cookies)")
+    return restored > 0
+
+def clear_session(account_identifier):
+    """Remover a sessão salva da conta"""
+    path = _session_file(account_identifier)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+from config.settings import load_settings
+from keepa.api import scrape_tracking_list
+from keepa.scheduler import keepa_scheduler, PRIORITY_LOW
+from keepa.driver_pool import driver_pool
+
+from utils.logger import get_logger
+from utils.text_parser import normalize_price
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+# Resultados de lookup()
+TRACKED = "tracked"
+UNTRACKED = "untracked"
+
+
+class TrackingIndex:
+    """
+    Índice ASIN -> preço-alvo de cada conta, montado a partir da lista de rastreamento
+
+    Uma leitura da lista (#!tracking) responde para todos os ASINs da conta se
+    já existe alerta e com qual preço, sem abrir a página de cada produto.
+    As escritas feitas pelo bot atualizam o índice na hora; a leitura
+    periódica captura alterações feitas fora do bot.
+    """
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+        self._snapshots = {}
+        self._refreshing = {}
+
+    def _fresh_snapshot(self, account_identifier, max_age=None):
+        max_age = settings.KEEPA_TRACKING_SNAPSHOT_MAX_AGE if max_age is None else max_age
+        snapshot = self._snapshots.get(account_identifier)
+        if snapshot and time.monotonic() - snapshot["taken_at"] < max_age:
+            return snapshot
+        return None
+
+    def lookup(self, account_identifier, asin):
+        """
+        Consultar o estado de um ASIN no último snapshot da conta
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+            asin: ASIN do produto
+
+        Returns:
+            tuple: (TRACKED, preço) ou (UNTRACKED, None); None se não houver
+                   snapshot recente da conta ou se o ASIN não aparece em uma
+                   leitura incompleta da lista
+        """
+        snapshot = self._fresh_snapshot(account_identifier)
+        if snapshot is None:
+            return None
+        asin = asin.upper()
+        if asin in snapshot["items"]:
+            return TRACKED, snapshot["items"][asin]
+        # Sem a lista inteira, a ausência do ASIN não prova que não há alerta
+        if not snapshot["complete"]:
+            return None
+        return UNTRACKED, None
+
+    def is_applied(self, account_identifier, asin, price):
+        """Verificar se o snapshot mostra o ASIN já rastreado com este preço"""
+        state = self.lookup(account_identifier, asin)
+        return (
+            state is not None and state[0] == TRACKED and state[1] is not None
+            and state[1] == normalize_price(price)
+        )
+
+    def is_untracked(self, account_identifier, asin):
+        """Verificar se o snapshot mostra que o ASIN não tem alerta na conta"""
+        state = self.lookup(account_identifier, asin)
+        return state is not None and state[0] == UNTRACKED
+
+    def mark_applied(self, account_identifier, asin, price):
+        """Registrar no snapshot um preço aplicado pelo bot"""
+        snapshot = self._snapshots.get(account_identifier)
+        if snapshot is not None:
+            snapshot["items"][asin.upper()] = normalize_price(price)
+
+    def mark_deleted(self, account_identifier, asin):
+        """Registrar no snapshot um rastreamento excluído pelo bot"""
+        snapshot = self._snapshots.get(account_identifier)
+        if snapshot is not None:
+            snapshot["items"].pop(asin.upper(), None)
+
+    def is_complete(self, account_identifier):
+        """Verificar se o último snapshot da conta leu a lista de rastreamento inteira"""
+        snapshot = self._snapshots.get(account_identifier)
+        return snapshot is not None and snapshot["complete"]
+
+    def store(self, account_identifier, items, complete=True):
+        """Guardar o resultado de scrape_tracking_list como snapshot da conta"""
+        self._snapshots[account_identifier] = {
+            "items": {asin.upper(): normalize_price(price) for asin, price in items.items()},
+            "complete": complete,
+            "taken_at": time.monotonic()
+        }
+
+    async def refresh(self, account_identifier, max_age=0, priority=PRIORITY_LOW):
+        """
+        Ler a lista de rastreamento da conta pela fila do agendador
+
+        Chamadas simultâneas para a mesma conta compartilham a mesma leitura.
+
+        Args:
+            account_identifier: Identificador da conta Keepa
+            max_age: Reaproveitar o snapshot se tiver menos de max_age segundos
+            priority: Prioridade do job de leitura no agendador
+
+        Returns:
+            dict: ASIN -> preço-alvo, ou None se a lista não pôde ser lida
+        """
+        snapshot = self._fresh_snapshot(account_identifier, max_age)
+        if snapshot is not None:
+            return snapshot["items"]
+
+        pending = self._refreshing.get(account_identifier)
+        if pending is None or pending.done():
+            pending = self._scheduler.submit(
+                account_identifier, scrape_tracking_list,
+                description="lista de rastreamento",
+                priority=priority
+            )
+            self._refreshing[account_identifier] = pending
+
+        result = await asyncio.shield(pending)
+        if result is None:
+            return None
+        if self._refreshing.get(account_identifier) is pending:
+            items, complete = result
+            self.store(account_identifier, items, complete)
+            del self._refreshing[account_identifier]
+        return self._snapshots[account_identifier]["items"]
+
+    async def run_periodic_refresh(self, interval=None):
+        """Atualizar periodicamente os snapshots das contas com driver aquecido"""
+        interval = interval or settings.KEEPA_TRACKING_SNAPSHOT_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            for account_identifier in driver_pool.accounts():
+                try:
+                    await self.refresh(account_identifier, max_age=interval / 2)
+                except Exception as e:
+                    logger.warning(f"⚠️ Não foi possível ler a lista de rastreamento da conta {account_identifier}: {str(e)}")
+
+    def stats(self):
+        """
+        Obter o tamanho e a idade dos snapshots
+
+        Returns:
+            dict: Por conta, quantidade de produtos, se a leitura foi completa
+                  e idade em segundos
+        """
+        now = time.monotonic()
+        return {
+            account_identifier: {
+                "items": len(snapshot["items"]),
+                "complete": snapshot["complete"],
+                "age": now - snapshot["taken_at"]
+            }
+            for account_identifier, snapshot in self._snapshots.items()
+        }
+
+
+# Índice compartilhado entre message_processor e handlers
+tracking_index = TrackingIndex(keepa_scheduler)
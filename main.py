@@ -11,6 +11,13 @@ from telegram.ext import Application
 from utils.logger import setup_logging, get_logger
 from utils.backup import create_backup, auto_cleanup_backups
 from utils.missing_products import retrieve_missing_products
+from keepa.browser import resolve_chromedriver_path
+from keepa.api import run_blocking, keepa_executor
+from keepa.driver_pool import driver_pool
+from keepa.scheduler import keepa_scheduler
+from keepa.tracking_index import tracking_index
+from keepa.reconciler import reconciler
+from data.tracking_cache import tracking_cache
 
 # Configurar logging aprimorado
 setup_logging(console_output=True, file_output=True)
@@ -65,6 +72,18 @@ def main() -> None:
     except Exception as e:
         logger.error(f"Erro ao criar backup de inicialização: {str(e)}")
     
+    # Descartar preços em cache que já passaram do TTL
+    if tracking_cache.enabled:
+        expired = tracking_cache.prune()
+        if expired:
+            logger.info(f"Cache de rastreamento: {expired} entrada(s) expirada(s) removida(s)")
+    
+    # Resolver o chromedriver uma única vez, antes de qualquer driver ser iniciado
+    try:
+        resolve_chromedriver_path()
+    except Exception as e:
+        logger.error(f"Erro ao localizar o chromedriver: {str(e)}")
+    
     # Criar aplicação
     application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
     logger.info("Aplicação do Telegram inicializada")
@@ -73,12 +92,52 @@ def main() -> None:
     setup_handlers(application)
     logger.info("Manipuladores configurados com sucesso")
     
+    # Tarefas em segundo plano que vivem enquanto o bot roda, canceladas no encerramento
+    background_tasks = []
+    
     # Registrar a função de recuperação para ser executada após a inicialização
     async def startup_tasks(application):
         logger.info("Executando tarefas pós-inicialização...")
+        
+        # Aquecer drivers em segundo plano para que a primeira atualização não pague o login
+        if settings.KEEPA_PREWARM:
+            accounts = [
+                account for account in (settings.KEEPA_PREWARM_ACCOUNTS or settings.KEEPA_ACCOUNTS.keys())
+                if account in settings.KEEPA_ACCOUNTS
+            ]
+            if accounts:
+                background_tasks.append(application.create_task(keepa_scheduler.prewarm(accounts)))
+        
         await retrieve_missing_products_on_startup(application, settings, post_info)
+        
+        # Verificação periódica de memória dos drivers e limpeza de processos órfãos do Chrome
+        background_tasks.append(application.create_task(driver_pool.run_maintenance()))
+        
+        # Leitura periódica das listas de rastreamento das contas aquecidas
+        if settings.KEEPA_TRACKING_SNAPSHOT_INTERVAL:
+            background_tasks.append(application.create_task(tracking_index.run_periodic_refresh()))
+        
+        # Conferência em lote das escritas, com reaplicação dos ASINs divergentes
+        if reconciler.enabled:
+            background_tasks.append(application.create_task(reconciler.run_periodic(application.bot)))
+    
+    # Encerrar os Chrome, os workers do agendador e as threads do Keepa para não deixar processos para trás
+    async def shutdown_tasks(application):
+        logger.info("Executando tarefas de encerramento...")
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        
+        await keepa_scheduler.shutdown()
+        try:
+            await run_blocking(driver_pool.close_all)
+            logger.info("Navegadores do pool fechados")
+        except Exception as e:
+            logger.error(f"Erro ao fechar os navegadores do pool: {str(e)}")
+        keepa_executor.shutdown(wait=False, cancel_futures=True)
     
     application.post_init = startup_tasks
+    application.post_shutdown = shutdown_tasks
     
     # Iniciar polling
     logger.info("Bot iniciado. Ouvindo por atualizações...")
@@ -0,0 +1,7 @@
+import os
+
+# Definidos antes de importar os módulos do bot, que carregam as configurações na importação:
+# os testes não gravam traces em disco e a fila não espera pelos limites de ritmo
+os.environ["KEEPA_TRACE_FILE"] = ""
+os.environ["KEEPA_RATE_OPERATIONS_PER_MINUTE"] = "0"
+os.environ["KEEPA_RATE_LOGINS_PER_HOUR"] = "0"
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+import keepa.circuit_breaker as breaker_module
+from keepa.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN, backoff_delay
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(breaker_module.settings, "KEEPA_BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(breaker_module.settings, "KEEPA_BREAKER_BASE_DELAY", 30.0)
+    monkeypatch.setattr(breaker_module.settings, "KEEPA_BREAKER_MAX_DELAY", 900.0)
+
+
+def expire(breaker):
+    """Fazer a pausa do disjuntor terminar agora"""
+    breaker.open_until = time.monotonic() - 1
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker("Premium")
+
+    assert breaker.record_failure("erro") is False
+    assert breaker.record_failure("erro") is False
+    assert breaker.state == CLOSED
+    assert breaker.record_failure("erro") is True
+    assert breaker.state == OPEN
+    assert 15 <= breaker.wait_time() <= 30
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("Premium")
+    breaker.record_failure("erro")
+    breaker.record_failure("erro")
+    breaker.record_success()
+
+    assert breaker.record_failure("erro") is False
+    assert breaker.failures == 1
+
+
+@pytest.mark.parametrize("reason", ["captcha", "login"])
+def test_captcha_and_login_open_immediately(reason):
+    breaker = CircuitBreaker("Premium")
+
+    assert breaker.record_failure(reason) is True
+    assert breaker.state == OPEN
+    assert breaker.last_reason == reason
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker("Premium")
+    breaker.record_failure("captcha")
+    expire(breaker)
+
+    assert breaker.wait_time() == 0
+    breaker.begin()
+    assert breaker.state == HALF_OPEN
+    # Enquanto a sonda roda, os outros jobs esperam o resultado
+    assert breaker.wait_time() is None
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.wait_time() == 0
+
+
+def test_failed_probe_reopens_with_longer_backoff():
+    breaker = CircuitBreaker("Premium")
+    breaker.record_failure("captcha")
+    expire(breaker)
+    breaker.begin()
+
+    assert breaker.record_failure("erro") is True
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    assert 30 <= breaker.wait_time() <= 60
+
+
+def test_repeated_failures_of_the_same_asin_count_once():
+    breaker = CircuitBreaker("Premium")
+
+    for _ in range(5):
+        assert breaker.record_failure("falha", ["B0ABCDEFGH"]) is False
+    assert breaker.failures == 1
+
+    breaker.record_failure("falha", ["B0ABCDEFGJ"])
+    assert breaker.record_failure("falha", ["B0ABCDEFGK"]) is True
+
+
+def test_neutral_result_releases_the_probe():
+    breaker = CircuitBreaker("Premium")
+    breaker.record_failure("captcha")
+    expire(breaker)
+    breaker.begin()
+
+    breaker.record_failure("falha", [])
+    assert breaker.state == HALF_OPEN
+    assert breaker.wait_time() == 0
+
+
+@pytest.mark.parametrize("attempt, low, high", [(1, 15, 30), (2, 30, 60), (3, 60, 120), (10, 450, 900)])
+def test_backoff_delay_doubles_with_jitter_and_cap(attempt, low, high):
+    for _ in range(20):
+        assert low <= backoff_delay(attempt, 30, 900) <= high
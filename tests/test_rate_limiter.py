@@ -0,0 +1,51 @@
+import pytest
+
+import keepa.rate_limiter as rate_limiter_module
+from keepa.rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste para o reabastecimento dos baldes"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_wait_for_refill(clock):
+    bucket = TokenBucket(rate=0.5, capacity=3)
+
+    for _ in range(3):
+        assert bucket.wait_time() == 0
+        bucket.consume()
+
+    # Sem fichas: a próxima leva 1 / 0.5 = 2 segundos
+    assert bucket.wait_time() == pytest.approx(2.0)
+    clock[0] += 1
+    assert bucket.wait_time() == pytest.approx(1.0)
+    clock[0] += 1
+    assert bucket.wait_time() == 0
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.consume(2)
+    clock[0] += 60
+
+    assert bucket.available() == pytest.approx(2.0)
+
+
+def test_group_consumption_can_go_into_debt(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.consume(4)
+
+    assert bucket.wait_time() == pytest.approx(3.0)
+
+
+def test_zero_rate_disables_the_bucket(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    bucket.consume(100)
+
+    assert not bucket.enabled
+    assert bucket.wait_time() == 0
+    assert bucket.available() == float("inf")
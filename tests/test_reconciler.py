@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+import keepa.reconciler as reconciler_module
+from keepa.api import delete_keepa_tracking, update_keepa_product
+from keepa.reconciler import Reconciler
+from keepa.scheduler import JobSuperseded
+
+ASIN = "B0ABCDEFGH"
+ACCOUNT = "Premium"
+
+
+class FakeScheduler:
+    """Registra os jobs enviados e devolve o resultado configurado"""
+
+    def __init__(self, result=True):
+        self.result = result
+        self.submitted = []
+        self.on_submit = None
+
+    async def submit(self, account_identifier, operation, *args, **kwargs):
+        self.submitted.append((account_identifier, operation, args, kwargs))
+        if self.on_submit:
+            self.on_submit()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeTrackingIndex:
+    """Lista de rastreamento fixa; on_refresh simula um comentário chegando durante a leitura"""
+
+    def __init__(self, items):
+        self.items = items
+        self.on_refresh = None
+        self.applied = []
+        self.deleted = []
+
+    async def refresh(self, account_identifier, max_age=0, priority=None):
+        if self.on_refresh:
+            self.on_refresh()
+        return self.items
+
+    def is_complete(self, account_identifier):
+        return True
+
+    def mark_applied(self, account_identifier, asin, price):
+        self.applied.append((asin, price))
+
+    def mark_deleted(self, account_identifier, asin):
+        self.deleted.append(asin)
+
+
+class FakeTrackingCache:
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, account_identifier, asin, price):
+        self.recorded.append((asin, price))
+
+    def invalidate(self, account_identifier, asin):
+        pass
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(reconciler_module.settings, "KEEPA_RECONCILE_INTERVAL", 600)
+    monkeypatch.setattr(reconciler_module.settings, "KEEPA_RECONCILE_GRACE", 0)
+    monkeypatch.setattr(reconciler_module.settings, "KEEPA_RECONCILE_MAX_ATTEMPTS", 3)
+    index = FakeTrackingIndex({ASIN: 10.0})
+    cache = FakeTrackingCache()
+    monkeypatch.setattr(reconciler_module, "tracking_index", index)
+    monkeypatch.setattr(reconciler_module, "tracking_cache", cache)
+    scheduler = FakeScheduler()
+    reconciler = Reconciler(str(tmp_path / "desired_state.json"), scheduler)
+    return reconciler, scheduler, index, cache
+
+
+def test_drifted_entry_is_reapplied_with_the_comment_key(setup):
+    reconciler, scheduler, index, cache = setup
+    reconciler.set_desired_price(ACCOUNT, ASIN, "20.00")
+
+    report = asyncio.run(reconciler.reconcile_account(ACCOUNT))
+
+    assert report["retried"] == [ASIN]
+    [(account, operation, args, kwargs)] = scheduler.submitted
+    assert operation is update_keepa_product
+    assert args[:2] == (ASIN, "20.00")
+    assert kwargs["key"] == f"update:{ASIN}"
+    assert index.applied == [(ASIN, "20.00")]
+    assert cache.recorded == [(ASIN, "20.00")]
+
+
+def test_matching_entry_is_confirmed_without_reapply(setup):
+    reconciler, scheduler, index, cache = setup
+    reconciler.set_desired_price(ACCOUNT, ASIN, "10,00")
+
+    report = asyncio.run(reconciler.reconcile_account(ACCOUNT))
+
+    assert report["confirmed"] == 1
+    assert scheduler.submitted == []
+    assert reconciler.stats()["pending"] == 0
+
+
+def test_entry_replaced_during_check_is_not_reapplied(setup):
+    reconciler, scheduler, index, cache = setup
+    reconciler.set_desired_price(ACCOUNT, ASIN, "20.00")
+    # Um DELETE chega enquanto a lista de rastreamento é lida
+    index.on_refresh = lambda: reconciler.set_desired_deleted(ACCOUNT, ASIN)
+
+    report = asyncio.run(reconciler.reconcile_account(ACCOUNT))
+
+    assert report["retried"] == []
+    assert scheduler.submitted == []
+    assert index.applied == [] and cache.recorded == []
+    # O DELETE mais novo continua pendente para a próxima conferência
+    [entry] = reconciler._entries.values()
+    assert entry["action"] == "delete"
+    assert entry["attempts"] == 0
+
+
+def test_entry_replaced_during_reapply_does_not_touch_index_or_cache(setup):
+    reconciler, scheduler, index, cache = setup
+    reconciler.set_desired_price(ACCOUNT, ASIN, "20.00")
+    scheduler.on_submit = lambda: reconciler.set_desired_price(ACCOUNT, ASIN, "30.00")
+
+    asyncio.run(reconciler.reconcile_account(ACCOUNT))
+
+    assert len(scheduler.submitted) == 1
+    assert index.applied == [] and cache.recorded == []
+    [entry] = reconciler._entries.values()
+    assert entry["price"] == "30.00"
+
+
+def test_superseded_reapply_is_not_reported_as_applied(setup):
+    reconciler, scheduler, index, cache = setup
+    scheduler.result = JobSuperseded("substituído")
+    reconciler.set_desired_deleted(ACCOUNT, ASIN)
+
+    report = asyncio.run(reconciler.reconcile_account(ACCOUNT))
+
+    assert report["retried"] == [ASIN]
+    [(_, operation, _, kwargs)] = scheduler.submitted
+    assert operation is delete_keepa_tracking
+    assert kwargs["key"] == f"update:{ASIN}"
+    assert index.deleted == []
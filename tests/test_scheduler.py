@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+import keepa.scheduler as scheduler_module
+from keepa.api import delete_keepa_tracking, update_keepa_product
+from keepa.circuit_breaker import CircuitBreakers
+from keepa.rate_limiter import RateLimiters
+from keepa.scheduler import (
+    JobSuperseded, KeepaScheduler, PRIORITY_COMMENT, PRIORITY_DELETE, PRIORITY_LOW, PRIORITY_MANUAL,
+    update_job_key
+)
+
+ACCOUNT = "Premium"
+
+
+class FakePool:
+    """Pool sem Chrome: registra a ordem de execução das operações"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def run_async(self, account_identifier, operation, *args, instance=None):
+        self.calls.append((operation.__name__, args[0] if args else None))
+        return True
+
+    def is_warm(self, account_identifier, instance=0):
+        return True
+
+    async def discard_async(self, account_identifier, instance=0):
+        pass
+
+
+def status_check(driver):
+    return True
+
+
+@pytest.fixture
+def make_scheduler(monkeypatch):
+    monkeypatch.setattr(scheduler_module.settings, "KEEPA_TABS_PER_ACCOUNT", 1)
+    monkeypatch.setattr(scheduler_module.settings, "KEEPA_INSTANCES_PER_ACCOUNT", 1)
+
+    def make():
+        pool = FakePool()
+        return KeepaScheduler(pool, CircuitBreakers(), RateLimiters()), pool
+
+    return make
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_jobs_run_by_priority_then_arrival(make_scheduler):
+    async def scenario():
+        scheduler, pool = make_scheduler()
+        # Os jobs são enfileirados antes do worker rodar pela primeira vez
+        futures = [
+            scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA1", "10.00", priority=PRIORITY_LOW),
+            scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA2", "10.00", priority=PRIORITY_COMMENT),
+            scheduler.submit(ACCOUNT, delete_keepa_tracking, "B0AAAAAAA3", priority=PRIORITY_DELETE),
+            scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA4", "10.00", priority=PRIORITY_COMMENT),
+            scheduler.submit(ACCOUNT, status_check, priority=PRIORITY_MANUAL),
+        ]
+        await asyncio.gather(*futures)
+        await scheduler.shutdown()
+        return pool.calls
+
+    assert run(scenario()) == [
+        ("status_check", None),
+        ("delete_keepa_tracking", "B0AAAAAAA3"),
+        ("update_keepa_product", "B0AAAAAAA2"),
+        ("update_keepa_product", "B0AAAAAAA4"),
+        ("update_keepa_product", "B0AAAAAAA1"),
+    ]
+
+
+def test_earlier_job_of_the_same_asin_inherits_higher_priority(make_scheduler):
+    async def scenario():
+        scheduler, pool = make_scheduler()
+        futures = [
+            scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA1", "10.00", priority=PRIORITY_COMMENT),
+            scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA2", "10.00", priority=PRIORITY_COMMENT),
+            scheduler.submit(ACCOUNT, delete_keepa_tracking, "B0AAAAAAA2", priority=PRIORITY_DELETE),
+        ]
+        await asyncio.gather(*futures)
+        await scheduler.shutdown()
+        return pool.calls
+
+    # O DELETE não ultrapassa a atualização anterior do mesmo ASIN: os dois são adiantados juntos
+    assert run(scenario()) == [
+        ("update_keepa_product", "B0AAAAAAA2"),
+        ("delete_keepa_tracking", "B0AAAAAAA2"),
+        ("update_keepa_product", "B0AAAAAAA1"),
+    ]
+
+
+def test_supersede_drops_queued_jobs_with_the_key(make_scheduler):
+    async def scenario():
+        scheduler, pool = make_scheduler()
+        key = update_job_key("b0aaaaaaa1")
+        old = scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA1", "10.00", key=key)
+        other = scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA2", "10.00", key=update_job_key("B0AAAAAAA2"))
+        removed = scheduler.supersede(ACCOUNT, key)
+        new = scheduler.submit(ACCOUNT, update_keepa_product, "B0AAAAAAA1", "20.00", key=key)
+
+        results = await asyncio.gather(old, other, new, return_exceptions=True)
+        await scheduler.shutdown()
+        return removed, results, pool.calls
+
+    removed, (old, other, new), calls = run(scenario())
+
+    assert removed == 1
+    assert isinstance(old, JobSuperseded)
+    assert other is True and new is True
+    assert calls == [
+        ("update_keepa_product", "B0AAAAAAA2"),
+        ("update_keepa_product", "B0AAAAAAA1"),
+    ]
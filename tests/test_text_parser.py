@@ -0,0 +1,59 @@
+import pytest
+
+from utils.text_parser import normalize_price, parse_bulk_update_line, parse_bulk_update_lines
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("B0ABCDEFGH,99.90", ("B0ABCDEFGH", "99.90", None)),
+    ("B0ABCDEFGH,99", ("B0ABCDEFGH", "99.00", None)),
+    ("B0ABCDEFGH,99,90", ("B0ABCDEFGH", "99.90", None)),
+    ("B0ABCDEFGH,99,9", ("B0ABCDEFGH", "99.90", None)),
+    ("B0ABCDEFGH,R$ 99,90", ("B0ABCDEFGH", "99.90", None)),
+    ("B0ABCDEFGH,1.299,90,Premium", ("B0ABCDEFGH", "1299.90", "Premium")),
+    ("B0ABCDEFGH,R$ 1.299,90", ("B0ABCDEFGH", "1299.90", None)),
+    ("B0ABCDEFGH;1.299,90;Premium", ("B0ABCDEFGH", "1299.90", "Premium")),
+    ("B0ABCDEFGH\t49,5\tMeraxes", ("B0ABCDEFGH", "49.50", "Meraxes")),
+    ("b0abcdefgh,10", ("B0ABCDEFGH", "10.00", None)),
+    ("https://www.amazon.com.br/dp/B0ABCDEFGH,10", ("B0ABCDEFGH", "10.00", None)),
+])
+def test_parse_bulk_update_line_valid(line, expected):
+    assert parse_bulk_update_line(line) == expected
+
+
+@pytest.mark.parametrize("line", [
+    "B0ABCDEFGH",
+    "B0ABCDEFGH,abc",
+    "B0ABCDEFGH,0",
+    "B0ABCDEFGH,12 reais",
+    "B0ABCDEFGH;1,299.90",
+    # Preço com separadores trocados: sem a verificação, viraria 1.00 na conta "299.90"
+    "B0ABCDEFGH,1,299.90",
+    "NOTANASIN!,10",
+])
+def test_parse_bulk_update_line_invalid(line):
+    assert parse_bulk_update_line(line) is None
+
+
+def test_parse_bulk_update_lines_skips_header_comments_and_blank_lines():
+    text = "asin,preco,conta\n# comentário\n\nB0ABCDEFGH,10\nlixo\nB0ABCDEFGJ;1.000;Premium\n"
+
+    items, errors = parse_bulk_update_lines(text)
+
+    assert items == [
+        (4, "B0ABCDEFGH", "10.00", None),
+        (6, "B0ABCDEFGJ", "1000.00", "Premium"),
+    ]
+    assert errors == [(5, "lixo")]
+
+
+@pytest.mark.parametrize("price, expected", [
+    ("99,90", 99.9),
+    ("99.9", 99.9),
+    (99.9, 99.9),
+    ("R$ 1.299,90", 1299.9),
+    ("1299.90", 1299.9),
+    (None, None),
+    ("abc", None),
+])
+def test_normalize_price(price, expected):
+    assert normalize_price(price) == expected
@@ -6,7 +6,7 @@ from config.settings import load_settings
 from data.data_manager import load_post_info, save_post_info
 from utils.text_parser import extract_asin_from_text, extract_source_from_text, extract_price_from_comment
 from keepa.browser import initialize_driver
-from keepa.api import login_to_keepa, update_keepa_product
+from keepa.api import login_to_keepa, update_keepa_product, product_url
 
 from utils.logger import get_logger
 
@@ -22,7 +22,7 @@ def format_destination_message(asin, comment, source, price=None, action="update
         comment (str): Comentário original do usuário
         source (str): Fonte do rastreamento
         price (str, opcional): Preço extraído
-        action (str): Ação realizada (atualização/exclusão)
+        action (str): Ação realizada (update/unchanged/delete/superseded)
         success (bool): Se a ação foi bem-sucedida
         
     Returns:
@@ -39,12 +39,18 @@ def format_destination_message(asin, comment, source, price=None, action="update
             action_desc += f" Definida para R$ {price}"
     elif action == "delete":
         action_desc = f"Rastreamento deletado {status_emoji}"
+    elif action == "unchanged":
+        action_desc = f"Sem alterações ✅ Preço R$ {price} já aplicado"
+    elif action == "superseded":
+        action_desc = "Substituído por comentário mais recente ⏭️"
+        if price:
+            action_desc += f" (R$ {price} não aplicado)"
     
     # Formatar URL da Amazon
     amazon_url = f"https://www.amazon.com.br/dp/{asin}"
     
     # Criar URL do Keepa
-    keepa_url = f"https://keepa.com/#!product/12-{asin}"
+    keepa_url = product_url(asin)
     
     # Formatar a mensagem
     message = (
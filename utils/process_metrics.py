@@ -0,0 +1,92 @@
+import os
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROC_DIR = "/proc"
+
+def _read_stat(pid):
+    """
+    Ler nome do processo e PID do pai a partir de /proc/<pid>/stat
+
+    Returns:
+        tuple: (nome, ppid) ou None se o processo não existir mais
+    """
+    try:
+        with open(os.path.join(PROC_DIR, str(pid), "stat"), "r") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    # O nome fica entre parênteses e pode conter espaços
+    name = data[data.find("(") + 1:data.rfind(")")]
+    fields = data[data.rfind(")") + 2:].split()
+    return name, int(fields[1])
+
+def list_processes():
+    """
+    Listar processos do sistema
+
+    Returns:
+        dict: pid -> (nome, ppid)
+    """
+    processes = {}
+    if not os.path.isdir(PROC_DIR):
+        return processes
+    for entry in os.listdir(PROC_DIR):
+        if entry.isdigit():
+            stat = _read_stat(int(entry))
+            if stat:
+                processes[int(entry)] = stat
+    return processes
+
+def get_process_tree(root_pid, processes=None):
+    """
+    Obter o PID raiz e todos os seus descendentes
+
+    Args:
+        root_pid (int): PID do processo raiz
+        processes (dict, opcional): Resultado de list_processes() para reutilizar
+
+    Returns:
+        set: PIDs da árvore (vazio se a raiz não existir)
+    """
+    processes = processes if processes is not None else list_processes()
+    if root_pid not in processes:
+        return set()
+
+    children = {}
+    for pid, (_, ppid) in processes.items():
+        children.setdefault(ppid, []).append(pid)
+
+    tree = set()
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        if pid in tree:
+            continue
+        tree.add(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+def get_rss_mb(pids):
+    """
+    Somar a memória residente (RSS) de um conjunto de processos
+
+    Args:
+        pids (iterable): PIDs a somar
+
+    Returns:
+        float: RSS total em MB
+    """
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(os.path.join(PROC_DIR, str(pid), "status"), "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
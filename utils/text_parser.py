@@ -104,4 +104,118 @@ def extract_account_identifier(comment):
         return identifier
     
     logger.info("Nenhum identificador de conta encontrado no comentário")
-    return None
\ No newline at end of file
+    return None
+
+# Preço de uma linha do arquivo em massa: "99", "99,90", "99.9" ou com milhar "1.299,90"
+BULK_PRICE_PATTERN = re.compile(r'(?:R\$\s*)?(\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[.,]\d{1,2})?)')
+
+def parse_bulk_price(text):
+    """
+    Interpretar o campo de preço de uma linha em massa
+    
+    Separador de milhar e vírgula decimal seguem as regras de normalize_price
+    ("1.299,90" -> "1299.90"). Diferente de extract_price_from_comment, o
+    campo inteiro precisa ser um preço.
+    
+    Returns:
+        str: Preço com duas casas decimais ("1299.90"), ou None se inválido
+    """
+    match = BULK_PRICE_PATTERN.fullmatch((text or "").strip())
+    if not match:
+        return None
+    value = match.group(1)
+    # Sem vírgula, três dígitos depois do ponto só podem ser milhar ("1.299")
+    if ',' not in value and re.fullmatch(r'\d{1,3}(?:\.\d{3})+', value):
+        value = value.replace('.', '')
+    price = normalize_price(value)
+    if not price:
+        return None
+    return f"{price:.2f}"
+
+def parse_bulk_update_line(line):
+    """
+    Interpretar uma linha de atualização em massa
+    
+    Formatos aceitos: "ASIN,preço[,conta]", "ASIN;preço[;conta]" ou separado por tab.
+    Com vírgula como separador, um preço como "99,90" ou "1.299,90" também é
+    reconhecido ("ASIN,1.299,90,conta"). Campos de preço inválidos ou um número
+    no lugar da conta rejeitam a linha.
+    
+    Returns:
+        tuple: (asin, preço, conta ou None) ou None se a linha for inválida
+    """
+    if ';' in line:
+        parts = line.split(';')
+    elif '\t' in line:
+        parts = line.split('\t')
+    else:
+        parts = line.split(',')
+        # Preço com vírgula decimal dividido pelo separador ("99,90", "99,9" ou "R$ 1.299,90")
+        if len(parts) >= 3 and re.fullmatch(r'(?:R\$\s*)?\d[\d.]*', parts[1].strip()) and re.fullmatch(r'\d{1,2}', parts[2].strip()):
+            parts = [parts[0], f"{parts[1].strip()},{parts[2].strip()}"] + parts[3:]
+    
+    parts = [part.strip() for part in parts]
+    if len(parts) < 2:
+        return None
+    
+    # Um número no lugar da conta indica um preço partido de forma ambígua ("1,299.90")
+    if len(parts) >= 3 and re.fullmatch(r'[\d.,]+', parts[2]):
+        return None
+    
+    asin = extract_asin_from_text(parts[0] if '/' in parts[0] else parts[0].upper())
+    price = parse_bulk_price(parts[1])
+    if not asin or not price:
+        return None
+    
+    account = parts[2] if len(parts) >= 3 and parts[2] else None
+    return asin, price, account
+
+def parse_bulk_update_lines(text):
+    """
+    Interpretar o conteúdo de um arquivo de atualização em massa
+    
+    Linhas vazias, comentários (#) e um cabeçalho iniciado por "asin" são ignorados.
+    
+    Returns:
+        tuple: (itens, erros) onde itens é uma lista de (número da linha, asin, preço, conta)
+               e erros é uma lista de (número da linha, conteúdo da linha)
+    """
+    items = []
+    errors = []
+    
+    for line_number, raw_line in enumerate((text or "").splitlines(), 1):
+        line = raw_line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line_number == 1 and line.lower().startswith('asin'):
+            continue
+        
+        parsed = parse_bulk_update_line(line)
+        if parsed:
+            items.append((line_number, *parsed))
+        else:
+            errors.append((line_number, line))
+    
+    logger.info(f"Arquivo de atualização em massa: {len(items)} linhas válidas, {len(errors)} inválidas")
+    return items, errors
+
+def normalize_price(price):
+    """
+    Normalizar um preço para comparação ("99,90", "99.9" e 99.9 são iguais)
+    
+    Args:
+        price: Preço como texto ou número (aceita "R$" e separador de milhar)
+        
+    Returns:
+        float: Preço com duas casas decimais, ou None se inválido
+    """
+    if price is None:
+        return None
+    text = re.sub(r'[^\d,.]', '', str(price))
+    # "1.299,90" -> "1299.90"; "99,90" -> "99.90"
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        return round(float(text), 2)
+    except ValueError:
+        return None
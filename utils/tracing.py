@@ -0,0 +1,232 @@
+import asyncio
+import bisect
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from config.settings import load_settings
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = load_settings()
+
+# Id de correlação do comentário em processamento; copiado para as tarefas
+# criadas a partir dele e para as threads do executor do Keepa (run_blocking)
+_current_trace = contextvars.ContextVar("keepa_trace_id", default=None)
+
+# Etapas medidas, na ordem do fluxo de um comentário
+STAGES = (
+    "comentário",           # do recebimento ao aviso final (inclui as etapas abaixo)
+    "coalescência",         # janela KEEPA_COALESCE_WINDOW
+    "fila",                 # espera na fila da conta no agendador
+    "keepa: job",           # execução do job no Chrome (grupo de abas inteiro)
+    "chrome: iniciar",      # abrir um Chrome novo
+    "login",                # login (ou verificação da sessão) no Chrome novo
+    "abrir abas",           # abrir as abas de um grupo de produtos
+    "página do produto",    # carregar a página (ou trocar para a aba pré-carregada)
+    "aba de rastreamento",  # clicar na aba e ler o formulário
+    "formulário",           # preencher o preço-alvo
+    "envio",                # enviar o alerta (ou excluir) e aguardar o Keepa
+    "telegram: destino",    # mensagem no chat de destino
+    "telegram: admin",      # notificação ao administrador
+)
+
+# Limites superiores (segundos) dos baldes dos histogramas
+HISTOGRAM_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300)
+
+
+def new_trace_id():
+    """Gerar um id de correlação curto para um comentário"""
+    return secrets.token_hex(4)
+
+
+def current_trace_id():
+    """Id de correlação do contexto atual (None fora de um comentário)"""
+    return _current_trace.get()
+
+
+class LatencyHistogram:
+    """
+    Histograma de durações com baldes fixos
+
+    Ocupa memória constante; os percentis são estimados pelo limite superior
+    do balde (limitado à maior duração vista).
+    """
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        """
+        Returns:
+            dict: count, mean, p50, p95, p99 e max (segundos)
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class Tracer:
+    """
+    Spans de latência por etapa, correlacionados pelo id do comentário
+
+    Cada span vira um registro estruturado (JSON por linha em
+    KEEPA_TRACE_FILE), entra no histograma da etapa e fica entre os
+    registros recentes, consultáveis pelo id de correlação.
+    """
+
+    def __init__(self, path, recent_limit):
+        self._path = path
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._recent = deque(maxlen=recent_limit)
+        self._sink = None
+
+    def _get_sink(self):
+        """Logger dedicado que grava os registros crus no arquivo de traces"""
+        if self._sink is None and self._path:
+            sink = logging.getLogger("keepa_traces")
+            sink.propagate = False
+            sink.setLevel(logging.INFO)
+            if not sink.handlers:
+                try:
+                    os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+                    sink.addHandler(RotatingFileHandler(self._path, maxBytes=10 * 1024 * 1024, backupCount=3))
+                except OSError as e:
+                    logger.warning(f"⚠️ Não foi possível abrir o arquivo de traces: {str(e)}")
+                    self._path = ""
+                    return None
+            self._sink = sink
+        return self._sink
+
+    @contextmanager
+    def trace(self, trace_id=None):
+        """
+        Associar as operações do bloco (e as tarefas criadas nele) a um id de correlação
+
+        Yields:
+            str: O id de correlação (novo, se não informado)
+        """
+        token = _current_trace.set(trace_id or new_trace_id())
+        try:
+            yield _current_trace.get()
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """
+        Medir uma etapa
+
+        O bloco recebe o dicionário de atributos do registro e pode completá-lo
+        (ex.: span["status"] = "timeout"). Exceções marcam o span como "erro".
+
+        Args:
+            stage: Nome da etapa (chave do histograma)
+            **attrs: Atributos extras do registro (asin, conta...)
+        """
+        attrs.setdefault("status", "ok")
+        start = time.monotonic()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["status"] = "cancelado" if isinstance(e, asyncio.CancelledError) else "erro"
+            attrs.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.record(stage, time.monotonic() - start, **attrs)
+
+    def record(self, stage, duration, trace_id=None, **attrs):
+        """
+        Registrar uma etapa já medida
+
+        Args:
+            stage: Nome da etapa
+            duration: Duração em segundos
+            trace_id: Id de correlação (padrão: o do contexto atual)
+            **attrs: Atributos extras do registro
+        """
+        record = {
+            "ts": round(time.time(), 3),
+            "trace": trace_id or current_trace_id(),
+            "stage": stage,
+            "duration": round(duration, 4),
+            **attrs,
+        }
+        record.setdefault("status", "ok")
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.observe(duration)
+            self._recent.append(record)
+
+        sink = self._get_sink()
+        if sink is not None:
+            sink.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    def stats(self):
+        """
+        Obter os histogramas por etapa
+
+        Returns:
+            dict: Por etapa, o resumo de LatencyHistogram.summary
+        """
+        with self._lock:
+            stages = sorted(self._histograms, key=lambda stage: (STAGES.index(stage) if stage in STAGES else len(STAGES), stage))
+            return {stage: self._histograms[stage].summary() for stage in stages}
+
+    def spans(self, trace_id):
+        """Registros recentes de um id de correlação, em ordem de término"""
+        with self._lock:
+            return [record for record in self._recent if record["trace"] == trace_id]
+
+    def slowest(self, stage, limit=5):
+        """Registros recentes mais lentos de uma etapa"""
+        with self._lock:
+            records = [record for record in self._recent if record["stage"] == stage]
+        return sorted(records, key=lambda record: record["duration"], reverse=True)[:limit]
+
+    def reset(self):
+        """Zerar histogramas e registros recentes"""
+        with self._lock:
+            self._histograms.clear()
+            self._recent.clear()
+
+
+# Tracer compartilhado entre message_processor, agendador, pool de drivers e api do Keepa
+tracer = Tracer(settings.KEEPA_TRACE_FILE, settings.KEEPA_TRACE_RECENT)